@@ -0,0 +1,359 @@
+"""
+Synthetic corpora for the loader benchmarks.
+
+Every writer is deterministic for a given `seed` and produces files in the
+layout expected by the corresponding hub dataloader:
+
+ - brat: one `.txt` file per document with `.a1` (entities) and `.a2`
+   (triggers, events, relations, equivalences, attributes, normalizations)
+   annotations, as in the BioNLP shared tasks (e.g. `bionlp_st_2013_cg`)
+ - BioC-XML: a single collection with title/abstract passages, entity
+   annotations and document-level relations, as in `bc5cdr`
+ - PubTator: title/abstract lines followed by tab-separated mentions, as in `ncbi_disease`
+ - JSONL: sentence pairs with a label, as in `mednli`
+ - CSV: quoted sentence pairs with a label, as in `mqp`
+ - ARFF: one file of labelled citations per ambiguous word, with the concepts
+   of every word in `benchmark_mesh.txt`, as in `msh_wsd`
+ - MuchMore XML: one annotated abstract per file (tokens, chunks, UMLS terms
+   and semantic relations per sentence), as in `muchmore`
+"""
+import csv
+import json
+import random
+from pathlib import Path
+from typing import List, Tuple
+from xml.sax.saxutils import escape
+
+WORDS = [
+    "protein",
+    "kinase",
+    "expression",
+    "tumor",
+    "cell",
+    "patients",
+    "treatment",
+    "induced",
+    "receptor",
+    "binding",
+    "levels",
+    "activity",
+    "mutation",
+    "pathway",
+    "inhibitor",
+    "response",
+    "clinical",
+    "signaling",
+    "disease",
+    "therapy",
+    "gene",
+    "apoptosis",
+    "increased",
+    "reduced",
+    "significantly",
+    "the",
+    "of",
+    "and",
+    "in",
+    "with",
+]
+
+ENTITY_TYPES = ["Gene_or_gene_product", "Cancer", "Cell", "Simple_chemical", "Organism"]
+EVENT_TYPES = ["Positive_regulation", "Negative_regulation", "Gene_expression", "Binding"]
+RELATION_TYPES = ["Equiv", "Part-of"]
+
+
+def _sentence(rng: random.Random, num_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(num_words)).capitalize() + "."
+
+
+def _text(rng: random.Random, num_sentences: int) -> str:
+    return " ".join(_sentence(rng, rng.randint(8, 25)) for _ in range(num_sentences))
+
+
+def _word_spans(text: str) -> List[Tuple[int, int]]:
+    spans = []
+    start = 0
+    for word in text.split(" "):
+        end = start + len(word.rstrip("."))
+        if end > start:
+            spans.append((start, end))
+        start += len(word) + 1
+    return spans
+
+
+def _mesh_id(rng: random.Random) -> str:
+    return f"D{rng.randint(0, 999999):06d}"
+
+
+def write_brat(out_dir: Path, num_docs: int, entities_per_doc: int = 20, seed: int = 0) -> Path:
+    """
+    Write `num_docs` brat documents (`.txt`, `.a1`, `.a2`) to `out_dir`.
+    """
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    for doc_idx in range(num_docs):
+        doc_id = f"PMID-{doc_idx:07d}"
+        text = _text(rng, rng.randint(5, 12))
+        spans = _word_spans(text)
+        picked = sorted(rng.sample(spans, min(len(spans), entities_per_doc + entities_per_doc // 4)))
+        entity_spans = picked[:entities_per_doc]
+        trigger_spans = picked[entities_per_doc:]
+
+        a1 = []
+        for t_idx, (start, end) in enumerate(entity_spans, start=1):
+            entity_type = rng.choice(ENTITY_TYPES)
+            if t_idx % 7 == 0 and t_idx < len(entity_spans):
+                # discontinuous entity spanning two words
+                next_start, next_end = entity_spans[t_idx]
+                a1.append(
+                    f"T{t_idx}\t{entity_type} {start} {end};{next_start} {next_end}\t"
+                    f"{text[start:end]} {text[next_start:next_end]}"
+                )
+            else:
+                a1.append(f"T{t_idx}\t{entity_type} {start} {end}\t{text[start:end]}")
+
+        a2 = []
+        num_entities = len(entity_spans)
+        for idx, (start, end) in enumerate(trigger_spans, start=1):
+            t_id = num_entities + idx
+            event_type = rng.choice(EVENT_TYPES)
+            a2.append(f"T{t_id}\t{event_type} {start} {end}\t{text[start:end]}")
+            theme = rng.randint(1, num_entities)
+            cause = rng.randint(1, num_entities)
+            a2.append(f"E{idx}\t{event_type}:T{t_id} Theme:T{theme} Cause:T{cause}")
+        for idx in range(1, num_entities // 5 + 1):
+            head, tail = rng.sample(range(1, num_entities + 1), 2)
+            a2.append(f"R{idx}\t{rng.choice(RELATION_TYPES)} Arg1:T{head} Arg2:T{tail}")
+        if num_entities >= 2:
+            first, second = rng.sample(range(1, num_entities + 1), 2)
+            a2.append(f"*\tEquiv T{first} T{second}")
+        for idx in range(1, len(trigger_spans) // 2 + 1):
+            a2.append(f"A{idx}\tNegation E{idx}")
+        for idx in range(1, num_entities // 4 + 1):
+            ref = rng.randint(1, num_entities)
+            a2.append(f"N{idx}\tReference T{ref} MESH:{_mesh_id(rng)}\tconcept")
+
+        (out_dir / f"{doc_id}.txt").write_text(text)
+        (out_dir / f"{doc_id}.a1").write_text("\n".join(a1) + "\n")
+        (out_dir / f"{doc_id}.a2").write_text("\n".join(a2) + "\n")
+
+    return out_dir
+
+
+def write_bioc_xml(path: Path, num_docs: int, entities_per_doc: int = 20, seed: int = 0) -> Path:
+    """
+    Write a BioC-XML collection of `num_docs` documents to `path`.
+    """
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as fp:
+        fp.write('<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE collection SYSTEM "BioC.dtd">\n')
+        fp.write("<collection><source>synthetic</source><date>20220101</date><key>bench.key</key>\n")
+        for doc_idx in range(num_docs):
+            fp.write(f"<document><id>{doc_idx + 1000000}</id>\n")
+            mesh_ids = {"Chemical": set(), "Disease": set()}
+            ann_idx = 0
+            offset = 0
+            for passage_type, num_sentences in (("title", 1), ("abstract", rng.randint(5, 12))):
+                text = _text(rng, num_sentences)
+                fp.write(
+                    f'<passage><infon key="type">{passage_type}</infon>'
+                    f"<offset>{offset}</offset><text>{escape(text)}</text>\n"
+                )
+                spans = _word_spans(text)
+                num_entities = entities_per_doc // 5 if passage_type == "title" else entities_per_doc
+                for start, end in sorted(rng.sample(spans, min(len(spans), num_entities))):
+                    entity_type = rng.choice(["Chemical", "Disease"])
+                    if rng.random() < 0.1:
+                        mesh = "-1"
+                    else:
+                        mesh = "|".join(_mesh_id(rng) for _ in range(rng.choice([1, 1, 1, 2])))
+                        mesh_ids[entity_type].update(mesh.split("|"))
+                    fp.write(
+                        f'<annotation id="{ann_idx}"><infon key="type">{entity_type}</infon>'
+                        f'<infon key="MESH">{mesh}</infon>'
+                        f'<location offset="{offset + start}" length="{end - start}"/>'
+                        f"<text>{escape(text[start:end])}</text></annotation>\n"
+                    )
+                    ann_idx += 1
+                fp.write("</passage>\n")
+                offset += len(text) + 1
+
+            chemicals = sorted(mesh_ids["Chemical"])
+            diseases = sorted(mesh_ids["Disease"])
+            for rel_idx in range(min(len(chemicals), len(diseases), 3)):
+                fp.write(
+                    f'<relation id="R{rel_idx}"><infon key="relation">CID</infon>'
+                    f'<infon key="Chemical">{chemicals[rel_idx]}</infon>'
+                    f'<infon key="Disease">{diseases[rel_idx]}</infon></relation>\n'
+                )
+            fp.write("</document>\n")
+        fp.write("</collection>\n")
+
+    return path
+
+
+def write_pubtator(path: Path, num_docs: int, entities_per_doc: int = 20, seed: int = 0) -> Path:
+    """
+    Write `num_docs` PubTator documents to `path`.
+    """
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as fp:
+        for doc_idx in range(num_docs):
+            pmid = str(doc_idx + 1000000)
+            title = _text(rng, 1)
+            abstract = _text(rng, rng.randint(5, 12))
+            fp.write(f"{pmid}|t|{title}\n{pmid}|a|{abstract}\n")
+            # offsets are relative to the title and abstract joined by a space
+            text = f"{title} {abstract}"
+            spans = _word_spans(text)
+            for start, end in sorted(rng.sample(spans, min(len(spans), entities_per_doc))):
+                entity_type = rng.choice(["SpecificDisease", "DiseaseClass", "Modifier", "CompositeMention"])
+                if rng.random() < 0.1:
+                    concept_id = f"OMIM:{rng.randint(100000, 999999)}"
+                elif rng.random() < 0.1:
+                    concept_id = f"{_mesh_id(rng)}|{_mesh_id(rng)}"
+                else:
+                    concept_id = _mesh_id(rng)
+                fp.write(f"{pmid}\t{start}\t{end}\t{text[start:end]}\t{entity_type}\t{concept_id}\n")
+            fp.write("\n")
+
+    return path
+
+
+def write_jsonl(path: Path, num_docs: int, seed: int = 0) -> Path:
+    """
+    Write `num_docs` labelled sentence pairs as JSON lines to `path`.
+    """
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as fp:
+        for doc_idx in range(num_docs):
+            example = {
+                "pairID": f"pair-{doc_idx}",
+                "sentence1": _sentence(rng, rng.randint(8, 30)),
+                "sentence2": _sentence(rng, rng.randint(4, 15)),
+                "gold_label": rng.choice(["entailment", "contradiction", "neutral"]),
+            }
+            fp.write(json.dumps(example) + "\n")
+
+    return path
+
+
+def write_csv(path: Path, num_docs: int, seed: int = 0) -> Path:
+    """
+    Write `num_docs` labelled sentence pairs as a quoted CSV file (no header) to `path`.
+    """
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8", newline="") as fp:
+        writer = csv.writer(fp, quoting=csv.QUOTE_ALL)
+        for doc_idx in range(num_docs):
+            writer.writerow(
+                [
+                    str(doc_idx),
+                    _sentence(rng, rng.randint(5, 20)),
+                    _sentence(rng, rng.randint(5, 20)),
+                    str(rng.randint(0, 1)),
+                ]
+            )
+
+    return path
+
+
+def write_msh_wsd(out_dir: Path, num_docs: int, instances_per_word: int = 100, seed: int = 0) -> Path:
+    """
+    Write about `num_docs` labelled citations, split into one ARFF file per ambiguous word, to `out_dir`.
+    """
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    concepts = []
+    for word_idx in range(max(1, num_docs // instances_per_word)):
+        word = f"{rng.choice(WORDS)}{word_idx}"
+        num_senses = rng.randint(2, 4)
+        concepts.append([word] + [f"C{rng.randint(0, 9999999):07d}" for _ in range(num_senses)])
+
+        lines = [
+            f"@RELATION {word}",
+            "",
+            "@ATTRIBUTE PMID NUMERIC",
+            "@ATTRIBUTE citation STRING",
+            "@ATTRIBUTE class {" + ",".join(f"M{num}" for num in range(1, num_senses + 1)) + "}",
+            "",
+            "@DATA",
+        ]
+        for _ in range(instances_per_word):
+            words = _sentence(rng, rng.randint(20, 60)).split(" ")
+            words[rng.randrange(len(words))] = f"<e>{word}</e>"
+            citation = ", ".join([" ".join(words[: len(words) // 2]), " ".join(words[len(words) // 2 :])])
+            lines.append(f'{rng.randint(1000000, 9999999)},"{citation}",M{rng.randint(1, num_senses)}')
+        (out_dir / f"{word}_pmids_tagged.arff").write_text("\n".join(lines) + "\n", encoding="iso-8859-1")
+
+    (out_dir / "benchmark_mesh.txt").write_text("\n".join("\t".join(cuis) for cuis in concepts) + "\n")
+
+    return out_dir
+
+
+def write_muchmore(out_dir: Path, num_docs: int, sentences_per_doc: int = 50, seed: int = 0) -> Path:
+    """
+    Write `num_docs` annotated MuchMore abstracts (`.eng.abstr.chunkmorph.annotated.xml`) to `out_dir`.
+    """
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    for doc_idx in range(num_docs):
+        doc_id = f"Synthetic.{doc_idx:08d}.eng.abstr"
+        lines = [f'<document id="{doc_id}" lang="en">']
+        for sid in range(1, sentences_per_doc + 1):
+            words = _sentence(rng, rng.randint(8, 25)).split(" ")
+            lines.append(f'<sentence id="s{sid}">')
+            lines.append(
+                "<text>"
+                + "".join(
+                    f'<token id="w{wid}" pos="NN" lemma="{escape(word.lower())}">{escape(word)}</token>'
+                    for wid, word in enumerate(words, start=1)
+                )
+                + "</text>"
+            )
+            lines.append(
+                "<chunks>"
+                + "".join(
+                    f'<chunk id="c{cid}" from="w{start}" to="w{min(start + 2, len(words))}" type="NP"/>'
+                    for cid, start in enumerate(range(1, len(words) + 1, 3), start=1)
+                )
+                + "</chunks>"
+            )
+
+            concept_ids = []
+            lines.append("<umlsterms>")
+            for tid, start in enumerate(sorted(rng.sample(range(1, len(words) + 1), 4)), start=1):
+                end = min(start + rng.randint(0, 2), len(words))
+                concept_id = f"s{sid}.t{tid}.c1"
+                concept_ids.append(concept_id)
+                lines.append(
+                    f'<umlsterm id="t{tid}" from="w{start}" to="w{end}">'
+                    f'<concept id="{concept_id}" cui="C{rng.randint(0, 9999999):07d}" preferred="concept" '
+                    f'tui="T{rng.randint(1, 200):03d}"><msh code="{_mesh_id(rng)}"/></concept></umlsterm>'
+                )
+            lines.append("</umlsterms>")
+            lines.append("<ewnterms/>")
+            lines.append(
+                "<semrels>"
+                + "".join(
+                    f'<semrel id="r{rid}" term1="{term1}" term2="{term2}" reltype="associated_with"/>'
+                    for rid, (term1, term2) in enumerate(zip(concept_ids[:-1], concept_ids[1:]), start=1)
+                )
+                + "</semrels>"
+            )
+            lines.append("</sentence>")
+        lines.append("</document>")
+        (out_dir / f"{doc_id}.chunkmorph.annotated.xml").write_text("\n".join(lines) + "\n", encoding="iso-8859-1")
+
+    return out_dir
@@ -0,0 +1,348 @@
+"""
+Throughput benchmarks of the shared parsers (`bigbio/hub/bigbiohub.py`) and a representative set of hub dataloaders.
+
+All benchmarks run offline on synthetic corpora (see `benchmarks/fixtures.py`).
+Dataloaders are benchmarked by calling `_generate_examples` of their builders directly,
+i.e. without downloading, caching or encoding to Arrow.
+
+Results are written as JSON together with the commit they were measured on,
+so that runs can be compared across commits:
+
+    python -m benchmarks.run_benchmarks --num_docs 2000 --output main.json
+    git checkout my-branch
+    python -m benchmarks.run_benchmarks --num_docs 2000 --output my-branch.json --compare main.json
+"""
+import argparse
+import fnmatch
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import datasets
+from bioc import biocxml, pubtator
+from datasets.load import import_main_class
+
+from bigbio.hub import bigbiohub
+from benchmarks import fixtures
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# name -> function taking the fixture paths and returning the function to time,
+# which in turn returns the number of processed items
+BENCHMARKS: Dict[str, Callable[[Dict[str, Path]], Callable[[], int]]] = {}
+
+
+class ArchiveFiles:
+    """
+    (file name, binary file) pairs of the files of a directory, like `dl_manager.iter_archive`,
+    but iterable again for every timed run.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def __iter__(self):
+        for path in sorted(self.directory.iterdir()):
+            with open(path, "rb") as fp:
+                yield path.name, fp
+
+
+# (dataset name, schema, fixture, gen_kwargs of `_generate_examples` given the fixture path)
+LOADER_BENCHMARKS = [
+    ("bionlp_st_2013_cg", "source", "brat", lambda path: {"data_files": path}),
+    ("bionlp_st_2013_cg", "bigbio_kb", "brat", lambda path: {"data_files": path}),
+    ("bc5cdr", "source", "bioc_xml", lambda path: {"filepath": path, "split": "train"}),
+    ("bc5cdr", "bigbio_kb", "bioc_xml", lambda path: {"filepath": path, "split": "train"}),
+    ("ncbi_disease", "source", "pubtator", lambda path: {"filepath": path, "split": "train"}),
+    ("ncbi_disease", "bigbio_kb", "pubtator", lambda path: {"filepath": path, "split": "train"}),
+    ("mednli", "source", "jsonl", lambda path: {"filepath": path, "split": "train"}),
+    ("mednli", "bigbio_te", "jsonl", lambda path: {"filepath": path, "split": "train"}),
+    ("mqp", "source", "csv", lambda path: {"filepath": path, "split": "train"}),
+    ("mqp", "bigbio_pairs", "csv", lambda path: {"filepath": path, "split": "train"}),
+    (
+        "msh_wsd",
+        "source",
+        "arff",
+        lambda path: {"concepts_file": path / "benchmark_mesh.txt", "data_files": sorted(path.glob("*arff"))},
+    ),
+    (
+        "msh_wsd",
+        "bigbio_kb",
+        "arff",
+        lambda path: {"concepts_file": path / "benchmark_mesh.txt", "data_files": sorted(path.glob("*arff"))},
+    ),
+    (
+        "muchmore",
+        "bigbio_kb",
+        "muchmore_xml",
+        lambda path: {"file_names_and_pointers": ArchiveFiles(path), "split": "train"},
+    ),
+]
+
+
+def benchmark(name: str):
+    def register(setup: Callable[[Dict[str, Path]], Callable[[], int]]):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def write_fixtures(root: Path, num_docs: int, seed: int) -> Dict[str, Path]:
+    """
+    Write all synthetic corpora to `root` and return their paths keyed on format.
+    """
+    return {
+        "brat": fixtures.write_brat(root / "brat", num_docs, seed=seed),
+        "bioc_xml": fixtures.write_bioc_xml(root / "bioc.xml", num_docs, seed=seed),
+        "pubtator": fixtures.write_pubtator(root / "pubtator.txt", num_docs, seed=seed),
+        "jsonl": fixtures.write_jsonl(root / "pairs.jsonl", num_docs, seed=seed),
+        "csv": fixtures.write_csv(root / "pairs.csv", num_docs, seed=seed),
+        "arff": fixtures.write_msh_wsd(root / "MSHCorpus", num_docs, seed=seed),
+        "muchmore_xml": fixtures.write_muchmore(root / "muchmore", num_docs, seed=seed),
+    }
+
+
+@benchmark("parse_brat_file")
+def _parse_brat_file(paths: Dict[str, Path]) -> Callable[[], int]:
+    txt_files = sorted(paths["brat"].glob("*.txt"))
+
+    def run():
+        for txt_file in txt_files:
+            bigbiohub.parse_brat_file(txt_file)
+        return len(txt_files)
+
+    return run
+
+
+@benchmark("brat_parse_to_bigbio_kb")
+def _brat_parse_to_bigbio_kb(paths: Dict[str, Path]) -> Callable[[], int]:
+    brat_parses = [bigbiohub.parse_brat_file(txt_file) for txt_file in sorted(paths["brat"].glob("*.txt"))]
+
+    def run():
+        for brat_parse in brat_parses:
+            bigbiohub.brat_parse_to_bigbio_kb(brat_parse)
+        return len(brat_parses)
+
+    return run
+
+
+@benchmark("bioc_xml_reader")
+def _bioc_xml_reader(paths: Dict[str, Path]) -> Callable[[], int]:
+    def run():
+        return sum(1 for _ in biocxml.BioCXMLDocumentReader(str(paths["bioc_xml"])))
+
+    return run
+
+
+@benchmark("get_texts_and_offsets_from_bioc_ann")
+def _get_texts_and_offsets_from_bioc_ann(paths: Dict[str, Path]) -> Callable[[], int]:
+    annotations = [
+        annotation
+        for document in biocxml.BioCXMLDocumentReader(str(paths["bioc_xml"]))
+        for passage in document.passages
+        for annotation in passage.annotations
+    ]
+
+    def run():
+        for annotation in annotations:
+            bigbiohub.get_texts_and_offsets_from_bioc_ann(annotation)
+        return len(annotations)
+
+    return run
+
+
+@benchmark("pubtator_iterparse")
+def _pubtator_iterparse(paths: Dict[str, Path]) -> Callable[[], int]:
+    def run():
+        with open(paths["pubtator"]) as fp:
+            return sum(1 for _ in pubtator.iterparse(fp))
+
+    return run
+
+
+def _loader_benchmark(dataset_name: str, schema: str, fixture: str, gen_kwargs: Callable[[Path], Dict]):
+    def setup(paths: Dict[str, Path]) -> Callable[[], int]:
+        builder_cls = import_main_class(f"bigbio.hub.hub_repos.{dataset_name}.{dataset_name}")
+        # nothing is downloaded or cached, but builders still need a cache directory
+        cache_dir = paths[fixture].parent / "hf_cache"
+        builder = builder_cls(config_name=f"{dataset_name}_{schema}", cache_dir=str(cache_dir))
+        kwargs = gen_kwargs(paths[fixture])
+
+        def run():
+            return sum(1 for _ in builder._generate_examples(**kwargs))
+
+        return run
+
+    return setup
+
+
+for _dataset_name, _schema, _fixture, _gen_kwargs in LOADER_BENCHMARKS:
+    benchmark(f"loader:{_dataset_name}_{_schema}")(_loader_benchmark(_dataset_name, _schema, _fixture, _gen_kwargs))
+
+
+def time_benchmark(run: Callable[[], int], repeat: int) -> Dict:
+    """
+    Time `run` `repeat` times after one warm-up run.
+    """
+    items = run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    median = statistics.median(times)
+    return {
+        "items": items,
+        "times": times,
+        "min": min(times),
+        "median": median,
+        "items_per_second": items / median if median > 0 else None,
+    }
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict:
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "datasets": datasets.__version__,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Compare median timings with those of a baseline run and return the names of regressed benchmarks.
+    """  # noqa
+    if baseline["config"] != results["config"]:
+        logger.warning(f"Baseline was run with a different config: {baseline['config']}")
+
+    regressions = []
+    logger.info(f"{'benchmark':<45} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        base_median = baseline["benchmarks"][name]["median"]
+        ratio = result["median"] / base_median if base_median > 0 else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = " slower"
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            flag = " faster"
+        logger.info(f"{name:<45} {base_median:>9.4f}s {result['median']:>9.4f}s {ratio:>6.2f}x{flag}")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    datasets.logging.set_verbosity_error()
+
+    parser = argparse.ArgumentParser(description="Benchmark BigBio parsers and dataloaders on synthetic data.")
+
+    parser.add_argument(
+        "--num_docs",
+        type=int,
+        default=1000,
+        help="Number of documents in each synthetic corpus (default is 1000)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the synthetic corpora (default is 0)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of timed runs of each benchmark (default is 5)",
+    )
+    parser.add_argument(
+        "--benchmarks",
+        nargs="*",
+        help="Only run benchmarks matching these glob patterns (e.g. 'loader:*'), default is all of: "
+        + ", ".join(BENCHMARKS),
+    )
+    parser.add_argument(
+        "--fixtures_dir",
+        type=str,
+        help="Directory for the synthetic corpora (default is a temporary directory)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="benchmark_results.json",
+        help="Path of the JSON results (default is benchmark_results.json)",
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        help="JSON results of a previous run to compare with",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="Ratio of medians above which a benchmark counts as regressed (default is 1.2)",
+    )
+
+    args = parser.parse_args()
+    logger.info(f"args: {args}")
+
+    names = list(BENCHMARKS)
+    if args.benchmarks:
+        names = [name for name in names if any(fnmatch.fnmatch(name, pattern) for pattern in args.benchmarks)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixtures_dir = Path(args.fixtures_dir) if args.fixtures_dir is not None else Path(tmp_dir)
+        logger.info(f"Writing synthetic corpora of {args.num_docs} documents to {fixtures_dir}")
+        paths = write_fixtures(fixtures_dir, args.num_docs, args.seed)
+
+        results = {
+            "environment": environment(),
+            "config": {"num_docs": args.num_docs, "seed": args.seed, "repeat": args.repeat},
+            "benchmarks": {},
+        }
+        for name in names:
+            result = time_benchmark(BENCHMARKS[name](paths), args.repeat)
+            results["benchmarks"][name] = result
+            logger.info(
+                f"{name}: {result['median']:.4f}s median, {result['min']:.4f}s min "
+                f"({result['items']} items, {result['items_per_second']:.0f} items/s)"
+            )
+
+    with open(args.output, "w") as fp:
+        json.dump(results, fp, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+    if args.compare is not None:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            logger.warning(f"Regressed benchmarks: {regressions}")
+            sys.exit(1)
@@ -13,6 +13,7 @@ from dataclasses import dataclass
 from dataclasses import field
 import datasets
 from datasets import load_dataset
+import pyarrow as pa
 
 from bigbio.utils.configs import BigBioConfig
 from bigbio.utils.constants import Tasks, SCHEMA_TO_TASKS, Lang
@@ -385,6 +386,118 @@ SCHEMA_TO_METADATA_CLS = {
 }
 
 
+# columns needed to get the text of each bigbio schema (e.g. with `bigbio.hf_maps`)
+TEXT_VIEW_COLUMNS = {
+    "bigbio_kb": ["id", "document_id", "passages.id", "passages.type", "passages.text"],
+    "bigbio_text": ["id", "document_id", "text"],
+    "bigbio_pairs": ["id", "document_id", "text_1", "text_2"],
+    "bigbio_qa": ["id", "document_id", "question", "type", "choices", "context", "answer"],
+    "bigbio_t2t": ["id", "document_id", "text_1", "text_2"],
+    "bigbio_te": ["id", "premise", "hypothesis"],
+}
+
+
+def _column_tree(columns: List[str]) -> Dict:
+    """Nest dotted column names, e.g. ["id", "passages.text"] -> {"id": None, "passages": {"text": None}}."""
+    tree = {}
+    for column in columns:
+        node = tree
+        *parents, name = column.split(".")
+        for parent in parents:
+            if node.get(parent, {}) is None:
+                break  # parent is already selected as a whole
+            node = node.setdefault(parent, {})
+        else:
+            node[name] = None
+    return tree
+
+
+def _project_feature(feature, tree: Optional[Dict]):
+    if tree is None:
+        return feature
+    if isinstance(feature, list):
+        return [_project_feature(feature[0], tree)]
+    if isinstance(feature, datasets.Sequence):
+        return datasets.Sequence(_project_feature(feature.feature, tree), length=feature.length)
+    if isinstance(feature, dict):
+        missing = set(tree) - set(feature)
+        if missing:
+            raise ValueError(f"unknown fields {sorted(missing)}, available fields are {list(feature)}")
+        return {name: _project_feature(feature[name], tree[name]) for name in feature if name in tree}
+    raise ValueError(f"cannot select fields {sorted(tree)} of {feature}")
+
+
+def _project_array(array: pa.Array, tree: Optional[Dict]) -> pa.Array:
+    """Select nested fields without copying the data of the selected ones."""
+    if tree is None:
+        return array
+    mask = array.is_null() if array.null_count else None
+    if isinstance(array, (pa.ListArray, pa.LargeListArray)):
+        values = _project_array(array.values, tree)
+        if mask is None:
+            return type(array).from_arrays(array.offsets, values)
+        return type(array).from_arrays(array.offsets, values, mask=mask)
+    if isinstance(array, pa.StructArray):
+        names = [field.name for field in array.type if field.name in tree]
+        children = [_project_array(array.field(name), tree[name]) for name in names]
+        if mask is None:
+            return pa.StructArray.from_arrays(children, names=names)
+        return pa.StructArray.from_arrays(children, names=names, mask=mask)
+    raise ValueError(f"cannot select fields {sorted(tree)} of {array.type}")
+
+
+def _project_table(table: pa.Table, tree: Dict, schema: pa.Schema) -> pa.Table:
+    return pa.Table.from_arrays(
+        [
+            pa.chunked_array(
+                [_project_array(chunk, tree[name]) for chunk in table.column(name).chunks],
+                type=schema.field(name).type,
+            )
+            for name in table.column_names
+        ],
+        schema=schema,
+    )
+
+
+def project_columns(dataset, columns: List[str]):
+    """
+    Keep only some columns of a dataset (or dataset dict).
+
+    Nested fields are selected with dots, e.g. `passages.text` keeps the `text`
+    of each passage (and drops its `id`, `type` and `offsets`).
+    Top level columns are dropped without reading them, and the dataset stays memory-mapped
+    on its cache files. Selecting nested fields writes the selected columns to a new cache file
+    (once, it is reused by later calls like any `map`), which only holds the selected fields.
+    """
+    if isinstance(dataset, (datasets.IterableDataset, datasets.IterableDatasetDict)):
+        raise ValueError("column projection is only supported for non-streaming datasets")
+
+    if isinstance(dataset, datasets.DatasetDict):
+        return datasets.DatasetDict(
+            {split: project_columns(ds, columns) for split, ds in dataset.items()}
+        )
+
+    tree = _column_tree(columns)
+    features = _project_feature(dict(dataset.features), tree)
+    dataset = dataset.select_columns([name for name in dataset.column_names if name in features])
+    if all(subtree is None for subtree in tree.values()):
+        return dataset
+
+    features = datasets.Features({name: features[name] for name in dataset.column_names})
+    # the batches are projected as Arrow tables, i.e. without decoding them to Python
+    return (
+        dataset.with_format("arrow")
+        .map(
+            _project_table,
+            fn_kwargs={"tree": tree, "schema": features.arrow_schema},
+            batched=True,
+            features=features,
+            desc="Projecting columns",
+        )
+        .with_format(None)
+    )
+
+
 @dataclass
 class BigBioConfigHelper:
     """Metadata for one config of a dataset."""
@@ -432,13 +545,32 @@ class BigBioConfigHelper:
     def load_dataset(
         self,
         from_hub=True,
+        columns: Optional[List[str]] = None,
         **extra_load_dataset_kwargs,
     ):
+        """
+        Load the dataset, optionally keeping only `columns` (see `project_columns`).
+        """
         load_dataset_kwargs = self.get_load_dataset_kwargs(from_hub=from_hub)
-        return load_dataset(
+        dsd = load_dataset(
             **load_dataset_kwargs,
             **extra_load_dataset_kwargs,
         )
+        if columns is not None:
+            dsd = project_columns(dsd, columns)
+        return dsd
+
+    def load_text_view(self, from_hub=True, **extra_load_dataset_kwargs):
+        """
+        Load only the ids and text columns of a bigbio schema config (see `TEXT_VIEW_COLUMNS`).
+        """
+        if not self.is_bigbio_schema:
+            raise ValueError("only supported for bigbio schemas")
+        return self.load_dataset(
+            from_hub=from_hub,
+            columns=TEXT_VIEW_COLUMNS[self.config.schema],
+            **extra_load_dataset_kwargs,
+        )
 
     def get_metadata(self, **extra_load_dataset_kwargs):
         if not self.is_bigbio_schema:
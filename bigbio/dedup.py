@@ -0,0 +1,220 @@
+"""
+Near-duplicate detection with MinHash-LSH.
+
+Documents are shingled into word n-grams and summarized by MinHash signatures
+(`num_perm` values). Signatures are split into `num_bands` bands of
+`num_perm // num_bands` rows. Documents sharing a band are candidate
+duplicates, which are confirmed if the estimated Jaccard similarity of
+their shingles is at least `threshold`. The probability of two documents
+with Jaccard similarity `s` being candidates is `1 - (1 - s ** rows) ** num_bands`,
+i.e. the band setup should put the steep part of this curve (around
+`(1 / num_bands) ** (1 / rows)`) below `threshold`.
+
+Signatures are computed with `datasets.Dataset.map` (in parallel with `num_proc`)
+and stay in its memory-mapped cache files, so that millions of documents fit on one machine.
+"""
+import logging
+import zlib
+from typing import Dict, List, Optional
+
+import datasets
+import numpy as np
+import pyarrow as pa
+
+from bigbio.hashing import POLY, mix
+
+logger = logging.getLogger(__name__)
+
+
+def permutations(num_perm: int, seed: int = 0):
+    """Parameters `(a, b)` of the hash functions `(a * x + b) >> 32` (mod 2 ** 64) of the signatures."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def shingle_hashes(tokens: List[int], shingle_size: int) -> np.ndarray:
+    """Hashes of the word n-grams of a document given as token hashes."""
+    tokens = np.asarray(tokens, dtype=np.uint64)
+    if len(tokens) == 0:
+        return tokens
+    shingle_size = min(shingle_size, len(tokens))
+    num_shingles = len(tokens) - shingle_size + 1
+    hashes = tokens[:num_shingles].copy()
+    for i in range(1, shingle_size):
+        hashes = hashes * POLY + tokens[i : i + num_shingles]
+    return np.unique(mix(hashes))
+
+
+def minhash_signatures(texts: List[str], shingle_size: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    MinHash signatures (one row of `len(a)` values per text) of lowercased whitespace-separated word n-grams.
+
+    Texts without tokens get a signature of `2 ** 32 - 1` values (i.e. they are all duplicates of each other).
+    """  # noqa
+    token_hashes = {}
+    signatures = np.full((len(texts), len(a)), np.iinfo(np.uint32).max, dtype=np.uint32)
+    for i, text in enumerate(texts):
+        words = (text or "").lower().split()
+        for word in set(words).difference(token_hashes):
+            token_hashes[word] = zlib.crc32(word.encode("utf-8"))
+        shingles = shingle_hashes(list(map(token_hashes.__getitem__, words)), shingle_size)
+        if len(shingles) > 0:
+            hashes = (a[:, None] * shingles[None, :] + b[:, None]) >> np.uint64(32)
+            signatures[i] = hashes.min(axis=1)
+    return signatures
+
+
+def band_keys(signatures: np.ndarray, num_bands: int) -> np.ndarray:
+    """One hash per band of `len(signatures[0]) // num_bands` signature values."""
+    rows = signatures.shape[1] // num_bands
+    bands = signatures[:, : rows * num_bands].reshape(len(signatures), num_bands, rows).astype(np.uint64)
+    keys = np.zeros((len(signatures), num_bands), dtype=np.uint64)
+    for i in range(rows):
+        keys = mix(keys * POLY + bands[:, :, i])
+    return keys
+
+
+def arrow_map_batch_minhash(table, text_column, shingle_size, num_perm, num_bands, seed):
+    a, b = permutations(num_perm, seed)
+    signatures = minhash_signatures(table.column(text_column).to_pylist(), shingle_size, a, b)
+    keys = band_keys(signatures, num_bands)
+    return pa.table(
+        {
+            "signature": pa.FixedSizeListArray.from_arrays(pa.array(signatures.ravel()), num_perm),
+            "band_keys": pa.FixedSizeListArray.from_arrays(pa.array(keys.ravel()), num_bands),
+        }
+    )
+
+
+class _Rows:
+    """Rows of a fixed size list column, without copying memory-mapped chunks."""
+
+    def __init__(self, column: pa.ChunkedArray):
+        self.chunks = [
+            chunk.flatten().to_numpy().reshape(len(chunk), chunk.type.list_size)
+            for chunk in column.chunks
+            if len(chunk) > 0
+        ]
+        self.starts = np.cumsum([0] + [len(chunk) for chunk in self.chunks])
+
+    def __getitem__(self, indices: np.ndarray) -> np.ndarray:
+        chunk_ids = np.searchsorted(self.starts, indices, side="right") - 1
+        result = None
+        for chunk_id in np.unique(chunk_ids):
+            mask = chunk_ids == chunk_id
+            rows = self.chunks[chunk_id][indices[mask] - self.starts[chunk_id]]
+            if result is None:
+                result = np.empty((len(indices), rows.shape[1]), dtype=rows.dtype)
+            result[mask] = rows
+        return result
+
+    def column(self, i: int) -> np.ndarray:
+        return np.concatenate([chunk[:, i] for chunk in self.chunks])
+
+
+def _connected_components(num_nodes: int, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Label of each node, which is the smallest node of its component."""
+    labels = np.arange(num_nodes)
+    while True:
+        smallest = np.minimum(labels[sources], labels[targets])
+        updated = labels.copy()
+        np.minimum.at(updated, sources, smallest)
+        np.minimum.at(updated, targets, smallest)
+        # pointer jumping
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def find_duplicates(signatures: datasets.Dataset, threshold: float) -> np.ndarray:
+    """
+    Cluster documents given their signatures and band keys (see `compute_signatures`).
+
+    :return: label of each document, i.e. the index of the first document of its cluster
+    """
+    table = signatures.with_format("arrow")[:]
+    signature_rows = _Rows(table.column("signature"))
+    key_rows = _Rows(table.column("band_keys"))
+    num_bands = table.schema.field("band_keys").type.list_size
+
+    sources, targets = [], []
+    for band in range(num_bands):
+        keys = key_rows.column(band)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        is_start = np.ones(len(keys), dtype=bool)
+        is_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        # each document of a bucket is a candidate duplicate of the first one
+        first = order[np.maximum.accumulate(np.where(is_start, np.arange(len(keys)), 0))]
+        candidates = ~is_start
+        source, target = order[candidates], first[candidates]
+        if len(source) == 0:
+            continue
+        similarity = (signature_rows[source] == signature_rows[target]).mean(axis=1)
+        confirmed = similarity >= threshold
+        sources.append(source[confirmed])
+        targets.append(target[confirmed])
+        logger.info(f"band {band}: {len(source)} candidates, {confirmed.sum()} confirmed")
+
+    if not sources:
+        return np.arange(len(table))
+    return _connected_components(len(table), np.concatenate(sources), np.concatenate(targets))
+
+
+def compute_signatures(
+    dataset: datasets.Dataset,
+    text_column: str = "text",
+    shingle_size: int = 5,
+    num_perm: int = 128,
+    num_bands: int = 16,
+    seed: int = 0,
+    num_proc: Optional[int] = None,
+    **map_kwargs,
+) -> datasets.Dataset:
+    """Dataset with the `signature` and `band_keys` of each document."""
+    if num_perm % num_bands != 0:
+        raise ValueError(f"num_perm ({num_perm}) should be a multiple of num_bands ({num_bands})")
+    return (
+        dataset.remove_columns([col for col in dataset.column_names if col != text_column])
+        .with_format("arrow")
+        .map(
+            arrow_map_batch_minhash,
+            batched=True,
+            num_proc=num_proc,
+            fn_kwargs={
+                "text_column": text_column,
+                "shingle_size": shingle_size,
+                "num_perm": num_perm,
+                "num_bands": num_bands,
+                "seed": seed,
+            },
+            desc="MinHash",
+            **map_kwargs,
+        )
+        .with_format(None)
+    )
+
+
+def clusters_from_labels(labels: np.ndarray) -> Dict[int, List[int]]:
+    """Documents of each cluster with more than one document, keyed on the first document."""
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    sizes = np.diff(np.r_[starts, len(labels)])
+    return {
+        int(sorted_labels[start]): order[start : start + size].tolist()
+        for start, size in zip(starts, sizes)
+        if size > 1
+    }
+
+
+def deduplicated(dataset: datasets.Dataset, labels: np.ndarray) -> datasets.Dataset:
+    """View of a dataset with the first document of each cluster (`select` does not copy the data)."""
+    return dataset.select(np.flatnonzero(labels == np.arange(len(labels))))
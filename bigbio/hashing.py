@@ -0,0 +1,23 @@
+"""
+Vectorized 64 bit hashing of token sequences, shared by the near-duplicate detection (`bigbio.dedup`)
+and the n-gram counting of the demo (`streamlit_demo/ngram.py`).
+
+A sequence of token hashes is combined with a polynomial rolling hash (`h * POLY + token`, mod 2 ** 64)
+and the result is scrambled with `mix`, so that sequences sharing a prefix get unrelated hashes.
+"""
+import numpy as np
+
+# multiplier of the polynomial rolling hash (the 64 bit FNV prime)
+POLY = np.uint64(0x100000001B3)
+
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def mix(x: np.ndarray) -> np.ndarray:
+    """Scramble 64 bit hashes with the splitmix64 finalizer."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * _MIX_1
+    x = x ^ (x >> np.uint64(27))
+    x = x * _MIX_2
+    return x ^ (x >> np.uint64(31))
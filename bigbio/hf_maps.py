@@ -2,6 +2,11 @@
 Functions to be used with the datasets map function
 * https://huggingface.co/docs/datasets/main/en/nlp_process#map
 """
+import datasets
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
 
 def text_from_kb(passages):
     return " ".join([t for p in passages for t in p["text"]])
@@ -110,3 +115,120 @@ BATCH_MAPPERS_TEXT_FROM_SCHEMA = {
     "qa": map_batch_text_from_qa,
     "t2t": map_batch_text_from_t2t,
 }
+
+
+"""
+Arrow versions of the batch mappers above
+* they operate on pyarrow tables (i.e. datasets formatted with `with_format("arrow")`)
+* they only read the columns in TEXT_COLUMNS_FROM_SCHEMA and return a table with a single `text` column
+* they produce the same strings, use `map_text_from_schema` to apply them
+"""
+
+def _arrow_array(column):
+    if isinstance(column, pa.ChunkedArray):
+        return column.combine_chunks()
+    return column
+
+def _list_offsets(list_array):
+    lengths = pc.fill_null(pc.list_value_length(list_array), 0).to_numpy(zero_copy_only=False)
+    return np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+
+def arrow_text_from_kb(passages):
+    passages = _arrow_array(passages)
+    texts = pc.struct_field(passages.flatten(), "text")
+    # offsets of the passage texts of each example in the flat array of passage texts
+    offsets = _list_offsets(texts)[_list_offsets(passages)]
+    texts_by_example = pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), texts.flatten())
+    return pc.binary_join(texts_by_example, " ")
+
+def arrow_map_batch_text_from_kb(table):
+    return pa.table({"text": arrow_text_from_kb(table.column("passages"))})
+
+
+def arrow_map_batch_text_from_te(table):
+    return pa.table({
+        "text": pc.binary_join_element_wise(table.column("premise"), table.column("hypothesis"), " ")
+    })
+
+
+def arrow_map_batch_text_from_pairs(table):
+    return pa.table({
+        "text": pc.binary_join_element_wise(table.column("text_1"), table.column("text_2"), " ")
+    })
+
+
+def arrow_map_batch_text_from_t2t(table):
+    return pa.table({"text": table.column("text_1")})
+
+
+def arrow_map_batch_text_from_text(table):
+    return pa.table({"text": table.column("text")})
+
+
+def arrow_map_batch_text_from_qa(table):
+    # str.format writes missing values as "None"
+    return pa.table({
+        "text": pc.binary_join_element_wise(
+            pc.fill_null(table.column("question"), "None"),
+            pc.fill_null(table.column("type"), "None"),
+            pc.binary_join(table.column("choices"), " "),
+            pc.fill_null(table.column("context"), "None"),
+            pc.binary_join(table.column("answer"), " "),
+            " ",
+        )
+    })
+
+
+ARROW_BATCH_MAPPERS_TEXT_FROM_SCHEMA = {
+    "kb": arrow_map_batch_text_from_kb,
+    "te": arrow_map_batch_text_from_te,
+    "pairs": arrow_map_batch_text_from_pairs,
+    "text": arrow_map_batch_text_from_text,
+    "qa": arrow_map_batch_text_from_qa,
+    "t2t": arrow_map_batch_text_from_t2t,
+}
+
+TEXT_COLUMNS_FROM_SCHEMA = {
+    "kb": ["passages"],
+    "te": ["premise", "hypothesis"],
+    "pairs": ["text_1", "text_2"],
+    "text": ["text"],
+    "qa": ["question", "type", "choices", "context", "answer"],
+    "t2t": ["text_1"],
+}
+
+
+def map_text_from_schema(dataset, schema, remove_columns=None, **map_kwargs):
+    """
+    Add a `text` column to a dataset (or dataset dict) in a bigbio schema,
+    like `dataset.map(BATCH_MAPPERS_TEXT_FROM_SCHEMA[schema], batched=True)`
+    but using the Arrow mappers. Streaming datasets fall back to the python mappers.
+    """
+    if isinstance(dataset, (datasets.IterableDataset, datasets.IterableDatasetDict)):
+        return dataset.map(
+            BATCH_MAPPERS_TEXT_FROM_SCHEMA[schema],
+            batched=True,
+            remove_columns=remove_columns,
+            **map_kwargs,
+        )
+
+    if isinstance(dataset, datasets.DatasetDict):
+        return datasets.DatasetDict({
+            split: map_text_from_schema(ds, schema, remove_columns=remove_columns, **map_kwargs)
+            for split, ds in dataset.items()
+        })
+
+    remove_columns = set(remove_columns or []) | {"text"}
+    if schema == "text":
+        # the text is already there
+        return dataset.remove_columns([col for col in dataset.column_names if col in remove_columns - {"text"}])
+
+    text_columns = TEXT_COLUMNS_FROM_SCHEMA[schema]
+    texts = (
+        dataset.remove_columns([col for col in dataset.column_names if col not in text_columns])
+        .with_format("arrow")
+        .map(ARROW_BATCH_MAPPERS_TEXT_FROM_SCHEMA[schema], batched=True, **map_kwargs)
+        .with_format(None)
+    )
+    dataset = dataset.remove_columns([col for col in dataset.column_names if col in remove_columns])
+    return datasets.concatenate_datasets([dataset, texts], axis=1)
@@ -1,30 +1,242 @@
 """
 Pull all files from HF Hub repos to local
 
-A bit hacky
-Clones all the repos using git and then removes the hidden git folders.
+Each repo is fetched (shallow, and incrementally after the first time) into a bare git
+repository of a cache directory, and only the local files whose content differs from
+the fetched tree are written. Local files which are not in the repo (e.g. deleted from it) are
+deleted and logged, unless `--keep_local` is passed. Repos are mirrored concurrently.
+
+The `.gitattributes` of the Hub repos are not mirrored, and LFS files are mirrored as pointers.
 
 You can do this with the HF Hub Client
 https://huggingface.co/docs/huggingface_hub/package_reference/file_download
 but it will put the files in the cache.
-"""
 
+    python -m bigbio.hub.clone_all_hub_repos --num_workers 8
+
+For tests, `--url_base` can point to a directory of (bare) git repositories, e.g. `file:///tmp/hub`.
+"""
+import argparse
+import logging
 import os
 import subprocess
-from bigbio.hub.hubtools import list_datasets, HF_DATASETS_URL_BASE, HF_ORG
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from bigbio.hub.hubtools import HF_DATASETS_URL_BASE, HF_ORG, list_datasets
+from bigbio.hub.sync_hub_repos import HUB_REPOS_DIR, IGNORED_DIRS, IGNORED_SUFFIXES, git_blob_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "bigbio" / "hub_git"
+
+# ref of the last fetched commit in each bare repository
+MIRROR_REF = "refs/mirror/head"
+
+EXCLUDED_FILES = {".gitattributes"}
+
+
+def _git(*args: str, input: Optional[bytes] = None) -> bytes:
+    return subprocess.run(["git", *args], input=input, capture_output=True, check=True).stdout
+
+
+def fetch(repo_url: str, git_dir: Path):
+    """Shallow fetch of the default branch of a repo into a bare repository."""
+    if not (git_dir / "HEAD").exists():
+        _git("init", "--quiet", "--bare", str(git_dir))
+    _git("--git-dir", str(git_dir), "fetch", "--quiet", "--depth", "1", repo_url, f"+HEAD:{MIRROR_REF}")
+
+
+def tree_blobs(git_dir: Path) -> Dict[str, str]:
+    """Blob ids of the files of the fetched tree keyed on their path."""
+    blobs = {}
+    for entry in _git("--git-dir", str(git_dir), "ls-tree", "-r", "-z", MIRROR_REF).split(b"\0"):
+        if not entry:
+            continue
+        info, path = entry.split(b"\t", 1)
+        mode, object_type, blob_id = info.decode().split()
+        path = path.decode("utf-8")
+        # skip submodules and symlinks
+        if object_type == "blob" and mode != "120000" and Path(path).name not in EXCLUDED_FILES:
+            blobs[path] = blob_id
+    return blobs
+
+
+def read_blobs(git_dir: Path, blob_ids: Iterable[str]) -> Dict[str, bytes]:
+    """Contents of blobs, read with a single git process."""
+    blob_ids = list(dict.fromkeys(blob_ids))
+    if not blob_ids:
+        return {}
+    output = _git("--git-dir", str(git_dir), "cat-file", "--batch", input="".join(f"{b}\n" for b in blob_ids).encode())
+    contents = {}
+    position = 0
+    for blob_id in blob_ids:
+        header_end = output.index(b"\n", position)
+        _, _, size = output[position:header_end].decode().split()
+        start = header_end + 1
+        contents[blob_id] = output[start : start + int(size)]
+        position = start + int(size) + 1
+    return contents
+
+
+def _local_paths(local_dir: Path) -> List[str]:
+    paths = []
+    for path in local_dir.rglob("*"):
+        relative = path.relative_to(local_dir)
+        if path.is_file() and not IGNORED_DIRS.intersection(relative.parts) and path.suffix not in IGNORED_SUFFIXES:
+            paths.append(relative.as_posix())
+    return paths
+
+
+def mirror_repo(repo_url: str, local_dir: Path, git_dir: Path, keep_local: bool = False) -> Dict:
+    """
+    Fetch a repo and update the files of `local_dir` that changed.
+
+    :param keep_local: keep the local files which are not in the repo, instead of deleting them
+    """  # noqa
+    start = time.perf_counter()
+    fetch(repo_url, git_dir)
+    blobs = tree_blobs(git_dir)
+
+    changed = [
+        path for path, blob_id in blobs.items()
+        if not (local_dir / path).is_file() or git_blob_id(local_dir / path) != blob_id
+    ]
+    contents = read_blobs(git_dir, [blobs[path] for path in changed])
+    for path in changed:
+        local_path = local_dir / path
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = local_path.with_name(local_path.name + ".tmp")
+        tmp_path.write_bytes(contents[blobs[path]])
+        os.replace(tmp_path, local_path)
+
+    local_only = [path for path in _local_paths(local_dir) if path not in blobs]
+    if keep_local:
+        for path in local_only:
+            logger.info(f"{local_dir.name}: keeping {path}, which is not in the repo")
+        deleted = []
+    else:
+        deleted = local_only
+    for path in deleted:
+        logger.warning(f"{local_dir.name}: deleting {path}, which is not in the repo")
+        (local_dir / path).unlink()
+        # remove directories left empty
+        for parent in (local_dir / path).parents:
+            if parent == local_dir or any(parent.iterdir()):
+                break
+            parent.rmdir()
+
+    return {
+        "status": "updated" if changed or deleted else "unchanged",
+        "written": changed,
+        "deleted": deleted,
+        "kept": local_only if keep_local else [],
+        "duration": time.perf_counter() - start,
+    }
+
+
+def mirror(
+    dataset_names: Optional[List[str]] = None,
+    output_dir: Path = HUB_REPOS_DIR,
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    url_base: str = HF_DATASETS_URL_BASE,
+    num_workers: int = 8,
+    keep_local: bool = False,
+) -> List[Dict]:
+    """
+    Mirror hub repos to `output_dir/<dataset name>`.
+
+    :param dataset_names: datasets to mirror (default is all datasets of the Hub organization)
+    :param url_base: base URL of the repos, i.e. repos are at `<url_base>/<org>/<dataset name>`
+    :param keep_local: keep the local files which are not in the repos, instead of deleting them
+    """  # noqa
+    if dataset_names is None:
+        dataset_names = [ds_info.id.replace(HF_ORG + "/", "") for ds_info in list_datasets()]
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    with ThreadPoolExecutor(max(num_workers, 1)) as executor:
+        futures = {
+            executor.submit(
+                mirror_repo,
+                f"{url_base}/{HF_ORG}/{dataset_name}",
+                output_dir / dataset_name,
+                cache_dir / f"{dataset_name}.git",
+                keep_local,
+            ): dataset_name
+            for dataset_name in dataset_names
+        }
+        for future in as_completed(futures):
+            dataset_name = futures[future]
+            try:
+                result = future.result()
+            except subprocess.CalledProcessError as err:
+                result = {"status": "failed", "error": err.stderr.decode(errors="replace").strip()}
+            except Exception as err:
+                result = {"status": "failed", "error": repr(err)}
+            result["dataset_name"] = dataset_name
+            if result["status"] == "failed":
+                logger.error(f"{dataset_name}: {result['error']}")
+            elif result["status"] == "updated":
+                logger.info(
+                    f"{dataset_name}: {len(result['written'])} written, {len(result['deleted'])} deleted "
+                    f"({result['duration']:.1f}s)"
+                )
+            results.append(result)
 
+    return sorted(results, key=lambda result: result["dataset_name"])
 
-ds_infos = list_datasets()
-for ds_info in ds_infos:
 
-    ds_name = ds_info.id.replace(HF_ORG+"/", "")
-    local_path = os.path.join("hub_repos", ds_name)
-    print(local_path)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
 
-    repo_url = os.path.join(HF_DATASETS_URL_BASE, ds_info.id)
-    print(repo_url)
+    parser = argparse.ArgumentParser(description="Mirror the files of the Hub dataset repos locally.")
+    parser.add_argument(
+        "dataset_names",
+        nargs="*",
+        help="Datasets to mirror (default is all datasets of the Hub organization)",
+    )
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        default=str(HUB_REPOS_DIR),
+        help=f"Directory of the local repos (default is {HUB_REPOS_DIR})",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default=str(DEFAULT_CACHE_DIR),
+        help=f"Directory of the fetched git repositories (default is {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--url_base",
+        type=str,
+        default=HF_DATASETS_URL_BASE,
+        help=f"Base URL of the repos (default is {HF_DATASETS_URL_BASE})",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=8,
+        help="Number of repos mirrored concurrently (default is 8)",
+    )
+    parser.add_argument(
+        "--keep_local",
+        action="store_true",
+        help="Keep the local files which are not in the Hub repos (default is to delete them)",
+    )
+    args = parser.parse_args()
 
-    subprocess.run(["rm", "-rf", local_path])
-    subprocess.run(["git", "clone", repo_url, local_path])
-    subprocess.run(["rm", "-rf", os.path.join(local_path, ".git")])
-    subprocess.run(["rm", "-f", os.path.join(local_path, ".gitattributes")])
+    results = mirror(
+        dataset_names=args.dataset_names or None,
+        output_dir=Path(args.output_dir),
+        cache_dir=Path(args.cache_dir),
+        url_base=args.url_base,
+        num_workers=args.num_workers,
+        keep_local=args.keep_local,
+    )
+    counts = Counter(result["status"] for result in results)
+    logger.info(f"Results: {dict(counts)}")
@@ -1,41 +1,347 @@
-import json
+"""
+Check that every config of the Hub datasets loads.
+
+Each config is loaded (`load_dataset`) in a separate worker process, which is killed (with its
+children) when it exceeds a timeout or a memory limit (resident set size of its process group).
+The configs of each repo are listed in worker processes too, with their own timeout.
+Configs are checked in parallel, and results are appended to a JSON-lines log as they complete,
+with their status ("works", "error", "timeout", "memory" or "local"), load duration and number
+of rows per split. Configs already in the log are not checked again, so an interrupted run resumes
+where it stopped.
 
-from datasets import load_dataset
-from datasets import get_dataset_config_names
-from huggingface_hub import get_repo_discussions
+At the end, `errors.json` and `works.json` summarize the latest result of each config.
+
+    python -m bigbio.hub.collect_errors --num_workers 4 --timeout 3600 --max_rss_mb 16000
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from bigbio.hub.hubtools import list_datasets
 
+logger = logging.getLogger(__name__)
 
-ds_infos = list_datasets()
+REPO_ROOT = Path(__file__).resolve().parents[2]
 
-prs = {}
-errors = {}
-works = {}
+# number of output lines of the worker kept in the log for failed configs
+OUTPUT_TAIL = 20
 
-for ds_info in ds_infos:
-    print(ds_info)
-    ds_configs = get_dataset_config_names(ds_info.id)
-    print(ds_configs)
-    discussions = list(get_repo_discussions(repo_id=ds_info.id, repo_type="dataset"))
-    prs[ds_info.id] = discussions
-    print()
-    for config in ds_configs:
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def list_configs(repo_id: str) -> List[str]:
+    from datasets import get_dataset_config_names
+
+    configs = get_dataset_config_names(repo_id)
+    if repo_id == "bigbio/pubtator_central":
+        configs = [config for config in configs if config == "pubtator_central_sample_source"]
+    return configs
+
+
+def check_list_configs(repo_id: str) -> Dict:
+    """List the configs of a repo (in the current process)."""
+    start = time.perf_counter()
+    try:
+        configs = list_configs(repo_id)
+    except BaseException as oops:
+        return {
+            "status": "error",
+            "duration": time.perf_counter() - start,
+            "message": str(oops),
+            "traceback": traceback.format_exc(),
+        }
+    return {"status": "works", "duration": time.perf_counter() - start, "configs": configs}
 
-        if (
-                ds_info.id == "bigbio/pubtator_central" and
-                config != "pubtator_central_sample_source"
-        ):
-            continue
 
+def check_config(repo_id: str, config_name: str) -> Dict:
+    """Load a config (in the current process) and count the rows of its splits."""
+    from datasets import load_dataset
+
+    start = time.perf_counter()
+    try:
+        dsd = load_dataset(repo_id, name=config_name)
+    except BaseException as oops:
+        status = "local" if "This is a local dataset" in str(oops) else "error"
+        return {
+            "status": status,
+            "duration": time.perf_counter() - start,
+            "message": str(oops),
+            "traceback": traceback.format_exc(),
+        }
+    return {
+        "status": "works",
+        "duration": time.perf_counter() - start,
+        "num_rows": {split: ds.num_rows for split, ds in dsd.items()},
+    }
+
+
+def group_rss(pgid: int) -> int:
+    """Resident set size in bytes of all processes of a process group (0 without `/proc`)."""
+    rss = 0
+    for stat_path in Path("/proc").glob("[0-9]*/stat"):
         try:
-            dsd = load_dataset(ds_info.id, name=config)
-            works[(ds_info.id, config)] = "works"
-        except BaseException as oops:
-            if 'This is a local dataset' in str(oops):
+            # fields after the command name, which may contain spaces
+            fields = stat_path.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[2]) == pgid:
+            rss += int(fields[21]) * PAGE_SIZE
+    return rss
+
+
+def run_worker(
+    worker_args: List[str],
+    timeout: float,
+    max_rss_mb: Optional[float],
+    poll_interval: float = 1.0,
+) -> Tuple[Dict, int, List[str]]:
+    """
+    Run a worker of this module in a separate process, killing it (and its children) on timeout or when
+    its memory exceeds `max_rss_mb`.
+
+    :return: result of the worker, peak resident set size in bytes and output lines of the worker
+    """  # noqa
+    start = time.perf_counter()
+    peak_rss = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result_path = Path(tmp_dir) / "result.json"
+        # output goes to a file so that the worker never blocks on a full pipe while it is polled
+        with open(Path(tmp_dir) / "output.log", "w+") as output:
+            process = subprocess.Popen(
+                [sys.executable, "-m", "bigbio.hub.collect_errors", *worker_args, str(result_path)],
+                cwd=REPO_ROOT,
+                stdout=output,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+            status = None
+            while process.poll() is None:
+                peak_rss = max(peak_rss, group_rss(process.pid))
+                if time.perf_counter() - start > timeout:
+                    status = "timeout"
+                elif max_rss_mb is not None and peak_rss > max_rss_mb * 2**20:
+                    status = "memory"
+                if status is not None:
+                    os.killpg(process.pid, signal.SIGKILL)
+                    process.wait()
+                    break
+                try:
+                    process.wait(timeout=poll_interval)
+                except subprocess.TimeoutExpired:
+                    pass
+            output.seek(0)
+            lines = output.read().splitlines()
+
+        if status is None and result_path.exists():
+            with open(result_path) as fp:
+                result = json.load(fp)
+        elif status == "timeout":
+            result = {"status": status, "message": f"Timed out after {timeout}s"}
+        elif status == "memory":
+            result = {"status": status, "message": f"Exceeded {max_rss_mb} MB of resident memory"}
+        else:
+            result = {"status": "error", "message": f"Exited with code {process.returncode}"}
+        result.setdefault("duration", time.perf_counter() - start)
+
+    return result, peak_rss, lines
+
+
+def run_list_configs(repo_id: str, timeout: float) -> List[str]:
+    """List the configs of a repo in a separate process, killing it on timeout."""
+    result, _, lines = run_worker(["--list_worker", repo_id], timeout, max_rss_mb=None)
+    if result["status"] != "works":
+        raise RuntimeError("\n".join([result["message"], *lines[-OUTPUT_TAIL:]]))
+    return result["configs"]
+
+
+def run_config(
+    repo_id: str,
+    config_name: str,
+    timeout: float,
+    max_rss_mb: Optional[float],
+    poll_interval: float = 1.0,
+) -> Dict:
+    """
+    Check a config in a separate process, killing it (and its children) on timeout or when
+    its memory exceeds `max_rss_mb`.
+    """  # noqa
+    start = time.perf_counter()
+    result, peak_rss, lines = run_worker(["--worker", repo_id, config_name], timeout, max_rss_mb, poll_interval)
+
+    if result["status"] not in ("works", "local"):
+        result["output"] = "\n".join(lines[-OUTPUT_TAIL:])
+    result.update(
+        {
+            "repo_id": repo_id,
+            "config_name": config_name,
+            "wall_time": time.perf_counter() - start,
+            "peak_rss_mb": peak_rss / 2**20,
+            "timestamp": time.time(),
+        }
+    )
+    return result
+
+
+def load_log(path: Path) -> Dict[Tuple[str, str], Dict]:
+    """Latest result of each config in the log (a truncated last line is ignored)."""
+    results = {}
+    if path.exists():
+        with open(path) as fp:
+            for line in fp:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                results[(result["repo_id"], result["config_name"])] = result
+    return results
+
+
+def collect(
+    log_path: Path,
+    repo_ids: Optional[List[str]] = None,
+    num_workers: int = 4,
+    timeout: float = 3600,
+    max_rss_mb: Optional[float] = None,
+    retry: Tuple[str, ...] = (),
+    list_timeout: float = 600,
+) -> Dict[Tuple[str, str], Dict]:
+    """
+    Check all configs missing from the log (or whose logged status is in `retry`).
+
+    :return: latest result of each config in the log
+    """  # noqa
+    if repo_ids is None:
+        repo_ids = [ds_info.id for ds_info in list_datasets()]
+    done = load_log(log_path)
+
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max(num_workers, 1)) as executor:
+
+        # listed in worker processes as well: loading dataset scripts in threads of one process is not safe
+        listings = {executor.submit(run_list_configs, repo_id, list_timeout): repo_id for repo_id in repo_ids}
+        to_run = []
+        for future in as_completed(listings):
+            repo_id = listings[future]
+            try:
+                configs = future.result()
+            except Exception as err:
+                logger.error(f"{repo_id}: could not list configs: {err}")
                 continue
-            errors[(ds_info.id, config)] = oops
+            to_run.extend(
+                (repo_id, config_name)
+                for config_name in configs
+                if (repo_id, config_name) not in done or done[(repo_id, config_name)]["status"] in retry
+            )
+        to_run.sort()
+        logger.info(f"Checking {len(to_run)} configs ({len(done)} in {log_path}) with {num_workers} workers")
+
+        with open(log_path, "a") as log:
+            futures = {
+                executor.submit(run_config, repo_id, config_name, timeout, max_rss_mb): (repo_id, config_name)
+                for repo_id, config_name in to_run
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                log.write(json.dumps(result) + "\n")
+                log.flush()
+                done[futures[future]] = result
+                logger.info(
+                    f"{result['config_name']}: {result['status']} "
+                    f"({result['wall_time']:.1f}s, {result['peak_rss_mb']:.0f} MB)"
+                )
+
+    return done
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) == 5 and sys.argv[1] == "--worker":
+        _, _, repo_id, config_name, result_path = sys.argv
+        result = check_config(repo_id, config_name)
+        with open(result_path, "w") as fp:
+            json.dump(result, fp)
+        sys.exit(0)
+
+    if len(sys.argv) == 4 and sys.argv[1] == "--list_worker":
+        _, _, repo_id, result_path = sys.argv
+        result = check_list_configs(repo_id)
+        with open(result_path, "w") as fp:
+            json.dump(result, fp)
+        sys.exit(0)
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Check that every config of the Hub datasets loads.")
+    parser.add_argument(
+        "--repo_ids",
+        nargs="*",
+        help="Only check these repos, e.g. bigbio/bc5cdr (default is all datasets of the Hub organization)",
+    )
+    parser.add_argument(
+        "--log_path",
+        type=str,
+        default="collect_errors.jsonl",
+        help="JSON-lines log of results, which is resumed if it exists (default is collect_errors.jsonl)",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=4,
+        help="Number of configs checked in parallel (default is 4)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=3600,
+        help="Timeout in seconds for loading a single config (default is 3600)",
+    )
+    parser.add_argument(
+        "--list_timeout",
+        type=float,
+        default=600,
+        help="Timeout in seconds for listing the configs of a single repo (default is 600)",
+    )
+    parser.add_argument(
+        "--max_rss_mb",
+        type=float,
+        help="Memory limit in MB for loading a single config (default is no limit)",
+    )
+    parser.add_argument(
+        "--retry",
+        nargs="*",
+        default=[],
+        choices=["error", "timeout", "memory"],
+        help="Check again the configs logged with these statuses",
+    )
+    args = parser.parse_args()
+
+    results = collect(
+        Path(args.log_path),
+        repo_ids=args.repo_ids or None,
+        num_workers=args.num_workers,
+        timeout=args.timeout,
+        max_rss_mb=args.max_rss_mb,
+        retry=tuple(args.retry),
+        list_timeout=args.list_timeout,
+    )
 
+    errors = {"|".join(k): v["message"] for k, v in results.items() if v["status"] not in ("works", "local")}
+    works = {"|".join(k): "works" for k, v in results.items() if v["status"] == "works"}
+    with open("errors.json", "w") as fp:
+        json.dump(errors, fp, indent=4)
+    with open("works.json", "w") as fp:
+        json.dump(works, fp, indent=4)
 
-json.dump({"|".join(k): str(v) for k,v in errors.items()}, open("errors.json", "w"), indent=4)
-json.dump({"|".join(k): str(v) for k,v in works.items()}, open("works.json", "w"), indent=4)
+    counts = Counter(result["status"] for result in results.values())
+    logger.info(f"Results: {dict(counts)}")
@@ -15,11 +15,11 @@
 
 import json
 import os
-import xml.etree.ElementTree as ET
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List
 
 import datasets
+from lxml import etree
 
 from .bigbiohub import text_features
 from .bigbiohub import BigBioConfig
@@ -68,6 +68,9 @@ _SUPPORTED_TASKS = [Tasks.TEXT_CLASSIFICATION]
 _SOURCE_VERSION = "1.0.0"
 _BIGBIO_VERSION = "1.0.0"
 
+# part of the key of memoized article bodies, bump it whenever `_parse_body_text` changes
+_BODY_TEXT_VERSION = "1"
+
 
 @dataclass
 class BioASQTaskC2017BigBioConfig(BigBioConfig):
@@ -146,32 +149,40 @@ class BioASQTaskC2017(datasets.GeneratorBasedBuilder):
         else:
             data_dir = self.config.data_dir
 
+        # parsed article bodies are memoized next to the downloads and shared across builds
+        downloads_dir = dl_manager.download_config.cache_dir or datasets.config.DOWNLOADED_DATASETS_PATH
+        text_cache_dir = os.path.join(downloads_dir, _DATASETNAME, "body_text")
+
         return [
             datasets.SplitGenerator(
                 name=datasets.Split.TRAIN,
                 gen_kwargs={
-                    "filepath": os.path.join(data_dir, "taskCTrainingData2017.json"),
+                    "articles": self._load_articles(os.path.join(data_dir, "taskCTrainingData2017.json")),
                     "filespath": os.path.join(data_dir, "Train_Text"),
+                    "text_cache_dir": text_cache_dir,
                     "split": "train",
                 },
             ),
             datasets.SplitGenerator(
                 name=datasets.Split.TEST,
                 gen_kwargs={
-                    "filepath": os.path.join(data_dir, "taskc_golden2.json"),
+                    "articles": self._load_articles(os.path.join(data_dir, "taskc_golden2.json")),
                     "filespath": os.path.join(data_dir, "Final_Text"),
+                    "text_cache_dir": text_cache_dir,
                     "split": "test",
                 },
             ),
         ]
 
-    def _generate_examples(self, filepath, filespath, split):
-
+    def _load_articles(self, filepath: str) -> List[Dict]:
+        # a list of articles is sharded across workers when loading with `num_proc`
         with open(filepath) as f:
-            task_data = json.load(f)
+            return json.load(f)["articles"]
+
+    def _generate_examples(self, articles, filespath, text_cache_dir, split):
 
         if self.config.schema == "source":
-            for article in task_data["articles"]:
+            for article in articles:
 
                 with open(filespath + "/" + article["pmcid"] + ".xml") as f:
                     text = f.read()
@@ -190,27 +201,13 @@ class BioASQTaskC2017(datasets.GeneratorBasedBuilder):
 
         elif self.config.schema == "bigbio_text":
 
-            for article in task_data["articles"]:
+            # memos are keyed on the path relative to the data dir, e.g. `Train_Text/<pmcid>.xml`
+            text_cache_dir = os.path.join(text_cache_dir, os.path.basename(filespath))
+            os.makedirs(text_cache_dir, exist_ok=True)
 
-                with open(filespath + "/" + article["pmcid"] + ".xml") as f:
-                    xml_string = f.read()
+            for article in articles:
 
-                try:
-                    article_body = ET.fromstring(xml_string).find("./article/body")
-                except ET.ParseError:
-
-                    # PubMed XML might not contain namespace which results in parse error, add manually
-                    xml_string = xml_string.replace(
-                        "</pmc-articleset>",
-                        # xlink namespace
-                        '<article xmlns:xlink="http://www.w3.org/1999/xlink"'  # mml namespace
-                        ' xmlns:mml="http://www.w3.org/1998/Math/MathML"'
-                        ' article-type="research-article">',
-                    )
-                    xml_string = xml_string + "</article></pmc-articleset>"
-                    article_body = ET.fromstring(xml_string).find("./article/body")
-
-                text = ET.tostring(article_body, encoding="utf8", method="text")
+                text = self._get_body_text(filespath + "/" + article["pmcid"] + ".xml", text_cache_dir)
 
                 yield article["pmid"], {
                     "text": text,
@@ -218,3 +215,75 @@ class BioASQTaskC2017(datasets.GeneratorBasedBuilder):
                     "document_id": article["pmid"],
                     "labels": [grant["agency"] for grant in article["grantList"]],
                 }
+
+    def _get_body_text(self, xml_path: str, text_cache_dir: str) -> str:
+        """
+        Get the body text of an article, memoized on disk by file name, size, modification time
+        and version of the body parser. `text_cache_dir` is specific to the directory of the file.
+        """
+        stat = os.stat(xml_path)
+        memo_path = os.path.join(
+            text_cache_dir,
+            f"{os.path.basename(xml_path)}.{stat.st_size}.{stat.st_mtime_ns}.v{_BODY_TEXT_VERSION}.txt",
+        )
+
+        if os.path.exists(memo_path):
+            with open(memo_path, encoding="utf-8", newline="") as f:
+                return f.read()
+
+        text = self._parse_body_text(xml_path)
+
+        # write under a temporary name, workers may parse the same article concurrently
+        tmp_path = f"{memo_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        os.replace(tmp_path, memo_path)
+
+        return text
+
+    def _parse_body_text(self, xml_path: str) -> str:
+        """
+        Extract the text of `./article/body` with an incremental parser which stops right after the body,
+        so that back matter (e.g. references) is never parsed.
+        The parser recovers from errors, e.g. PubMed XML using namespace prefixes without declaring them.
+        """
+        body = None
+        body_complete = False
+
+        with open(xml_path, "rb") as f:
+
+            # only events of these tags reach python, the rest of the document is handled by the parser
+            events = etree.iterparse(
+                f,
+                events=("start", "end"),
+                tag=("article", "body", "back"),
+                recover=True,
+                huge_tree=True,
+            )
+
+            for event, elem in events:
+
+                # the tail of the body is only known once the parser moved past it
+                if body_complete:
+                    break
+
+                if event == "start":
+                    if body is None and elem.tag == "body" and self._is_article_body(elem):
+                        body = elem
+
+                elif elem is body:
+                    body_complete = True
+
+        if body is None:
+            raise ValueError(f"No article body found in {xml_path}")
+
+        return etree.tostring(body, encoding="unicode", method="text", with_tail=True)
+
+    @staticmethod
+    def _is_article_body(elem) -> bool:
+        # same element as `./article/body` relative to the root
+        article = elem.getparent()
+        if article is None or article.tag != "article":
+            return False
+        root = article.getparent()
+        return root is not None and root.getparent() is None
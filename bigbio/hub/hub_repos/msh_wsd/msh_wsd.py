@@ -29,7 +29,6 @@ Note from the Author how to load dataset:
 2) Set kwarg data_dir to the directory containing MSHCorpus.zip
 """
 
-import itertools as it
 import os
 import re
 from dataclasses import dataclass
@@ -84,6 +83,11 @@ _SOURCE_VERSION = "1.0.0"
 
 _BIGBIO_VERSION = "1.0.0"
 
+# an instance is `pmid,"citation",label`; the citation may itself contain commas,
+# so the label is anchored to the end of the line
+_ARFF_INSTANCE = re.compile(r"([0-9]+),(.*),(M[0-9]+)$")
+_AMBIGUOUS_WORD = re.compile("(?<=(<e>)).+(?=(</e>))")
+
 
 @dataclass
 class MshWsdBigBioConfig(BigBioConfig):
@@ -97,8 +101,6 @@ class MshWsdBigBioConfig(BigBioConfig):
 class MshWsdDataset(datasets.GeneratorBasedBuilder):
     """Biomedical Word Sense Disambiguation (WSD)."""
 
-    uid = it.count(0)
-
     SOURCE_VERSION = datasets.Version(_SOURCE_VERSION)
     BIGBIO_VERSION = datasets.Version(_BIGBIO_VERSION)
 
@@ -164,33 +166,33 @@ class MshWsdDataset(datasets.GeneratorBasedBuilder):
                 os.path.join(self.config.data_dir, "MSHCorpus.zip")
             )
 
+        data_dir = Path(data_dir) / "MSHCorpus"
+
         return [
             datasets.SplitGenerator(
                 name=datasets.Split.TRAIN,
                 gen_kwargs={
-                    "data_dir": Path(data_dir),
+                    "concepts_file": data_dir / "benchmark_mesh.txt",
+                    # a list of files is sharded across workers when loading with `num_proc`
+                    "data_files": sorted(data_dir.glob("*arff")),
                 },
             ),
         ]
 
-    def _generate_examples(self, data_dir: Path) -> Tuple[int, Dict]:
+    def _generate_examples(self, concepts_file: Path, data_files: List[Path]) -> Tuple[int, Dict]:
         """Yields examples as (key, example) tuples."""
-        data_dir = data_dir / "MSHCorpus"
-        concepts = data_dir / "benchmark_mesh.txt"
-        with concepts.open() as f:
-            concepts = f.readlines()
-        concepts = [x.strip().split("\t") for x in concepts]
+        with concepts_file.open() as f:
+            concepts = [line.strip().split("\t") for line in f]
 
         concept_map = {
             cuis[0]: {f"M{num}": cui for num, cui in enumerate(cuis[1:], 1)}
             for cuis in concepts
         }
 
-        files = list(data_dir.glob("*arff"))
-        for guid, file in enumerate(files):
+        for file in data_files:
             if self.config.schema == "source":
                 for example in self._parse_document(concept_map, file):
-                    yield guid, example
+                    yield example["ambiguous_word"], example
 
             elif self.config.schema == "bigbio_kb":
                 for document in self._parse_document(concept_map, file):
@@ -198,31 +200,29 @@ class MshWsdDataset(datasets.GeneratorBasedBuilder):
                         yield example["id"], example
 
     def _parse_document(self, concept_map, file: Path):
-        with file.open(mode="r", encoding="iso-8859-1") as f:
-            content = f.readlines()
-        content = [x.strip() for x in content]
-
-        # search line number of @DATA, sometimes 6 or 7
-        start_l = None
-        for number, line in enumerate(content):
-            if line.startswith("@DATA"):
-                start_l = number + 1
-                break
-        assert start_l is not None
-
         amb_word = file.with_suffix("").name[: -len("_pmids_tagged")]
 
         sentences = []
-        for line in content[start_l:]:
-            # cant use , or ," ", as seperator
-            m_pmid = re.search("[0-9]+(?=(,))", line)
-            pmid = m_pmid.group()
-            m_label = re.search("(?<=(,))M[0-9]+", line)
-            label = m_label.group()
-
-            citation = line[m_pmid.span()[1] + 1 : m_label.span()[0] - 1].strip('"')
-
-            sentences.append({"pmid": pmid, "text": citation, "label": label})
+        with file.open(mode="r", encoding="iso-8859-1") as f:
+            # skip the ARFF header, @DATA is sometimes on line 6 or 7
+            for line in f:
+                if line.strip().startswith("@DATA"):
+                    break
+            else:
+                raise ValueError(f"No @DATA section found in {file}")
+
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+
+                # cant use , or ," ", as seperator
+                match = _ARFF_INSTANCE.match(line)
+                if match is None:
+                    raise ValueError(f"Malformed ARFF instance in {file}: {line}")
+
+                pmid, citation, label = match.groups()
+                sentences.append({"pmid": pmid, "text": citation.strip('"'), "label": label})
 
         yield {
             "ambiguous_word": amb_word,
@@ -234,17 +234,19 @@ class MshWsdDataset(datasets.GeneratorBasedBuilder):
         }
 
     def _source_to_kb(self, document):
+        # ids are derived from the ambiguous word so that they stay unique when files are sharded across workers
+        amb_word = document["ambiguous_word"]
         choices = {x["label"]: x["concept"] for x in document["choices"]}
-        for sentence in document["sentences"]:
+        for idx, sentence in enumerate(document["sentences"]):
             document_ = {}
             document_["events"] = []
             document_["relations"] = []
             document_["coreferences"] = []
-            document_["id"] = next(self.uid)
+            document_["id"] = f"{amb_word}_{idx}"
             document_["document_id"] = sentence["pmid"]
             document_["passages"] = [
                 {
-                    "id": next(self.uid),
+                    "id": f"{amb_word}_{idx}_passage",
                     "type": "",
                     "text": [sentence["text"]],
                     "offsets": [[0, len(sentence["text"])]],
@@ -252,7 +254,7 @@ class MshWsdDataset(datasets.GeneratorBasedBuilder):
             ]
             document_["entities"] = [
                 {
-                    "id": next(self.uid),
+                    "id": f"{amb_word}_{idx}_entity",
                     "type": "ambiguous_word",
                     "text": [document["ambiguous_word"]],
                     "offsets": [self._parse_offset(sentence["text"])],
@@ -264,5 +266,5 @@ class MshWsdDataset(datasets.GeneratorBasedBuilder):
             yield document_
 
     def _parse_offset(self, sentence):
-        m = re.search("(?<=(<e>)).+(?=(</e>))", sentence)
+        m = _AMBIGUOUS_WORD.search(sentence)
         return m.span()
@@ -552,20 +552,24 @@ class MuchMoreDataset(datasets.GeneratorBasedBuilder):
                 snippets.append(snippet)
             return snippets
 
-        def sid_to_text_off(sid, snip_txts_lens):
-            ii_sid = int(sid[1:])
-            start = sum(snip_txts_lens[: ii_sid - 1]) + (ii_sid - 1)
-            end = start + snip_txts_lens[ii_sid - 1]
-            return start, end
-
-        def sid_wid_to_text_off(sid, wid, snip_txts_lens, snip_toks_lens):
-            s_start, s_end = sid_to_text_off(sid, snip_txts_lens)
-            ii_sid = int(sid[1:])
-            ii_wid = int(wid[1:])
-            w_start = sum(snip_toks_lens[ii_sid - 1][: ii_wid - 1]) + (ii_wid - 1)
-            start = s_start + w_start
-            end = start + snip_toks_lens[ii_sid - 1][ii_wid - 1]
-            return start, end
+        def snippets_tokens_text_offs(snip_toks):
+            """Offsets of every token in the space joined text, computed once per document.
+
+            snip_toks_offs[ii_sid - 1][ii_wid - 1] holds the (start, end)
+            offsets of word `wid` in sentence `sid`.
+            """
+            snip_toks_offs = []
+            s_start = 0
+            for snip in snip_toks:
+                toks_offs = []
+                w_start = s_start
+                for tok in snip:
+                    toks_offs.append((w_start, w_start + len(tok)))
+                    w_start += len(tok) + 1
+                snip_toks_offs.append(toks_offs)
+                # tokens and snippets are joined with a single space
+                s_start += len(" ".join(snip)) + 1
+            return snip_toks_offs
 
         for _id, (file_name, fp) in enumerate(file_names_and_pointers):
 
@@ -591,8 +595,7 @@ class MuchMoreDataset(datasets.GeneratorBasedBuilder):
 
             snip_toks = snippets_tokens_from_sents(sentences)
             snip_txts = [" ".join(snip_tok) for snip_tok in snip_toks]
-            snip_txts_lens = [len(el) for el in snip_txts]
-            snip_toks_lens = [[len(tok) for tok in snip] for snip in snip_toks]
+            snip_toks_offs = snippets_tokens_text_offs(snip_toks)
             text = " ".join(snip_txts)
             passages = [
                 {
@@ -620,12 +623,8 @@ class MuchMoreDataset(datasets.GeneratorBasedBuilder):
                     tok_text = " ".join(
                         snip_toks[ii_sid - 1][ii_wid_from - 1 : ii_wid_to]
                     )
-                    w_from_start, w_from_end = sid_wid_to_text_off(
-                        sid, wid_from, snip_txts_lens, snip_toks_lens
-                    )
-                    w_to_start, w_to_end = sid_wid_to_text_off(
-                        sid, wid_to, snip_txts_lens, snip_toks_lens
-                    )
+                    w_from_start, w_from_end = snip_toks_offs[ii_sid - 1][ii_wid_from - 1]
+                    w_to_start, w_to_end = snip_toks_offs[ii_sid - 1][ii_wid_to - 1]
 
                     offsets = [(w_from_start, w_to_end)]
                     main_text = text[w_from_start:w_to_end]
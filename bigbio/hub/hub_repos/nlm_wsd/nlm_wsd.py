@@ -44,7 +44,10 @@ Instructions on how to load locally:
 """
 
 import itertools as it
+import os
 import re
+import sqlite3
+from contextlib import closing
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Tuple
@@ -227,25 +230,51 @@ class NlmWsdDataset(datasets.GeneratorBasedBuilder):
     def _generate_examples(self, mrcon_path: Path, ann_dir: Path) -> Tuple[int, Dict]:
         """Yields examples as (key, example) tuples."""
 
-        # read label->cui map
-        umls_map = {}
+        # label->cui map, only a few hundred concepts are looked up so query an on-disk index
+        umls_index = self._get_umls_index(mrcon_path)
+        with closing(sqlite3.connect(f"{umls_index.resolve().as_uri()}?mode=ro", uri=True)) as umls_map:
+            for dir in ann_dir.iterdir():
+                if self.config.schema == "source" and dir.is_dir():
+                    for example in self._generate_parsed_documents(dir, umls_map):
+                        yield next(self.uid), example
+
+                elif self.config.schema == "bigbio_kb" and dir.is_dir():
+                    for example in self._generate_parsed_documents(dir, umls_map):
+                        yield next(self.uid), self._source_to_kb(example)
+
+    def _get_umls_index(self, mrcon_path: Path) -> Path:
+        """
+        Returns an sqlite index of the concept name -> CUI map in MRCON.
+        The index is built once next to the extracted MRCON file and reused by all configs and later builds.
+        """
+        index_path = mrcon_path.with_name(f"{mrcon_path.name}.sqlite")
+        if index_path.exists():
+            return index_path
+
+        # build under a temporary name so that an interrupted build is never picked up
+        tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            conn.execute("CREATE TABLE umls (concept TEXT PRIMARY KEY, cui TEXT NOT NULL) WITHOUT ROWID")
+            # later entries of a concept overwrite earlier ones
+            conn.executemany("INSERT OR REPLACE INTO umls VALUES (?, ?)", self._read_mrcon(mrcon_path))
+            conn.commit()
+        os.replace(tmp_path, index_path)
+
+        return index_path
+
+    def _read_mrcon(self, mrcon_path: Path):
         with mrcon_path.open() as f:
-            content = f.readlines()
-        content = [x.strip() for x in content]
-        for line in content:
-            fields = line.split("|")
-            assert len(fields) == 9, f"{len(fields)}"
-            assert fields[0][0] == "C"
-            umls_map[fields[6]] = fields[0]
-
-        for dir in ann_dir.iterdir():
-            if self.config.schema == "source" and dir.is_dir():
-                for example in self._generate_parsed_documents(dir, umls_map):
-                    yield next(self.uid), example
-
-            elif self.config.schema == "bigbio_kb" and dir.is_dir():
-                for example in self._generate_parsed_documents(dir, umls_map):
-                    yield next(self.uid), self._source_to_kb(example)
+            for line in f:
+                fields = line.strip().split("|")
+                assert len(fields) == 9, f"{len(fields)}"
+                assert fields[0][0] == "C"
+                yield fields[6], fields[0]
+
+    def _lookup_cui(self, umls_map: sqlite3.Connection, concept: str) -> str:
+        row = umls_map.execute("SELECT cui FROM umls WHERE concept = ?", (concept,)).fetchone()
+        if row is None:
+            raise KeyError(concept)
+        return row[0]
 
     def _generate_parsed_documents(self, dir, umls_map):
 
@@ -270,7 +299,7 @@ class NlmWsdDataset(datasets.GeneratorBasedBuilder):
                         "label": label,
                         "concept": concept,
                         "type": type,
-                        "cui": umls_map[concept],
+                        "cui": self._lookup_cui(umls_map, concept),
                     }
                 )
 
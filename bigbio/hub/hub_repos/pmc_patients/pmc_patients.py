@@ -19,11 +19,12 @@ where similarity has three values:0, 1, 2, indicating corresponding similarity.
 """
 
 import json
+import mmap
 import os
-from typing import Dict, List, Tuple
+import re
+from typing import BinaryIO, Dict, Iterable, List, Optional, Pattern, Tuple
 
 import datasets
-import pandas as pd
 
 from .bigbiohub import pairs_features
 from .bigbiohub import BigBioConfig
@@ -64,6 +65,58 @@ _SOURCE_VERSION = "1.2.0"
 
 _BIGBIO_VERSION = "1.0.0"
 
+# pairs are split into contiguous shards of the file, which are split across workers when loading with `num_proc`
+_NUM_SHARDS = 16
+
+# start of the items of the JSON lists, pairs are `["<uid>", "<uid>", <label>]` and patients are objects.
+# `"` is escaped inside JSON strings, so these are only found between items (or before the first one).
+_PAIR_START = re.compile(rb'[\[,]\s*(\[)\s*"')
+_PATIENT_START = re.compile(rb'[\[,]\s*(\{)\s*"')
+# opening bracket of a pair, uids have no brackets
+_PAIR_OPEN = re.compile(rb'\[\s*"')
+_PATIENT_UID = re.compile(rb'"patient_uid"\s*:\s*("[^"]*")')
+
+
+def _next_item(f: BinaryIO, item_start: Pattern, offset: int, chunk_size: int = 1 << 16) -> Optional[int]:
+    """Byte offset of the first item of a JSON list starting after `offset`, None if there is none."""
+    f.seek(offset)
+    buffer = b""
+    while True:
+        chunk = f.read(chunk_size)
+        # look back a little, the start of an item may be split across chunks
+        match = item_start.search(buffer + chunk, max(len(buffer) - 64, 0))
+        if match is not None:
+            return offset + match.start(1)
+        if not chunk:
+            return None
+        buffer += chunk
+
+
+def _list_end(f: BinaryIO) -> int:
+    """Byte offset of the closing bracket of a JSON list."""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(max(size - 4096, 0))
+    tail = f.read()
+    return size - len(tail) + tail.rindex(b"]")
+
+
+def _json_shards(filepath: str, item_start: Pattern, num_shards: int) -> List[Tuple[int, int]]:
+    """
+    Split a JSON list into byte ranges of about the same size, each starting at an item.
+    Nothing is decoded: the start of each range is found by seeking to its offset and searching the next item.
+    """
+    size = os.path.getsize(filepath)
+    with open(filepath, "rb") as f:
+        starts = {_next_item(f, item_start, size * i // num_shards) for i in range(num_shards)}
+        starts = sorted(start for start in starts if start is not None)
+        return list(zip(starts, starts[1:] + [_list_end(f)]))
+
+
+def _decode_items(data: bytes) -> List:
+    """Decode the items of a JSON list between two byte offsets returned by `_json_shards` or `_next_item`."""
+    return json.loads(b"[" + data.rstrip().rstrip(b",") + b"]")
+
 
 class PMCPatientsDataset(datasets.GeneratorBasedBuilder):
     """PPS dataset is a list of triplets.
@@ -121,87 +174,79 @@ class PMCPatientsDataset(datasets.GeneratorBasedBuilder):
         urls = _URLS[_DATASETNAME]
         data_dir = dl_manager.download_and_extract(urls)
         return [
-            datasets.SplitGenerator(
-                name=datasets.Split.TRAIN,
-                gen_kwargs={
-                    "filepath": os.path.join(
-                        data_dir,
-                        "datasets/task_2_patient2patient_similarity/PPS_train.json",
-                    ),
-                    "split": "train",
-                    "data_dir": data_dir,
-                },
-            ),
-            datasets.SplitGenerator(
-                name=datasets.Split.TEST,
-                gen_kwargs={
-                    "filepath": os.path.join(
-                        data_dir,
-                        "datasets/task_2_patient2patient_similarity/PPS_test.json",
-                    ),
-                    "split": "test",
-                    "data_dir": data_dir,
-                },
-            ),
-            datasets.SplitGenerator(
-                name=datasets.Split.VALIDATION,
-                gen_kwargs={
-                    "filepath": os.path.join(
-                        data_dir,
-                        "datasets/task_2_patient2patient_similarity/PPS_dev.json",
-                    ),
-                    "split": "dev",
-                    "data_dir": data_dir,
-                },
-            ),
+            self._split_generator(data_dir, datasets.Split.TRAIN, "train"),
+            self._split_generator(data_dir, datasets.Split.TEST, "test"),
+            self._split_generator(data_dir, datasets.Split.VALIDATION, "dev"),
         ]
 
+    def _split_generator(self, data_dir: str, name: str, split: str) -> datasets.SplitGenerator:
+        filepath = os.path.join(data_dir, f"datasets/task_2_patient2patient_similarity/PPS_{split}.json")
+        return datasets.SplitGenerator(
+            name=name,
+            gen_kwargs={
+                "filepath": filepath,
+                "patients_filepath": os.path.join(data_dir, f"datasets/PMC-Patients_{split}.json"),
+                "shards": _json_shards(filepath, _PAIR_START, _NUM_SHARDS),
+            },
+        )
+
+    @staticmethod
+    def _patient_texts(patients_filepath: str, patient_uids: Iterable[str]) -> Dict[str, str]:
+        """Texts of the given patients, the others are located by their uid but not decoded."""
+        patient_uids = set(patient_uids)
+        texts = {}
+        with open(patients_filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as patients:
+            starts = [match.start(1) for match in _PATIENT_START.finditer(patients)]
+            for start, end in zip(starts, starts[1:] + [_list_end(f)]):
+                uid = _PATIENT_UID.search(patients, start, end)
+                if uid is not None and json.loads(uid.group(1)) in patient_uids:
+                    patient = _decode_items(patients[start:end])[0]
+                    texts[patient["patient_uid"]] = patient["patient"]
+        return texts
+
     def _generate_examples(
-        self, filepath, split: str, data_dir: str
+        self, filepath: str, patients_filepath: str, shards: List[Tuple[int, int]]
     ) -> Tuple[int, Dict]:
         """Yields examples as (key, example) tuples."""
 
-        uid = 0
-
-        def lookup_text(patient_uid: str, df: pd.DataFrame) -> str:
-            try:
-                return df.loc[patient_uid]["patient"]
-            except KeyError:
-                return ""
-
-        with open(filepath, "r") as j:
-            ret_file = json.load(j)
-
-        if self.config.schema == "source":
-
-            for key, (id1, id2, label) in enumerate(ret_file):
-                feature_dict = {
-                    "id": uid,
-                    "id_text1": id1,
-                    "id_text2": id2,
-                    "label": label,
-                }
-                uid += 1
-                yield key, feature_dict
-
-        elif self.config.schema == "bigbio_pairs":
-            source_files = os.path.join(data_dir, f"datasets/PMC-Patients_{split}.json")
-            src_frame = pd.read_json(source_files, encoding="utf8").set_index(
-                "patient_uid"
+        with open(filepath, "rb") as j, mmap.mmap(j.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # keys are the index of the pair in the file, count the pairs before each shard
+            shard_pairs = []
+            key, position = 0, 0
+            for start, end in shards:
+                key += len(_PAIR_OPEN.findall(data, position, start))
+                shard_pairs.append((key, _decode_items(data[start:end])))
+                key, position = key + len(shard_pairs[-1][1]), end
+
+        if self.config.schema == "bigbio_pairs":
+            patient_texts = self._patient_texts(
+                patients_filepath, (uid for _, pairs in shard_pairs for pair in pairs for uid in pair[:2])
             )
-            for key, (id1, id2, label) in enumerate(ret_file):
-                text_1 = lookup_text(id1, src_frame)
-                text_2 = lookup_text(id2, src_frame)
-                # test/dev splits are faulty and may not contain the patient_uid
-                # if any of the lookup texts are empty skip the sample
-                if text_1 == "" or text_2 == "":
-                    continue
-                feature_dict = {
-                    "id": uid,
-                    "document_id": "NULL",
-                    "text_1": text_1,
-                    "text_2": text_2,
-                    "label": label,
-                }
-                uid += 1
-                yield key, feature_dict
+
+        for first_key, pairs in shard_pairs:
+            for key, (id1, id2, label) in enumerate(pairs, first_key):
+
+                if self.config.schema == "source":
+                    feature_dict = {
+                        "id": key,
+                        "id_text1": id1,
+                        "id_text2": id2,
+                        "label": label,
+                    }
+                    yield key, feature_dict
+
+                elif self.config.schema == "bigbio_pairs":
+                    text_1 = patient_texts.get(id1, "")
+                    text_2 = patient_texts.get(id2, "")
+                    # test/dev splits are faulty and may not contain the patient_uid
+                    # if any of the lookup texts are empty skip the sample
+                    if text_1 == "" or text_2 == "":
+                        continue
+                    feature_dict = {
+                        "id": key,
+                        "document_id": "NULL",
+                        "text_1": text_1,
+                        "text_2": text_2,
+                        "label": label,
+                    }
+                    yield key, feature_dict
@@ -15,12 +15,14 @@
 
 # TODO: see if we can add long answer for QA task and text classification for MESH tags
 
+import functools
 import glob
 import json
 import os
+import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterator, Tuple
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 
 import datasets
 
@@ -79,6 +81,61 @@ _BIGBIO_VERSION = "1.0.0"
 
 _CLASS_NAMES = ["yes", "no", "maybe"]
 
+# examples are split into contiguous shards of the file, which are split across workers when loading with `num_proc`
+_NUM_SHARDS = 16
+
+# start of an example of the JSON files, which map PMIDs to examples. `"` is escaped inside JSON strings,
+# so this is only found between examples (or before the first one).
+_EXAMPLE_START = re.compile(rb'[{,]\s*("\d+"\s*:\s*\{)')
+
+
+def _next_example(f: BinaryIO, offset: int, chunk_size: int = 1 << 16) -> Optional[int]:
+    """Byte offset of the first example starting after `offset`, None if there is none."""
+    f.seek(offset)
+    buffer = b""
+    while True:
+        chunk = f.read(chunk_size)
+        # look back a little, the start of an example may be split across chunks
+        match = _EXAMPLE_START.search(buffer + chunk, max(len(buffer) - 64, 0))
+        if match is not None:
+            return offset + match.start(1)
+        if not chunk:
+            return None
+        buffer += chunk
+
+
+@functools.lru_cache(maxsize=None)
+def _json_shards(filepath: str, num_shards: int) -> Tuple[Tuple[int, int], ...]:
+    """
+    Split a JSON file into byte ranges of about the same size, each starting at an example. Nothing is decoded:
+    the start of each range is found by seeking to its offset and searching the next example.
+    """
+    size = os.path.getsize(filepath)
+    with open(filepath, "rb") as f:
+        starts = {_next_example(f, size * i // num_shards) for i in range(num_shards)}
+        starts = sorted(start for start in starts if start is not None)
+        # the last shard ends at the closing brace of the file
+        f.seek(max(size - 4096, 0))
+        tail = f.read()
+        end = size - len(tail) + tail.rindex(b"}")
+    return tuple(zip(starts, starts[1:] + [end]))
+
+
+def _read_json_span(f: BinaryIO, start: int, end: int) -> Dict[str, Dict]:
+    """Decode the examples between two byte offsets returned by `_json_shards`."""
+    f.seek(start)
+    return json.loads(b"{" + f.read(end - start).rstrip().rstrip(b",") + b"}")
+
+
+@functools.lru_cache(maxsize=None)
+def _load_json_span(filepath: str, start: int, end: int) -> Tuple[Tuple[str, Dict], ...]:
+    """
+    `pqal_test_set.json` is the test split of all ten labeled folds, parse its shards once per process
+    and share them between the configs.
+    """
+    with open(filepath, "rb") as f:
+        return tuple(_read_json_span(f, start, end).items())
+
 
 class PubmedQADataset(datasets.GeneratorBasedBuilder):
     """PubmedQA Dataset"""
@@ -183,52 +240,32 @@ class PubmedQADataset(datasets.GeneratorBasedBuilder):
         data_dir = Path(dl_manager.download_and_extract(urls))
 
         if "pubmed_qa_labeled" in self.config.subset_id:
+            fold_dir = data_dir / self.config.subset_id.replace("pubmed_qa_labeled", "pqal")
             return [
-                datasets.SplitGenerator(
-                    name=datasets.Split.TRAIN,
-                    gen_kwargs={
-                        "filepath": data_dir
-                        / self.config.subset_id.replace("pubmed_qa_labeled", "pqal")
-                        / "train_set.json"
-                    },
-                ),
-                datasets.SplitGenerator(
-                    name=datasets.Split.VALIDATION,
-                    gen_kwargs={
-                        "filepath": data_dir
-                        / self.config.subset_id.replace("pubmed_qa_labeled", "pqal")
-                        / "dev_set.json"
-                    },
-                ),
-                datasets.SplitGenerator(
-                    name=datasets.Split.TEST,
-                    gen_kwargs={"filepath": data_dir / "pqal_test_set.json"},
-                ),
+                self._split_generator(datasets.Split.TRAIN, fold_dir / "train_set.json"),
+                self._split_generator(datasets.Split.VALIDATION, fold_dir / "dev_set.json"),
+                self._split_generator(datasets.Split.TEST, data_dir / "pqal_test_set.json"),
             ]
         elif self.config.subset_id == "pubmed_qa_artificial":
             return [
-                datasets.SplitGenerator(
-                    name=datasets.Split.TRAIN,
-                    gen_kwargs={"filepath": data_dir / "pqaa_train_set.json"},
-                ),
-                datasets.SplitGenerator(
-                    name=datasets.Split.VALIDATION,
-                    gen_kwargs={"filepath": data_dir / "pqaa_dev_set.json"},
-                ),
+                self._split_generator(datasets.Split.TRAIN, data_dir / "pqaa_train_set.json"),
+                self._split_generator(datasets.Split.VALIDATION, data_dir / "pqaa_dev_set.json"),
             ]
         else:  # if self.config.subset_id == 'pubmed_qa_unlabeled'
             return [
-                datasets.SplitGenerator(
-                    name=datasets.Split.TRAIN,
-                    gen_kwargs={"filepath": data_dir / "ori_pqau.json"},
-                )
+                self._split_generator(datasets.Split.TRAIN, data_dir / "ori_pqau.json"),
             ]
 
-    def _generate_examples(self, filepath: Path) -> Iterator[Tuple[str, Dict]]:
-        data = json.load(open(filepath, "r"))
+    def _split_generator(self, name: str, filepath: Path) -> datasets.SplitGenerator:
+        return datasets.SplitGenerator(
+            name=name,
+            gen_kwargs={"filepath": filepath, "shards": list(_json_shards(str(filepath), _NUM_SHARDS))},
+        )
 
-        if self.config.schema == "source":
-            for id, row in data.items():
+    def _generate_examples(self, filepath: Path, shards: List[Tuple[int, int]]) -> Iterator[Tuple[str, Dict]]:
+        for id, row in self._iter_rows(filepath, shards):
+
+            if self.config.schema == "source":
                 if self.config.subset_id == "pubmed_qa_unlabeled":
                     row["reasoning_required_pred"] = None
                     row["reasoning_free_pred"] = None
@@ -239,8 +276,8 @@ class PubmedQADataset(datasets.GeneratorBasedBuilder):
                     row["reasoning_free_pred"] = None
 
                 yield id, row
-        elif self.config.schema == "bigbio_qa":
-            for id, row in data.items():
+
+            elif self.config.schema == "bigbio_qa":
                 if self.config.subset_id == "pubmed_qa_unlabeled":
                     answers = [BigBioValues.NULL]
                 else:
@@ -258,3 +295,14 @@ class PubmedQADataset(datasets.GeneratorBasedBuilder):
                 }
 
                 yield id, qa_row
+
+    def _iter_rows(self, filepath: Path, shards: List[Tuple[int, int]]) -> Iterator[Tuple[str, Dict]]:
+        if filepath.name == "pqal_test_set.json":
+            # rows of the shared parse are copied as they are modified before being yielded
+            for start, end in shards:
+                for id, row in _load_json_span(str(filepath), start, end):
+                    yield id, dict(row)
+        else:
+            with open(filepath, "rb") as f:
+                for start, end in shards:
+                    yield from _read_json_span(f, start, end).items()
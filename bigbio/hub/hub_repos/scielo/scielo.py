@@ -15,7 +15,8 @@
 """
 Parallel corpus of full-text articles in Portuguese, English and Spanish from SciELO.
 """
-from typing import IO, Any, Generator, List, Optional, Tuple
+import itertools
+from typing import IO, Any, Generator, Iterable, Iterator, List, Optional, Tuple
 
 import datasets
 
@@ -180,37 +181,23 @@ class ScieloDataset(datasets.GeneratorBasedBuilder):
     ) -> Tuple[int, dict]:
 
         if self.config.schema == "source":
-            for path, f in files:
-                if path == source_file:
-                    source_sentences = f.read().decode("utf-8").split("\n")
-                elif path == target_file:
-                    target_sentences = f.read().decode("utf-8").split("\n")
-                elif languages == "en_pt_es" and path == target_file_2:
-                    target_sentences_2 = f.read().decode("utf-8").split("\n")
-
             if languages == "en_pt_es":
                 source, target, target_2 = tuple(languages.split("_"))
                 for idx, (l1, l2, l3) in enumerate(
-                    zip(source_sentences, target_sentences, target_sentences_2)
+                    self._read_aligned_lines(files, source_file, target_file, target_file_2)
                 ):
                     result = {"translation": {source: l1, target: l2, target_2: l3}}
                     yield idx, result
             else:
                 source, target = tuple(languages.split("_"))
-                for idx, (l1, l2) in enumerate(zip(source_sentences, target_sentences)):
+                for idx, (l1, l2) in enumerate(self._read_aligned_lines(files, source_file, target_file)):
                     result = {"translation": {source: l1, target: l2}}
                     yield idx, result
 
         elif self.config.schema == "bigbio_t2t":
-            for path, f in files:
-                if path == source_file:
-                    source_sentences = f.read().decode("utf-8").split("\n")
-                elif path == target_file:
-                    target_sentences = f.read().decode("utf-8").split("\n")
-
             uid = 0
             source, target = tuple(languages.split("_"))
-            for idx, (l1, l2) in enumerate(zip(source_sentences, target_sentences)):
+            for idx, (l1, l2) in enumerate(self._read_aligned_lines(files, source_file, target_file)):
                 uid += 1
                 yield idx, {
                     "id": str(uid),
@@ -220,3 +207,30 @@ class ScieloDataset(datasets.GeneratorBasedBuilder):
                     "text_1_name": source,
                     "text_2_name": target,
                 }
+
+    def _read_aligned_lines(
+        self, files: Iterable[Tuple[str, IO[bytes]]], *names: str
+    ) -> Iterator[Tuple[str, ...]]:
+        """
+        Lazily zips the lines of the sentence-aligned files `names` of the archive.
+        Raises an error if the files do not have the same number of lines.
+        """
+        missing = object()
+        line_iterators = [self._read_archive_member_lines(files, name) for name in names]
+        for line_no, lines in enumerate(itertools.zip_longest(*line_iterators, fillvalue=missing), 1):
+            if missing in lines:
+                raise ValueError(
+                    f"Misaligned files {names}: line {line_no} is missing in "
+                    f"{[name for name, line in zip(names, lines) if line is missing]}"
+                )
+            yield lines
+
+    def _read_archive_member_lines(self, files: Iterable[Tuple[str, IO[bytes]]], name: str) -> Iterator[str]:
+        # every call iterates over the archive on its own, so several members can be read side by side
+        for path, f in files:
+            if path == name:
+                # binary lines are split on "\n" only, a "\r" can be part of a sentence
+                for line in f:
+                    yield line.decode("utf-8").rstrip("\n")
+                return
+        raise ValueError(f"File {name} not found in archive")
@@ -0,0 +1,292 @@
+"""
+Incremental sync of the local hub repos (`bigbio/hub/hub_repos`) to the Hub.
+
+A local manifest records the content hash (git blob id) of every file last synced to each repo.
+Only files whose hash changed are uploaded, and files deleted locally are deleted from the repo,
+with a single commit per repo. Repos are synced concurrently, and requests failing with transient
+errors (connection errors, timeouts, rate limits and server errors) are retried.
+
+Repos missing from the manifest are compared with the hashes of the files in the Hub repo,
+so that the first sync does not upload unchanged files either.
+
+After changing `bigbiohub.py` (and copying it to the hub repos), this only uploads that file:
+
+    python -m bigbio.hub.sync_hub_repos --dryrun
+    python -m bigbio.hub.sync_hub_repos --num_workers 8
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from huggingface_hub import CommitOperationAdd, CommitOperationDelete, HfApi
+from huggingface_hub.utils import HfHubHTTPError, RepositoryNotFoundError
+
+from bigbio.hub.hubtools import HF_ORG, get_git_revision_short_hash
+
+logger = logging.getLogger(__name__)
+
+HUB_REPOS_DIR = Path(__file__).resolve().parent / "hub_repos"
+
+DEFAULT_MANIFEST_PATH = Path.home() / ".cache" / "bigbio" / "hub_sync.json"
+
+# never uploaded
+IGNORED_DIRS = {"__pycache__", ".git"}
+IGNORED_SUFFIXES = {".pyc", ".lock"}
+
+# responses of failed requests which are retried (timeouts, rate limits and server errors)
+RETRIED_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# failed requests without a response (huggingface_hub >= 1.0 uses httpx, older versions requests)
+CONNECTION_ERRORS: Tuple[type, ...] = (ConnectionError, TimeoutError, requests.ConnectionError, requests.Timeout)
+try:
+    import httpx
+
+    CONNECTION_ERRORS += (httpx.TransportError,)
+except ImportError:
+    pass
+
+
+def git_blob_id(path: Path) -> str:
+    """Hash of a file as computed by git (and reported by the Hub for non-LFS files)."""
+    data = path.read_bytes()
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def local_files(local_dir: Path) -> Dict[str, str]:
+    """Hashes of the files of a local repo keyed on their path in the repo."""
+    files = {}
+    for path in sorted(local_dir.rglob("*")):
+        relative = path.relative_to(local_dir)
+        if not path.is_file() or IGNORED_DIRS.intersection(relative.parts) or path.suffix in IGNORED_SUFFIXES:
+            continue
+        files[relative.as_posix()] = git_blob_id(path)
+    return files
+
+
+def remote_files(api: HfApi, repo_id: str) -> Dict[str, str]:
+    """Hashes of the (non-LFS) files of a Hub repo keyed on their path."""
+    files = {}
+    for entry in api.list_repo_tree(repo_id, repo_type="dataset", recursive=True):
+        # folders have no blob id, LFS files have the blob id of their pointer
+        if getattr(entry, "blob_id", None) is not None and getattr(entry, "lfs", None) is None:
+            files[entry.path] = entry.blob_id
+    return files
+
+
+def plan(local: Dict[str, str], synced: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """Paths to upload (new or changed) and to delete (synced before, deleted locally)."""
+    uploads = [path for path, blob_id in local.items() if synced.get(path) != blob_id]
+    deletes = [path for path in synced if path not in local]
+    return uploads, deletes
+
+
+def is_transient(err: Exception) -> bool:
+    """Whether a failed request may succeed when retried, i.e. not e.g. a 401 or a missing repo."""
+    if isinstance(err, RepositoryNotFoundError):
+        return False
+    if isinstance(err, HfHubHTTPError):
+        response = getattr(err, "response", None)
+        return response is not None and response.status_code in RETRIED_STATUS_CODES
+    return isinstance(err, CONNECTION_ERRORS)
+
+
+def with_retries(func, max_retries: int, backoff: float):
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except Exception as err:
+            if attempt == max_retries or not is_transient(err):
+                raise
+            delay = backoff * 2**attempt
+            logger.warning(f"{err!r}, retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            time.sleep(delay)
+
+
+def sync_repo(
+    api: HfApi,
+    repo_id: str,
+    local_dir: Path,
+    synced: Optional[Dict[str, str]],
+    commit_message: str,
+    dryrun: bool = True,
+    max_retries: int = 3,
+    backoff: float = 1.0,
+) -> Dict:
+    """
+    Upload the changes of a local repo with a single commit.
+
+    :param synced: hashes of the files last synced to the repo, None to compare with the Hub repo
+    :return: result with the hashes of the synced files (for the manifest)
+    """  # noqa
+    local = local_files(local_dir)
+    if synced is None:
+        remote = with_retries(lambda: remote_files(api, repo_id), max_retries, backoff)
+        # only files managed locally are deleted (e.g. not the .gitattributes of the Hub)
+        synced = {path: blob_id for path, blob_id in remote.items() if path in local}
+
+    uploads, deletes = plan(local, synced)
+    result = {"repo_id": repo_id, "uploads": uploads, "deletes": deletes, "files": synced}
+    if not uploads and not deletes:
+        result["status"] = "unchanged"
+        return result
+    if dryrun:
+        result["status"] = "dryrun"
+        return result
+
+    operations = [
+        CommitOperationAdd(path_in_repo=path, path_or_fileobj=str(local_dir / path)) for path in uploads
+    ] + [CommitOperationDelete(path_in_repo=path) for path in deletes]
+    with_retries(
+        lambda: api.create_commit(
+            repo_id=repo_id,
+            repo_type="dataset",
+            operations=operations,
+            commit_message=commit_message,
+            commit_description=f"{commit_message}\n\nupdated: {uploads}\ndeleted: {deletes}",
+        ),
+        max_retries,
+        backoff,
+    )
+    result["status"] = "synced"
+    result["files"] = local
+    return result
+
+
+def _load_manifest(path: Path) -> Dict[str, Dict[str, str]]:
+    if path.exists():
+        with open(path) as fp:
+            return json.load(fp)
+    return {}
+
+
+def _save_manifest(manifest: Dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def sync(
+    dataset_names: Optional[List[str]] = None,
+    hub_repos_dir: Path = HUB_REPOS_DIR,
+    manifest_path: Path = DEFAULT_MANIFEST_PATH,
+    api: Optional[HfApi] = None,
+    num_workers: int = 8,
+    dryrun: bool = True,
+    refresh: bool = False,
+    max_retries: int = 3,
+    backoff: float = 1.0,
+    commit_message: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Sync local hub repos to the Hub.
+
+    :param dataset_names: datasets to sync (default is all directories of `hub_repos_dir`)
+    :param api: client of the Hub, e.g. a local stand-in for tests
+    :param refresh: ignore the manifest and compare all repos with the Hub
+    :return: one result per repo, with status "unchanged", "dryrun", "synced" or "failed"
+    """  # noqa
+    api = api if api is not None else HfApi()
+    if dataset_names is None:
+        dataset_names = sorted(path.name for path in hub_repos_dir.iterdir() if path.is_dir())
+    if commit_message is None:
+        commit_message = f"Sync with bigbio repo at git version {get_git_revision_short_hash()}"
+    manifest = {} if refresh else _load_manifest(manifest_path)
+
+    results = []
+    with ThreadPoolExecutor(max(num_workers, 1)) as executor:
+        futures = {}
+        for dataset_name in dataset_names:
+            repo_id = f"{HF_ORG}/{dataset_name}"
+            futures[
+                executor.submit(
+                    sync_repo,
+                    api,
+                    repo_id,
+                    hub_repos_dir / dataset_name,
+                    manifest.get(repo_id),
+                    commit_message,
+                    dryrun,
+                    max_retries,
+                    backoff,
+                )
+            ] = repo_id
+        for future in as_completed(futures):
+            repo_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as err:
+                result = {"repo_id": repo_id, "status": "failed", "error": repr(err)}
+                logger.error(f"{repo_id}: {err!r}")
+            else:
+                if result["status"] != "dryrun":
+                    manifest[repo_id] = result["files"]
+                    _save_manifest(manifest, manifest_path)
+                if result["status"] != "unchanged":
+                    logger.info(
+                        f"{repo_id}: {result['status']} ({len(result['uploads'])} uploads, "
+                        f"{len(result['deletes'])} deletes)"
+                    )
+            results.append(result)
+
+    return sorted(results, key=lambda result: result["repo_id"])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Upload changed files of the local hub repos to the Hub.")
+    parser.add_argument(
+        "dataset_names",
+        nargs="*",
+        help="Datasets to sync (default is all hub repos)",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=8,
+        help="Number of repos synced concurrently (default is 8)",
+    )
+    parser.add_argument(
+        "--manifest_path",
+        type=str,
+        default=str(DEFAULT_MANIFEST_PATH),
+        help=f"Hashes of the files last synced to each repo (default is {DEFAULT_MANIFEST_PATH})",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore the manifest and compare all repos with the Hub",
+    )
+    parser.add_argument(
+        "--max_retries",
+        type=int,
+        default=3,
+        help="Number of retries of requests failing with transient errors (default is 3)",
+    )
+    parser.add_argument(
+        "-d", "--dryrun",
+        action="store_true",
+        help="Only show what would be uploaded",
+    )
+    args = parser.parse_args()
+
+    results = sync(
+        dataset_names=args.dataset_names or None,
+        manifest_path=Path(args.manifest_path),
+        num_workers=args.num_workers,
+        dryrun=args.dryrun,
+        refresh=args.refresh,
+        max_retries=args.max_retries,
+    )
+    counts = Counter(result["status"] for result in results)
+    logger.info(f"Results: {dict(counts)}")
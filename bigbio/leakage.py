@@ -0,0 +1,196 @@
+"""
+Overlap of documents between the splits of BigBio configs.
+
+Every document of every (config, split) gets keys:
+
+ - `text`: a fingerprint of its text (see `map_text_from_schema`), normalized
+   to lowercase alphanumeric words so that whitespace, punctuation and unicode
+   variants of the same abstract collide
+ - `pubmed`: its PubMed ID, for configs whose `document_id`s are PMIDs or PMCIDs
+   (see `bigbio/pubmed_index.py`)
+
+All keys of the catalog are sorted once and each document is joined with the
+splits having one of its keys, so the cost grows with the number of documents
+(and overlaps) instead of with the number of pairs of splits.
+
+`overlap[i, j]` is the number of documents of split `i` sharing a key with a
+document of split `j`. The diagonal counts the documents of each split with at
+least one key (duplicates within a split overlap with the split itself).
+"""
+import hashlib
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from bigbio.dataloader import BigBioConfigHelper
+from bigbio.hf_maps import map_text_from_schema
+from bigbio.pubmed_index import get_doc_id_to_pubmed_func
+
+logger = logging.getLogger(__name__)
+
+KEY_TYPES = ["text", "pubmed"]
+
+TRAIN_SPLITS = ["train"]
+EVAL_SPLITS = ["validation", "dev", "test"]
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase alphanumeric words of a text, separated by single spaces."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def fingerprint(value: str) -> int:
+    """64 bit hash of a string, stable across processes (unlike `hash`)."""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def text_fingerprints(texts: Iterable[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fingerprints of normalized texts.
+
+    :return: positions of the texts which are not empty after normalization and their fingerprints
+    """
+    positions, keys = [], []
+    for position, text in enumerate(texts):
+        text = normalize_text(text)
+        if text:
+            positions.append(position)
+            keys.append(fingerprint(text))
+    return np.asarray(positions, dtype=np.int64), np.asarray(keys, dtype=np.uint64)
+
+
+def pubmed_fingerprints(document_ids: pa.ChunkedArray, doc_to_pid_func) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fingerprints of the PubMed IDs of documents, each distinct `document_id` is normalized once.
+
+    :return: positions of the documents with a PubMed ID and their fingerprints
+    """
+    unique_ids = pc.unique(document_ids)
+    unique_keys = np.asarray(
+        [fingerprint("{}:{}".format(*doc_to_pid_func(document_id))) for document_id in unique_ids.to_pylist()],
+        dtype=np.uint64,
+    )
+    positions = pc.index_in(document_ids, value_set=unique_ids)
+    has_id = pc.is_valid(positions).to_numpy(zero_copy_only=False)
+    positions = positions.to_numpy(zero_copy_only=False)
+    return np.flatnonzero(has_id), unique_keys[positions[has_id].astype(np.int64)]
+
+
+@dataclass
+class SplitKeys:
+    """Keys of the documents of one split of a config."""
+
+    dataset_name: str
+    config_name: str
+    split: str
+    num_rows: int
+    # key type -> (row positions, keys)
+    keys: Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+    @property
+    def name(self) -> str:
+        return f"{self.config_name}/{self.split}"
+
+
+def split_keys(helper: BigBioConfigHelper, **load_dataset_kwargs) -> List[SplitKeys]:
+    """Keys of all splits of a bigbio schema config, loading only its ids and text columns."""
+    schema = helper.config.schema.split("_")[1]
+    doc_to_pid_func = get_doc_id_to_pubmed_func(helper)
+    dsd = helper.load_text_view(**load_dataset_kwargs)
+
+    results = []
+    for split, ds in dsd.items():
+        texts = map_text_from_schema(ds, schema, remove_columns=ds.column_names)
+        keys = {"text": text_fingerprints(texts.with_format("arrow")[:].column("text").to_pylist())}
+        if doc_to_pid_func is not None and "document_id" in ds.column_names:
+            keys["pubmed"] = pubmed_fingerprints(ds.with_format("arrow")[:].column("document_id"), doc_to_pid_func)
+        results.append(
+            SplitKeys(
+                dataset_name=helper.dataset_name,
+                config_name=helper.config.name,
+                split=split,
+                num_rows=len(ds),
+                keys=keys,
+            )
+        )
+    return results
+
+
+def _doc_splits(keys: np.ndarray, docs: np.ndarray, split_of_doc: np.ndarray) -> np.ndarray:
+    """Distinct (doc, split) pairs of documents and the splits with a document sharing one of their keys."""
+    # splits of each key, so that keys repeated within a split are not joined pairwise
+    key_splits = np.unique(np.stack([keys, split_of_doc[docs].astype(np.uint64)], axis=1), axis=0)
+    starts = np.searchsorted(key_splits[:, 0], keys, side="left")
+    sizes = np.searchsorted(key_splits[:, 0], keys, side="right") - starts
+    offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    splits = key_splits[np.repeat(starts, sizes) + offsets, 1].astype(np.int64)
+    return np.unique(np.stack([np.repeat(docs, sizes), splits], axis=1), axis=0)
+
+
+def overlap_matrices(splits: List[SplitKeys], key_types: Iterable[str] = KEY_TYPES) -> Dict[str, np.ndarray]:
+    """
+    Overlap matrices of splits, for each key type and for any key type ("any").
+
+    :return: key type -> matrix of shape (len(splits), len(splits)), see the module docstring
+    """
+    doc_offsets = np.cumsum([0] + [split.num_rows for split in splits])
+    split_of_doc = np.repeat(np.arange(len(splits)), [split.num_rows for split in splits])
+
+    matrices = {}
+    any_pairs = []
+    for key_type in key_types:
+        keys, docs = [], []
+        for split_id, split in enumerate(splits):
+            if key_type in split.keys:
+                positions, split_keys = split.keys[key_type]
+                keys.append(split_keys)
+                docs.append(positions + doc_offsets[split_id])
+        if not keys:
+            matrices[key_type] = np.zeros((len(splits), len(splits)), dtype=np.int64)
+            continue
+        doc_split = _doc_splits(np.concatenate(keys), np.concatenate(docs), split_of_doc)
+        any_pairs.append(doc_split)
+        matrices[key_type] = _count(doc_split, split_of_doc, len(splits))
+        logger.info(f"{key_type}: {sum(map(len, keys))} keys, {len(doc_split)} (document, split) overlaps")
+
+    doc_split = np.unique(np.concatenate(any_pairs), axis=0) if any_pairs else np.zeros((0, 2), dtype=np.int64)
+    matrices["any"] = _count(doc_split, split_of_doc, len(splits))
+    return matrices
+
+
+def _count(doc_split: np.ndarray, split_of_doc: np.ndarray, num_splits: int) -> np.ndarray:
+    matrix = np.zeros((num_splits, num_splits), dtype=np.int64)
+    np.add.at(matrix, (split_of_doc[doc_split[:, 0]], doc_split[:, 1]), 1)
+    return matrix
+
+
+def leaks(splits: List[SplitKeys], matrix: np.ndarray) -> List[Dict]:
+    """
+    Documents of evaluation splits found in the training split of another dataset, most leaked first.
+    """  # noqa
+    rows = []
+    for i, eval_split in enumerate(splits):
+        if eval_split.split not in EVAL_SPLITS:
+            continue
+        for j, train_split in enumerate(splits):
+            if train_split.split not in TRAIN_SPLITS or train_split.dataset_name == eval_split.dataset_name:
+                continue
+            if matrix[i, j] > 0:
+                rows.append(
+                    {
+                        "eval": eval_split.name,
+                        "train": train_split.name,
+                        "num_leaked": int(matrix[i, j]),
+                        "fraction_leaked": float(matrix[i, j] / max(eval_split.num_rows, 1)),
+                    }
+                )
+    return sorted(rows, key=lambda row: row["num_leaked"], reverse=True)
@@ -0,0 +1,484 @@
+"""
+Persistent index of the PubMed documents (PMID / PMCID) in BigBio datasets.
+
+The index maps each PubMed ID to the rows (dataset, config, split, row index)
+of the documents with that ID. It is built from the `document_id` column only
+(see `BigBioConfigHelper.load_dataset(columns=...)`) and stored as Parquet:
+
+    <index_dir>/configs/<config name>.parquet  one part per config
+    <index_dir>/pmc_ids.parquet                PMID <-> PMCID crosswalk (optional)
+    <index_dir>/index.parquet                  all parts, crosswalked and sorted by PMID
+    <index_dir>/manifest.json                  what the parts were built from
+
+`update_index` only rebuilds the parts of configs that changed (i.e. whose Hub revision, or local
+dataloader and `bigbiohub.py`, changed), and `PubMedIndex` answers queries with binary searches
+over the sorted PMIDs and PMCIDs.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv
+import pyarrow.parquet as pq
+from huggingface_hub import HfApi
+
+from bigbio.dataloader import BigBioConfigHelper
+from bigbio.hub.hubtools import HF_ORG
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+INDEX_FILENAME = "index.parquet"
+PMC_IDS_FILENAME = "pmc_ids.parquet"
+
+INDEX_SCHEMA = pa.schema(
+    [
+        ("dataset_name", pa.dictionary(pa.int32(), pa.string())),
+        ("config_name", pa.dictionary(pa.int32(), pa.string())),
+        ("split", pa.dictionary(pa.int32(), pa.string())),
+        ("sample_index", pa.int64()),
+        ("docid", pa.string()),
+        ("pmid", pa.int64()),
+        ("pmcid", pa.string()),
+    ]
+)
+
+
+def pubnorm_just_pmid(document_id):
+    return "PMID", document_id
+
+
+def pubnorm_anat_em(document_id):
+    pieces = document_id.split("-")
+    if pieces[0] == "PMID":
+        source = "PMID"
+    elif pieces[0] == "PMC":
+        source = "PMCID"
+    return source, pieces[1]
+
+
+def pubnorm_an_em(document_id):
+    pieces = document_id.split("-")
+    if pieces[0] == "PMID":
+        source = "PMID"
+    elif pieces[0] == "PMC":
+        source = "PMCID"
+    return source, pieces[1]
+
+
+def pubnorm_bioasq_task_b(document_id):
+    return "PMID", document_id.split("/")[-1]
+
+
+def pubnorm_bionlp_st_2011_epi(document_id):
+    return "PMID", document_id.split("-")[1]
+
+
+def pubnorm_bionlp_st_2011_ge(document_id):
+    pieces = document_id.split("-")
+    if pieces[0] == "PMID":
+        source = "PMID"
+    elif pieces[0] == "PMC":
+        source = "PMCID"
+    return source, pieces[1]
+
+
+def pubnorm_bionlp_st_2011_id(document_id):
+    return "PMCID", document_id.split("-")[0].replace("PMC", "")
+
+
+def pubnorm_bionlp_st_2011_rel(document_id):
+    return "PMID", document_id.split("-")[1]
+
+
+def pubnorm_bionlp_st_2013_cg(document_id):
+    return "PMID", document_id.split("-")[1]
+
+
+def pubnorm_bionlp_st_2013_ge(document_id):
+    pieces = document_id.split("-")
+    if pieces[0] == "PMID":
+        source = "PMID"
+    elif pieces[0] == "PMC":
+        source = "PMCID"
+    return source, pieces[1]
+
+
+def pubnorm_bionlp_st_2013_gro(document_id):
+    return "PMID", document_id.split("-")[1]
+
+
+def pubnorm_bionlp_st_2013_pc(document_id):
+    return "PMID", document_id.split("-")[1]
+
+
+def pubnorm_bionlp_st_2019_bb(document_id):
+    pieces = document_id.split("-")
+    if pieces[2] == "F":
+        return "PMID", pieces[-2]
+    else:
+        return "PMID", pieces[-1]
+
+
+def pubnorm_cellfinder(document_id):
+    return "PMID", document_id.split("_")[0]
+
+
+def pubnorm_genia_relation_corpus(document_id):
+    return "PMID", document_id.split("-")[1]
+
+
+def pubnorm_linnaeus(document_id):
+    return "PMID", document_id.replace("pmcA", "")
+
+
+def pubnorm_lll(document_id):
+    return "PMID", document_id.split("-")[0]
+
+
+def pubnorm_mantra_gsc_medline(document_id):
+    return "PMID", document_id.split("_")[1].split(".")[0][1:]
+
+
+def pubnorm_mlee(document_id):
+    return "PMID", document_id.split("-")[1]
+
+
+def pubnorm_pico_extraction(document_id):
+    return "PMID", document_id.split(":")[0]
+
+
+def pubnorm_verspoor(document_id):
+    return "PMID", document_id.split("-")[0]
+
+
+_DATASET_DOC_ID_TO_PUBMED = {
+    "anat_em": pubnorm_anat_em,
+    "an_em": pubnorm_an_em,
+    "bc5cdr": pubnorm_just_pmid,
+    "bc7_litcovid": pubnorm_just_pmid,
+    "bioasq_task_b": pubnorm_bioasq_task_b,
+    "bioasq_task_c_2017": pubnorm_just_pmid,
+    "bionlp_shared_task_2009": pubnorm_just_pmid,
+    "bionlp_st_2011_epi": pubnorm_bionlp_st_2011_epi,
+    "bionlp_st_2011_ge": pubnorm_bionlp_st_2011_ge,
+    "bionlp_st_2011_id": pubnorm_bionlp_st_2011_id,
+    "bionlp_st_2011_rel": pubnorm_bionlp_st_2011_rel,
+    "bionlp_st_2013_cg": pubnorm_bionlp_st_2013_cg,
+    "bionlp_st_2013_ge": pubnorm_bionlp_st_2013_ge,
+    "bionlp_st_2013_gro": pubnorm_bionlp_st_2013_gro,
+    "bionlp_st_2013_pc": pubnorm_bionlp_st_2013_pc,
+    "bionlp_st_2019_bb": pubnorm_bionlp_st_2019_bb,
+    "biored": pubnorm_just_pmid,
+    "cellfinder": pubnorm_cellfinder,
+    "chebi_nactem": pubnorm_just_pmid,
+    "chemdner": pubnorm_just_pmid,
+    "chemprot": pubnorm_just_pmid,
+    "ebm_pico": pubnorm_just_pmid,
+    "genia_relation_corpus": pubnorm_genia_relation_corpus,
+    "gnormplus": pubnorm_just_pmid,
+    "hallmarks_of_cancer": pubnorm_just_pmid,
+    "hprd50": pubnorm_just_pmid,
+    "iepa": pubnorm_just_pmid,
+    "linnaeus": pubnorm_linnaeus,
+    "lll": pubnorm_lll,
+    "medmentions": pubnorm_just_pmid,
+    "mlee": pubnorm_mlee,
+    "mutation_finder": pubnorm_just_pmid,
+    "ncbi_disease": pubnorm_just_pmid,
+    "nlmchem": pubnorm_just_pmid,
+    "nlm_gene": pubnorm_just_pmid,
+    "osiris": pubnorm_just_pmid,
+    "pdr": pubnorm_just_pmid,
+    "pico_extraction": pubnorm_pico_extraction,
+    "pubtator_central": pubnorm_just_pmid,
+    "scai_chemical": pubnorm_just_pmid,
+    "scai_disease": pubnorm_just_pmid,
+    "seth_corpus": pubnorm_just_pmid,
+    "thomas2011": pubnorm_just_pmid,
+    "tmvar_v1": pubnorm_just_pmid,
+    "tmvar_v2": pubnorm_just_pmid,
+    "tmvar_v3": pubnorm_just_pmid,
+    "verspoor": pubnorm_verspoor,
+}
+
+
+_CONFIG_DOC_ID_TO_PUBMED = {
+    "quaero_medline_bigbio_kb": pubnorm_just_pmid,
+    'mantra_gsc_es_medline_bigbio_kb': pubnorm_mantra_gsc_medline,
+    'mantra_gsc_fr_medline_bigbio_kb': pubnorm_mantra_gsc_medline,
+    'mantra_gsc_de_medline_bigbio_kb': pubnorm_mantra_gsc_medline,
+    'mantra_gsc_nl_medline_bigbio_kb': pubnorm_mantra_gsc_medline,
+    'mantra_gsc_en_medline_bigbio_kb': pubnorm_mantra_gsc_medline,
+}
+
+
+def get_doc_id_to_pubmed_func(helper: BigBioConfigHelper):
+    """Function normalizing the `document_id`s of a config, None if its documents are not from PubMed."""
+    func = _DATASET_DOC_ID_TO_PUBMED.get(helper.dataset_name)
+    if func is None:
+        func = _CONFIG_DOC_ID_TO_PUBMED.get(helper.config.name)
+    return func
+
+
+def _hub_revision(dataset_name: str) -> str:
+    """Commit of the Hub repo of a dataset, which is the revision that is loaded and indexed."""
+    return HfApi().dataset_info(f"{HF_ORG}/{dataset_name}").sha
+
+
+def _config_key(helper: BigBioConfigHelper, revision: Optional[str]) -> str:
+    """
+    What the part of a config is built from: the Hub revision of its dataset,
+    or the local dataloader script and its `bigbiohub.py` if it is not loaded from the Hub (`revision` is None).
+    """
+    if revision is None:
+        script = Path(helper.script)
+        script_hash = hashlib.sha256()
+        for path in (script, script.parent / "bigbiohub.py"):
+            if path.exists():
+                script_hash.update(path.read_bytes())
+        revision = f"local:{script_hash.hexdigest()}"
+    return f"{helper.bigbio_version}:{helper.source_version}:{revision}"
+
+
+def _file_key(path: Path) -> str:
+    stat = path.stat()
+    return f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _write_parquet(table: pa.Table, path: Path):
+    tmp_path = path.with_suffix(".tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _load_manifest(index_dir: Path) -> Dict:
+    path = index_dir / MANIFEST_FILENAME
+    if path.exists():
+        with open(path) as fp:
+            return json.load(fp)
+    return {"configs": {}, "pmc_ids": None}
+
+
+def _save_manifest(manifest: Dict, index_dir: Path):
+    path = index_dir / MANIFEST_FILENAME
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as fp:
+        json.dump(manifest, fp, indent=2)
+    os.replace(tmp_path, path)
+
+
+def build_config_part(helper: BigBioConfigHelper, **load_dataset_kwargs) -> pa.Table:
+    """Index rows of one config, reading only its `document_id` column."""
+    doc_to_pid_func = get_doc_id_to_pubmed_func(helper)
+    dsd = helper.load_dataset(columns=["document_id"], **load_dataset_kwargs)
+
+    parts = []
+    for split, ds in dsd.items():
+        document_ids = ds.with_format("arrow")[:].column("document_id")
+        # normalize each distinct id once
+        unique_ids = pc.unique(document_ids)
+        sources, pids = zip(*map(doc_to_pid_func, unique_ids.to_pylist())) if len(unique_ids) else ((), ())
+        sources = pa.array(sources, pa.string())
+        pids = pa.array(pids, pa.string())
+        positions = pc.index_in(document_ids, value_set=unique_ids)
+        sources, pids = sources.take(positions), pids.take(positions)
+        is_pmcid = pc.equal(sources, "PMCID")
+        # documents whose PMID is not a number are kept without a PMID
+        is_pmid = pc.equal(sources, "PMID")
+        is_number = pc.fill_null(pc.match_substring_regex(pids, r"^[0-9]{1,18}$"), False)
+        bad_pmids = pids.filter(pc.and_(is_pmid, pc.invert(is_number)))
+        if len(bad_pmids) > 0:
+            logger.warning(
+                f"{helper.config.name} ({split}): {len(bad_pmids)} documents with a PMID which is not a number, "
+                f"e.g. {pc.unique(bad_pmids)[:5].to_pylist()}"
+            )
+        is_pmid = pc.and_(is_pmid, is_number)
+        parts.append(
+            pa.table(
+                {
+                    "dataset_name": pa.array([helper.dataset_name] * len(ds)).dictionary_encode(),
+                    "config_name": pa.array([helper.config.name] * len(ds)).dictionary_encode(),
+                    "split": pa.array([split] * len(ds)).dictionary_encode(),
+                    "sample_index": pa.array(np.arange(len(ds), dtype=np.int64)),
+                    "docid": document_ids.cast(pa.string()),
+                    "pmid": pc.if_else(is_pmid, pids, None).cast(pa.int64()),
+                    "pmcid": pc.if_else(is_pmcid, pc.binary_join_element_wise("PMC", pids, ""), None),
+                },
+                schema=INDEX_SCHEMA,
+            )
+        )
+    return pa.concat_tables(parts) if parts else INDEX_SCHEMA.empty_table()
+
+
+def convert_pmc_ids(csv_path: Union[str, Path], parquet_path: Union[str, Path]):
+    """
+    Keep the PMID and PMCID columns of the PMC crosswalk as Parquet.
+
+    https://www.ncbi.nlm.nih.gov/pmc/tools/id-converter-api/
+    https://ftp.ncbi.nlm.nih.gov/pub/pmc/PMC-ids.csv.gz
+    """
+    table = pyarrow.csv.read_csv(
+        csv_path,
+        convert_options=pyarrow.csv.ConvertOptions(
+            include_columns=["PMID", "PMCID"],
+            column_types={"PMID": pa.int64(), "PMCID": pa.string()},
+        ),
+    )
+    _write_parquet(table.rename_columns(["pmid", "pmcid"]), Path(parquet_path))
+
+
+def _crosswalk(table: pa.Table, pmc_ids: pa.Table) -> pa.Table:
+    """Fill in missing PMIDs and PMCIDs from the PMC crosswalk."""
+    pmc_ids = pmc_ids.filter(pc.and_(pc.is_valid(pmc_ids["pmid"]), pc.is_valid(pmc_ids["pmcid"])))
+    pmid_position = pc.index_in(table["pmcid"], value_set=pmc_ids["pmcid"])
+    pmcid_position = pc.index_in(table["pmid"], value_set=pmc_ids["pmid"])
+    pmid = pc.coalesce(table["pmid"], pmc_ids["pmid"].take(pmid_position))
+    pmcid = pc.coalesce(table["pmcid"], pmc_ids["pmcid"].take(pmcid_position))
+    table = table.set_column(table.schema.get_field_index("pmid"), "pmid", pmid)
+    return table.set_column(table.schema.get_field_index("pmcid"), "pmcid", pmcid)
+
+
+def update_index(
+    index_dir: Union[str, Path],
+    helpers: Iterable[BigBioConfigHelper],
+    pmc_ids_csv: Optional[Union[str, Path]] = None,
+    force: bool = False,
+    from_hub: bool = True,
+    **load_dataset_kwargs,
+) -> "PubMedIndex":
+    """
+    Build or update the index with the configs of `helpers` whose documents are from PubMed.
+
+    Configs are loaded from the Hub at the current revision of their dataset, or from the local
+    dataloader scripts if `from_hub` is False. Configs whose revision (or local dataloader) did not
+    change since the last update are not loaded again.
+    Configs that are no longer in `helpers` are dropped from the index.
+    """
+    index_dir = Path(index_dir)
+    (index_dir / "configs").mkdir(parents=True, exist_ok=True)
+    manifest = {"configs": {}, "pmc_ids": None} if force else _load_manifest(index_dir)
+
+    helpers = [helper for helper in helpers if get_doc_id_to_pubmed_func(helper) is not None]
+    revisions = {}
+    for helper in helpers:
+        name = helper.config.name
+        revision = None
+        if from_hub:
+            if helper.dataset_name not in revisions:
+                revisions[helper.dataset_name] = _hub_revision(helper.dataset_name)
+            revision = revisions[helper.dataset_name]
+        key = _config_key(helper, revision)
+        part_path = index_dir / "configs" / f"{name}.parquet"
+        if manifest["configs"].get(name, {}).get("key") == key and part_path.exists():
+            continue
+        logger.info(f"indexing {name}")
+        if from_hub:
+            part = build_config_part(helper, revision=revision, **load_dataset_kwargs)
+        else:
+            part = build_config_part(helper, from_hub=False, **load_dataset_kwargs)
+        _write_parquet(part, part_path)
+        manifest["configs"][name] = {"key": key, "num_rows": part.num_rows}
+        _save_manifest(manifest, index_dir)
+
+    names = sorted(helper.config.name for helper in helpers)
+    for name in set(manifest["configs"]) - set(names):
+        del manifest["configs"][name]
+
+    pmc_ids = None
+    if pmc_ids_csv is not None:
+        pmc_ids_key = _file_key(Path(pmc_ids_csv))
+        if manifest["pmc_ids"] != pmc_ids_key or not (index_dir / PMC_IDS_FILENAME).exists():
+            convert_pmc_ids(pmc_ids_csv, index_dir / PMC_IDS_FILENAME)
+            manifest["pmc_ids"] = pmc_ids_key
+    if manifest["pmc_ids"] is not None:
+        pmc_ids = pq.read_table(index_dir / PMC_IDS_FILENAME)
+
+    # the merged index is cheap to rebuild from the parts
+    table = pa.concat_tables(
+        [pq.read_table(index_dir / "configs" / f"{name}.parquet", schema=INDEX_SCHEMA) for name in names]
+        or [INDEX_SCHEMA.empty_table()]
+    )
+    if pmc_ids is not None:
+        table = _crosswalk(table, pmc_ids)
+    table = table.unify_dictionaries().sort_by([("pmid", "ascending"), ("pmcid", "ascending")])
+    _write_parquet(table, index_dir / INDEX_FILENAME)
+    _save_manifest(manifest, index_dir)
+
+    return PubMedIndex(table)
+
+
+class PubMedIndex:
+    """
+    Lookups of the documents of a PubMed ID, and of the documents shared between datasets.
+    """
+
+    def __init__(self, table: pa.Table):
+        self.table = table.combine_chunks()
+        pmid = self.table["pmid"]
+        # rows with a PMID come first (see `update_index`)
+        self._num_pmids = len(pmid) - pmid.null_count
+        self._pmids = pmid.slice(0, self._num_pmids).to_numpy()
+        self._dataset_names = self.table["dataset_name"].to_pandas().astype(str).to_numpy()
+        self._pmcids = None
+        self._pmcid_rows = None
+        self._pmids_by_dataset = {}
+
+    @classmethod
+    def load(cls, index_dir: Union[str, Path]) -> "PubMedIndex":
+        return cls(pq.read_table(Path(index_dir) / INDEX_FILENAME))
+
+    def _rows(self, pmid: int) -> slice:
+        start = np.searchsorted(self._pmids, pmid, side="left")
+        end = np.searchsorted(self._pmids, pmid, side="right")
+        return slice(int(start), int(end))
+
+    def _rows_for_pmcid(self, pmcid: str) -> np.ndarray:
+        if self._pmcids is None:
+            pmcid_column = self.table["pmcid"]
+            # rows with a PMCID sorted by PMCID, a stable sort keeps the rows of a PMCID in order
+            order = pc.array_sort_indices(pmcid_column, null_placement="at_end")
+            order = order.slice(0, len(pmcid_column) - pmcid_column.null_count)
+            self._pmcids = pmcid_column.take(order).to_numpy(zero_copy_only=False).astype(str)
+            self._pmcid_rows = order.to_numpy().astype(np.int64)
+        start = np.searchsorted(self._pmcids, pmcid, side="left")
+        end = np.searchsorted(self._pmcids, pmcid, side="right")
+        return self._pmcid_rows[start:end]
+
+    def lookup(self, pmid: Optional[int] = None, pmcid: Optional[str] = None) -> pa.Table:
+        """Rows (dataset, config, split, row index) of the documents with a PMID or PMCID."""
+        if (pmid is None) == (pmcid is None):
+            raise ValueError("give either a pmid or a pmcid")
+        if pmid is not None:
+            rows = self._rows(int(pmid))
+            return self.table.slice(rows.start, rows.stop - rows.start)
+        return self.table.take(self._rows_for_pmcid(pmcid))
+
+    def datasets_with(self, pmid: Optional[int] = None, pmcid: Optional[str] = None) -> List[str]:
+        """Names of the datasets with a document with a PMID or PMCID."""
+        if pmid is not None:
+            return sorted(set(self._dataset_names[self._rows(int(pmid))]))
+        return sorted(set(self._dataset_names[self._rows_for_pmcid(pmcid)]))
+
+    def pmids(self, dataset_name: str) -> np.ndarray:
+        """Sorted unique PMIDs of a dataset."""
+        if dataset_name not in self._pmids_by_dataset:
+            mask = self._dataset_names[: self._num_pmids] == dataset_name
+            self._pmids_by_dataset[dataset_name] = np.unique(self._pmids[mask])
+        return self._pmids_by_dataset[dataset_name]
+
+    def shared(self, dataset_a: str, dataset_b: str) -> pa.Table:
+        """Rows of the documents of `dataset_a` and `dataset_b` with a PMID in both."""
+        pmids = np.intersect1d(self.pmids(dataset_a), self.pmids(dataset_b), assume_unique=True)
+        starts = np.searchsorted(self._pmids, pmids, side="left")
+        ends = np.searchsorted(self._pmids, pmids, side="right")
+        lengths = ends - starts
+        rows = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        rows = rows[np.isin(self._dataset_names[rows], [dataset_a, dataset_b])]
+        return self.table.take(rows)
@@ -1,7 +1,25 @@
+"""
+Build the public BigBio text meta-dataset.
+
+Every public config is mapped to text in a worker process and saved as its
+own shard (`<output_dir>/shards/<dataset name>`). Finished shards are recorded
+in `<output_dir>/manifest.json`, so that an interrupted build resumes where it stopped.
+The shards are not copied into a single dataset: `load_metadataset(<output_dir>)` memory-maps
+the shards listed in the manifest and concatenates them when loading.
+
+    python scripts/build_metadataset.py --output_dir bigbio_public_text_concat --num_workers 8
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+from pathlib import Path
 import re
+import shutil
+import time
+import traceback
 
 import datasets
-from datasets import concatenate_datasets
 from datasets import load_dataset
 from loguru import logger
 from tqdm import tqdm
@@ -9,12 +27,13 @@ import requests
 
 from bigbio.hub.hubtools import get_dataset_infos
 from bigbio.hub.hubtools import list_datasets
-from bigbio.hf_maps import BATCH_MAPPERS_TEXT_FROM_SCHEMA
+from bigbio.hf_maps import map_text_from_schema
 
 
 SCHEMAS = ["kb", "text", "pairs", "qa", "t2t", "te"]
 DATASETS_SERVER_API_URL = "https://datasets-server.huggingface.co/splits?dataset="
-STREAMING = False
+SKIP_DATASET_IDS = ("bigbio/tmvar_v2", "bigbio/bioscope", "bigbio/meqsum")
+MANIFEST_FILENAME = "manifest.json"
 
 
 def query_splits_from_ds_server(dataset_id, url=DATASETS_SERVER_API_URL):
@@ -32,10 +51,12 @@ def fetch_public_dataset_info():
     return dataset_infos
 
 
-def get_ds_metas(dataset_infos):
+def get_ds_metas(dataset_infos, skip=()):
 
     ds_metas = {}
     for dsid, dsi in tqdm(dataset_infos.items()):
+        if dsid in skip:
+            continue
         ds_name = dsid.split("/")[1]
         config_pattern = "{}_bigbio_({})".format(ds_name, "|".join(SCHEMAS))
         api_res = query_splits_from_ds_server(dsid)
@@ -71,46 +92,150 @@ def get_ds_metas(dataset_infos):
     return ds_metas
 
 
-def load_datasets(ds_metas):
+def load_manifest(output_dir):
+    path = Path(output_dir) / MANIFEST_FILENAME
+    if path.exists():
+        with open(path) as fp:
+            return json.load(fp)
+    return {"shards": {}}
+
+
+def save_manifest(manifest, output_dir):
+    path = Path(output_dir) / MANIFEST_FILENAME
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as fp:
+        json.dump(manifest, fp, indent=2)
+    os.replace(tmp_path, path)
+
+
+def build_shard(dsid, config_name, split, schema, output_dir):
+    """
+    Map one config to text and save it as a shard (runs in a worker process).
+    """
+    ds_name = dsid.split("/")[1]
+    shard_dir = Path(output_dir) / "shards" / ds_name
+    tmp_dir = shard_dir.with_name(shard_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    start = time.time()
+    ds = load_dataset(dsid, name=config_name, split=split)
+    ds_text = map_text_from_schema(ds, schema, remove_columns=ds.column_names)
+    ds_text.save_to_disk(str(tmp_dir))
+
+    # only complete shards end up in place
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    os.replace(tmp_dir, shard_dir)
+
+    shard = datasets.load_from_disk(str(shard_dir))
+    return {
+        "dataset_id": dsid,
+        "config": config_name,
+        "split": split,
+        "schema": schema,
+        "num_rows": ds_text.num_rows,
+        "files": [
+            (Path("shards") / ds_name / Path(cache_file["filename"]).name).as_posix()
+            for cache_file in shard.cache_files
+        ],
+        "duration": time.time() - start,
+    }
 
-    o_ds = {}
-    t_ds = {}
-    for dsid, ds_meta in ds_metas.items():
-        logger.info("loading {} from {}".format(dsid, ds_meta["good_split"]))
-        if dsid in ("bigbio/tmvar_v2", "bigbio/bioscope", "bigbio/meqsum"):
-            continue
 
-        ds_name = dsid.split("/")[1]
-        ds = load_dataset(
-            dsid,
-            name=ds_meta["good_split"]["config"],
-            split=ds_meta["good_split"]["split"],
-            streaming=STREAMING,
-        )
-        o_ds[ds_name] = ds
-        t_ds[ds_name] = ds.map(
-            BATCH_MAPPERS_TEXT_FROM_SCHEMA[ds_meta["schema"]],
-            remove_columns=ds.features.keys(),
-            batched=True,
-        )
+def build_shards(ds_metas, output_dir, manifest, num_workers):
+
+    with ProcessPoolExecutor(max(num_workers, 1)) as executor:
+        futures = {
+            executor.submit(
+                build_shard,
+                dsid,
+                ds_meta["good_split"]["config"],
+                ds_meta["good_split"]["split"],
+                ds_meta["schema"],
+                output_dir,
+            ): dsid
+            for dsid, ds_meta in ds_metas.items()
+        }
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            dsid = futures[future]
+            try:
+                manifest["shards"][dsid] = {"status": "done", **future.result()}
+                logger.info(f"built shard for {dsid}")
+            except Exception:
+                # failed configs are retried on the next run
+                manifest["shards"][dsid] = {"status": "failed", "error": traceback.format_exc()}
+                logger.warning(f"failed to build shard for {dsid}")
+            save_manifest(manifest, output_dir)
+
+
+def load_metadataset(output_dir):
+    """
+    Load the meta-dataset built in `output_dir`, i.e. the concatenation of all done shards of its manifest.
+    Shards are memory-mapped, nothing is copied.
+    """
+    manifest = load_manifest(output_dir)
+    shard_dirs = [
+        Path(output_dir) / "shards" / dsid.split("/")[1]
+        for dsid, shard in sorted(manifest["shards"].items())
+        if shard["status"] == "done"
+    ]
+    if not shard_dirs:
+        raise ValueError(f"no shards were built in {output_dir}")
+
+    return datasets.concatenate_datasets(
+        [datasets.load_from_disk(str(shard_dir)) for shard_dir in shard_dirs],
+        info=datasets.DatasetInfo(
+            description="BigBio public text meta-dataset",
+            features=datasets.Features({"text": datasets.Value("string")}),
+        ),
+    )
 
-    return o_ds, t_ds
 
+if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description="Build the public BigBio text meta-dataset.")
+    parser.add_argument(
+        "--output_dir",
+        default="bigbio_public_text_concat",
+        help="Directory of the shards and the manifest",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of configs processed in parallel (default is the number of CPUs)",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore the manifest and rebuild all shards",
+    )
+    args = parser.parse_args()
+
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    manifest = {"shards": {}} if args.rebuild else load_manifest(args.output_dir)
+    done = {
+        dsid for dsid, shard in manifest["shards"].items()
+        if shard["status"] == "done"
+        and all((Path(args.output_dir) / filename).exists() for filename in shard["files"])
+    }
+    logger.info(f"resuming with {len(done)} shards already built")
 
+    dataset_infos = fetch_public_dataset_info()
+    ds_metas = get_ds_metas(dataset_infos, skip=done | set(SKIP_DATASET_IDS))
+    build_shards(ds_metas, args.output_dir, manifest, args.num_workers)
 
-dataset_infos = fetch_public_dataset_info()
-ds_metas = get_ds_metas(dataset_infos)
-o_ds, t_ds = load_datasets(ds_metas)
+    ds_concat_t = load_metadataset(args.output_dir)
 
-logger.info(
-    "top 10 datasets by samples:\n {}".format(
-        sorted([(v.num_rows, k) for k,v in t_ds.items()])[-10:]
+    logger.info(
+        "top 10 datasets by samples:\n {}".format(
+            sorted([
+                (shard["num_rows"], dsid.split("/")[1])
+                for dsid, shard in manifest["shards"].items()
+                if shard["status"] == "done"
+            ])[-10:]
+        )
     )
-)
-
-# concatenate all of the bigbio datasets together
-# write them to disk for fast access
-
-ds_concat_t = concatenate_datasets(list(t_ds.values()))
-ds_concat_t.save_to_disk("bigbio_public_text_concat")
+    failed = [dsid for dsid, shard in manifest["shards"].items() if shard["status"] == "failed"]
+    if failed:
+        logger.warning(f"failed datasets (rerun to retry): {failed}")
+    logger.info(f"{args.output_dir} has {ds_concat_t.num_rows} samples")
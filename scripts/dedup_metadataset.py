@@ -0,0 +1,76 @@
+"""
+Find near-duplicate documents in the text meta-dataset (see `build_metadataset.py`).
+
+Writes to `<output_dir>`:
+ - `clusters.jsonl`: one line per cluster of near-duplicates (first document and all members)
+ - `keep_indices.npy`: indices of the deduplicated view (the first document of each cluster)
+ - `params.json`: the MinHash-LSH parameters
+
+    python scripts/dedup_metadataset.py --metadataset_dir bigbio_public_text_concat --output_dir bigbio_public_text_dedup
+
+The deduplicated view is then `load_metadataset(metadataset_dir).select(np.load("<output_dir>/keep_indices.npy"))`.
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+
+from loguru import logger
+import numpy as np
+
+from bigbio.dedup import clusters_from_labels, compute_signatures, find_duplicates
+from build_metadataset import load_metadataset
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Near-duplicate detection with MinHash-LSH.")
+    parser.add_argument("--metadataset_dir", default="bigbio_public_text_concat")
+    parser.add_argument("--output_dir", default="bigbio_public_text_dedup")
+    parser.add_argument("--text_column", default="text")
+    parser.add_argument("--shingle_size", type=int, default=5, help="Number of words per shingle")
+    parser.add_argument("--num_perm", type=int, default=128, help="Length of the MinHash signatures")
+    parser.add_argument("--num_bands", type=int, default=16, help="Number of LSH bands (must divide num_perm)")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.8,
+        help="Minimum estimated Jaccard similarity of near-duplicates",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num_proc", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    rows = args.num_perm // args.num_bands
+    logger.info(
+        f"{args.num_bands} bands of {rows} rows, documents with Jaccard similarity "
+        f"~{(1 / args.num_bands) ** (1 / rows):.2f} are candidates with probability ~0.63"
+    )
+
+    ds = load_metadataset(args.metadataset_dir)
+    signatures = compute_signatures(
+        ds,
+        text_column=args.text_column,
+        shingle_size=args.shingle_size,
+        num_perm=args.num_perm,
+        num_bands=args.num_bands,
+        seed=args.seed,
+        num_proc=args.num_proc,
+    )
+    labels = find_duplicates(signatures, args.threshold)
+    clusters = clusters_from_labels(labels)
+    keep_indices = np.flatnonzero(labels == np.arange(len(labels)))
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / "clusters.jsonl", "w") as fp:
+        for first, members in clusters.items():
+            fp.write(json.dumps({"first": first, "members": members}) + "\n")
+    np.save(output_dir / "keep_indices.npy", keep_indices)
+    with open(output_dir / "params.json", "w") as fp:
+        json.dump({**vars(args), "num_rows": len(labels), "num_kept": len(keep_indices)}, fp, indent=2)
+
+    logger.info(
+        f"{len(clusters)} clusters of near-duplicates, "
+        f"keeping {len(keep_indices)} of {len(labels)} documents"
+    )
@@ -0,0 +1,68 @@
+"""
+Report documents shared between the splits of the public BigBio configs (see `bigbio/leakage.py`).
+
+Writes to `<output_dir>`:
+ - `splits.csv`: the (config, split) of each row/column of the matrices and its number of documents
+ - `overlap_<key type>.csv`: overlap matrix for text fingerprints, PubMed IDs and either of them ("any")
+ - `leaks.csv`: documents of evaluation splits found in the training split of another dataset
+
+    python scripts/leakage_report.py --output_dir bigbio_leakage
+"""
+import argparse
+from pathlib import Path
+
+from loguru import logger
+import pandas as pd
+
+from bigbio.dataloader import BigBioConfigHelpers
+from bigbio.leakage import KEY_TYPES, leaks, overlap_matrices, split_keys
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Cross-dataset train/test leakage report.")
+    parser.add_argument("--output_dir", default="bigbio_leakage")
+    parser.add_argument("--dataset_names", nargs="*", help="Only these datasets (default is all public datasets)")
+    parser.add_argument("--key_types", nargs="*", default=KEY_TYPES, choices=KEY_TYPES)
+    parser.add_argument("--include_large", action="store_true", help="Also include large configs")
+    args = parser.parse_args()
+
+    conhelps = BigBioConfigHelpers()
+    conhelps = conhelps.filtered(lambda x: x.is_bigbio_schema and not x.is_local and not x.is_broken)
+    if args.dataset_names:
+        conhelps = conhelps.filtered(lambda x: x.dataset_name in args.dataset_names)
+    if not args.include_large:
+        conhelps = conhelps.filtered(lambda x: not x.is_large)
+
+    splits = []
+    failed = []
+    for helper in conhelps:
+        logger.info(f"fingerprinting {helper.config.name}")
+        try:
+            splits.extend(split_keys(helper))
+        except Exception as err:
+            logger.warning(f"skipping {helper.config.name}: {err!r}")
+            failed.append(helper.config.name)
+
+    matrices = overlap_matrices(splits, args.key_types)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    names = [split.name for split in splits]
+    pd.DataFrame(
+        {
+            "name": names,
+            "dataset_name": [split.dataset_name for split in splits],
+            "config_name": [split.config_name for split in splits],
+            "split": [split.split for split in splits],
+            "num_rows": [split.num_rows for split in splits],
+        }
+    ).to_csv(output_dir / "splits.csv", index=False)
+    for key_type, matrix in matrices.items():
+        pd.DataFrame(matrix, index=names, columns=names).to_csv(output_dir / f"overlap_{key_type}.csv")
+
+    df_leaks = pd.DataFrame(leaks(splits, matrices["any"]), columns=["eval", "train", "num_leaked", "fraction_leaked"])
+    df_leaks.to_csv(output_dir / "leaks.csv", index=False)
+
+    logger.info(f"{len(splits)} splits of {len(conhelps) - len(failed)} configs ({len(failed)} failed: {failed})")
+    logger.info(f"{len(df_leaks)} (eval, train) pairs with leaked documents, most leaked:\n{df_leaks.head(20)}")
@@ -1,5 +1,5 @@
 import sys
-from bigbio.hf_maps import BATCH_MAPPERS_TEXT_FROM_SCHEMA
+from bigbio.hf_maps import map_text_from_schema
 from bigbio.dataloader import BigBioConfigHelpers
 from datasets import load_dataset
 from nomic import atlas
@@ -19,13 +19,10 @@ def load_conhelps():
 
 def load_data(conhelp):
     try:
-        dsd = conhelp.load_dataset()
+        dsd = conhelp.load_text_view()
     except:
         return None
-    dsd = dsd.map(
-        BATCH_MAPPERS_TEXT_FROM_SCHEMA[conhelp.bigbio_schema_caps.lower()],
-        batched=True,
-    )
+    dsd = map_text_from_schema(dsd, conhelp.bigbio_schema_caps.lower())
     return dsd
 
 
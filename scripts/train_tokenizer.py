@@ -1,45 +1,74 @@
-import datasets
+from multiprocessing import Pool
+
 from loguru import logger
 import numpy as np
 from transformers import AutoTokenizer
 
+from build_metadataset import load_metadataset
+
 
 NUM_PROC = 8
 
 
-def get_training_corpus(dataset, batch_size=1_000):
-    for start_idx in range(0, len(dataset), batch_size):
-        samples = dataset[start_idx : start_idx + batch_size]
-        yield samples["text"]
+def iter_shard_batches(dataset, num_shards, batch_size=1_000, seed=42):
+    """
+    Batches of texts of contiguous shards, visiting the shards in a shuffled order.
+
+    Unlike `dataset.shuffle`, this does not create an indices mapping,
+    so the underlying Arrow files are read sequentially.
+    """
+    shard_order = np.random.default_rng(seed).permutation(num_shards)
+    for index in shard_order:
+        shard = dataset.shard(num_shards, int(index), contiguous=True).with_format("arrow")
+        for start_idx in range(0, len(shard), batch_size):
+            yield shard[start_idx : start_idx + batch_size].column("text").to_pylist()
 
-def map_tokenize(examples):
-    return tokenizer(examples['text'])
 
-def map_batch_num_tokens(examples):
-    return {"num_tokens": [len(el) for el in examples["input_ids"]]}
+def count_shard_tokens(tokenizer, dataset, num_shards, index, batch_size=1_000):
+    """Number of tokens of a contiguous shard, without writing any new column."""
+    shard = dataset.shard(num_shards, index, contiguous=True).with_format("arrow")
+    num_tokens = 0
+    for start_idx in range(0, len(shard), batch_size):
+        texts = shard[start_idx : start_idx + batch_size].column("text").to_pylist()
+        num_tokens += sum(len(el) for el in tokenizer(texts)["input_ids"])
+    return num_tokens
+
+
+def count_tokens(tokenizer, dataset, num_proc=NUM_PROC, batch_size=1_000):
+    num_shards = max(num_proc, 1) * 4
+    with Pool(num_proc) as pool:
+        counts = pool.starmap(
+            count_shard_tokens,
+            [(tokenizer, dataset, num_shards, index, batch_size) for index in range(num_shards)],
+        )
+    return sum(counts)
 
 
 meta_ds_name = "bigbio_public_text_concat"
+# output of dedup_metadataset.py, None to keep near-duplicates
+dedup_dir = None
 clone_from_name = "gpt2"
 batch_size = 1_000
 vocab_size = 20_000
+# number of contiguous shards, trained on in a shuffled order
+num_shards = 256
 
 
-ds_all = datasets.load_from_disk(meta_ds_name)
-ds_all = ds_all.shuffle(seed=42)
-ds_sml = ds_all.select(np.arange(500_000))
-#ds_train = ds_sml
-ds_train = ds_all
-
+if __name__ == "__main__":
 
-clone_from_tokenizer = AutoTokenizer.from_pretrained(clone_from_name)
+    ds_all = load_metadataset(meta_ds_name)
+    if dedup_dir is not None:
+        # sorted indices, so reads stay sequential
+        ds_all = ds_all.select(np.load(f"{dedup_dir}/keep_indices.npy"))
+    ds_train = ds_all
 
-training_corpus = get_training_corpus(ds_train, batch_size)
-tokenizer = clone_from_tokenizer.train_new_from_iterator(training_corpus, vocab_size)
+    clone_from_tokenizer = AutoTokenizer.from_pretrained(clone_from_name)
 
-ds_train = ds_train.map(map_tokenize, batched=True, num_proc=NUM_PROC)
-ds_train = ds_train.map(map_batch_num_tokens, batched=True, num_proc=NUM_PROC)
+    training_corpus = iter_shard_batches(ds_train, min(num_shards, max(len(ds_train), 1)), batch_size)
+    tokenizer = clone_from_tokenizer.train_new_from_iterator(
+        training_corpus, vocab_size, length=len(ds_train)
+    )
 
-total_tokens = sum(ds_train["num_tokens"])
+    total_tokens = count_tokens(tokenizer, ds_train, NUM_PROC, batch_size)
 
-logger.info("ds_train has {} million tokens.".format(total_tokens/1e6))
+    logger.info("ds_train has {} million tokens.".format(total_tokens/1e6))
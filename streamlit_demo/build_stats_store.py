@@ -0,0 +1,159 @@
+"""
+Precompute the statistics shown by the streamlit apps (see `stats_store.py`).
+
+Configs whose Hub repo did not change since they were stored are skipped.
+To build the store from the root directory:
+
+    python streamlit_demo/build_stats_store.py --store_dir bigbio_stats
+"""
+import argparse
+import dataclasses
+import traceback
+from pathlib import Path
+
+import pandas as pd
+from huggingface_hub import HfApi
+from rich import print as rprint
+
+from ngram import NgramCounts, count_ngrams, decode, tokenize
+from stats_store import DEFAULT_STORE_DIR, load_manifest, save_config_stats, save_manifest
+
+from bigbio.dataloader import SCHEMA_TO_METADATA_CLS, TEXT_VIEW_COLUMNS, BigBioConfigHelpers, project_columns
+from bigbio.hub.hubtools import HF_ORG
+
+_TEXT_MAPS = {
+    "bigbio_kb": ["text"],
+    "bigbio_text": ["text"],
+    "bigbio_qa": ["question", "context"],
+    "bigbio_te": ["premise", "hypothesis"],
+    "bigbio_pairs": ["text_1", "text_2"],
+    "bigbio_t2t": ["text_1", "text_2"],
+}
+
+N = 3
+
+
+def entry_texts(entry, schema):
+    if schema == "bigbio_kb":
+        return [(passage["type"], passage[key][0]) for passage in entry["passages"] for key in _TEXT_MAPS[schema]]
+    return [(key, entry[key]) for key in _TEXT_MAPS[schema]]
+
+
+def token_lengths_and_ngrams(dataset, schema, num_proc=1):
+    """Token lengths of each entry and n-gram counts of each split (counted in `num_proc` processes)."""
+    hist_data = []
+    ngram_counts = {}
+    for split, data in dataset.items():
+        split_texts = []
+        for entry in data:
+            result = {}
+            for result_key, text in entry_texts(entry, schema):
+                result[result_key] = sum(len(sentence) for sentence in tokenize(text))
+                split_texts.append(text)
+            result["total_token_length"] = sum(result.values())
+            result["split"] = split
+            hist_data.append(result)
+        ngram_counts[split] = count_ngrams(split_texts, N, num_proc=num_proc)
+    return pd.DataFrame(hist_data), ngram_counts
+
+
+def top_ngrams(data, schema, counts, top_k):
+    most_common = counts.most_common(top_k)
+    texts = (text for entry in data for _, text in entry_texts(entry, schema))
+    strings = decode(most_common.keys, texts, N)
+    return [(strings[key], count) for key, count in zip(most_common.keys.tolist(), most_common.counts.tolist())]
+
+
+def ngram_sketches(ngram_counts, sketch_size):
+    """Keys of each split below the `sketch_size`-th smallest key of all splits."""
+    union = NgramCounts.merge(list(ngram_counts.values())).keys
+    if len(union) <= sketch_size:
+        return {split: counts.keys for split, counts in ngram_counts.items()}
+    threshold = union[sketch_size - 1]
+    return {split: counts.keys[counts.keys <= threshold] for split, counts in ngram_counts.items()}
+
+
+def hub_revision(dataset_name):
+    """Commit of the Hub repo of a dataset, which is the revision that is loaded and stored."""
+    return HfApi().dataset_info(f"{HF_ORG}/{dataset_name}").sha
+
+
+def config_key(helper, revision):
+    return f"{helper.bigbio_version}:{helper.source_version}:{revision}:{N}"
+
+
+def build_config(helper, revision, store_dir, sketch_size, top_k, num_proc=1):
+    schema = helper.config.schema
+    # loaded once, the text view only keeps the text columns of the same dataset
+    dsd = helper.load_dataset(revision=revision)
+    metadata = {split: SCHEMA_TO_METADATA_CLS[schema].from_dataset(ds) for split, ds in dsd.items()}
+    dataset = project_columns(dsd, TEXT_VIEW_COLUMNS[schema])
+    token_lengths, ngram_counts = token_lengths_and_ngrams(dataset, schema, num_proc=num_proc)
+    most_common = {
+        split: {
+            "num_distinct": len(counts),
+            "most_common": top_ngrams(dataset[split], helper.config.schema, counts, top_k),
+        }
+        for split, counts in ngram_counts.items()
+    }
+    save_config_stats(
+        store_dir,
+        helper.config.name,
+        {split: dataclasses.asdict(meta) for split, meta in metadata.items()},
+        token_lengths,
+        ngram_sketches(ngram_counts, sketch_size),
+        most_common,
+    )
+    return list(metadata)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Precompute statistics for the streamlit apps.")
+    parser.add_argument("--store_dir", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--dataset_names", nargs="*", help="Only these datasets (default is all public datasets)")
+    parser.add_argument("--sketch_size", type=int, default=1 << 16, help="Number of n-gram hashes kept per config")
+    parser.add_argument("--top_k", type=int, default=100, help="Number of most common n-grams kept per split")
+    parser.add_argument("--num_proc", type=int, default=1, help="Number of processes counting n-grams")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all configs")
+    args = parser.parse_args()
+
+    conhelps = BigBioConfigHelpers()
+    conhelps = conhelps.filtered(lambda x: x.dataset_name != "pubtator_central")
+    conhelps = conhelps.filtered(lambda x: x.is_bigbio_schema)
+    conhelps = conhelps.filtered(lambda x: not x.is_local)
+    if args.dataset_names:
+        conhelps = conhelps.filtered(lambda x: x.dataset_name in args.dataset_names)
+
+    store_dir = Path(args.store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {} if args.rebuild else load_manifest(store_dir)
+
+    revisions = {}
+    for helper in conhelps:
+        name = helper.config.name
+        try:
+            if helper.dataset_name not in revisions:
+                revisions[helper.dataset_name] = hub_revision(helper.dataset_name)
+        except Exception:
+            rprint(f"[red]failed {name}[/red]\n{traceback.format_exc()}")
+            continue
+        revision = revisions[helper.dataset_name]
+        key = config_key(helper, revision)
+        if manifest.get(name, {}).get("key") == key:
+            continue
+        rprint(f"building stats of {name}")
+        try:
+            splits = build_config(helper, revision, store_dir, args.sketch_size, args.top_k, args.num_proc)
+        except Exception:
+            rprint(f"[red]failed {name}[/red]\n{traceback.format_exc()}")
+            continue
+        manifest[name] = {
+            "dataset_name": helper.dataset_name,
+            "schema": helper.config.schema,
+            "splits": splits,
+            "key": key,
+        }
+        save_manifest(manifest, store_dir)
+
+    rprint(f"{len(manifest)} configs in {store_dir}")
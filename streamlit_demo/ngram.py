@@ -1,74 +1,185 @@
 # partially from https://gist.github.com/gaulinmp/da5825de975ed0ea6a24186434c24fe4
-from nltk.util import ngrams
-from nltk.corpus import stopwords
-import spacy
-import pandas as pd
+"""
+N-gram counting for the demo and analysis scripts.
+
+Texts are lowercased, split into sentences on periods and newlines, reduced to
+letters and stripped of stopwords. N-grams never cross sentence boundaries.
+
+Every n-gram is hashed to a 64 bit integer key (stable across processes), and
+counts are kept as sorted arrays of keys and counts (`NgramCounts`), so that
+counts of batches counted in worker processes are merged, and splits are
+intersected or united, with NumPy instead of Python dicts of strings.
+"""
+import hashlib
 import re
-from itertools import chain
-from collections import Counter
-from datasets import load_dataset
+from dataclasses import dataclass
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from spacy.lang.en.stop_words import STOP_WORDS
 
+from bigbio.hashing import POLY, mix
 
-nlp = spacy.load("en_core_web_sm")
-nlp.add_pipe("sentencizer")
-STOPWORDS = nlp.Defaults.stop_words
+STOPWORDS = STOP_WORDS
 
 N = 5
 re_sent_ends_naive = re.compile(r'[.\n]')
-re_stripper_naive = re.compile('[^a-zA-Z\.\n]')
-
-splitter_naive = lambda x: re_sent_ends_naive.split(re_stripper_naive.sub(' ', x))
-
+re_stripper_naive = re.compile(r'[^a-zA-Z\.\n]')
 
 # list of tokens for one sentence
 def remove_stop_words(text):
-    result = []
-    for w in text:
-        if w not in STOPWORDS:
-            result.append(w)
-    return result
+    return [w for w in text if w not in STOPWORDS]
 
 
-# get sentence from multiple sentences
-def parse_sentences(text, nlp):
-    doc = nlp(text)
-    sentences = (remove_stop_words(sent) for sent in doc.sents)
-    return sentences
+def tokenize(txt: Optional[str]) -> List[List[str]]:
+    """Sentences of lowercased words without stopwords."""
+    if not txt:
+        return []
+    sentences = re_sent_ends_naive.split(re_stripper_naive.sub(" ", txt.lower()))
+    return [remove_stop_words(x.split()) for x in sentences if x]
 
 
 def get_tuples_manual_sentences(txt, N):
     """Naive get tuples that uses periods or newlines to denote sentences."""
     if not txt:
         return None, []
-    sentences = (x.split() for x in splitter_naive(txt) if x)
-    sentences = list(map(remove_stop_words, list(sentences)))
-    # sentences = (remove_stop_words(nlp(x)) for x in splitter_naive(txt) if x)
-    # sentences = parse_sentences(txt, nlp)
-    # print(list(sentences))
-    ng = (ngrams(x, N) for x in sentences if len(x) >= N)
-    return sentences, list(chain(*ng))
-
-
-def count_by_split(split_data):
-    c = Counter()
-    for entry in split_data:
-        text = entry['text']
-        sents, tup = get_tuples_manual_sentences(text, N)
-        tup = ["_".join(ta) for ta in tup]
-        c.update(tup)
-    return c
-
-
-# data = load_dataset("bigbio/biodatasets/chemdner/chemdner.py", name="chemdner_bigbio_text")
-# counters = []
-# for split, split_data in data.items():
-#     split_counter = count_by_split(split_data)
-#     counters.append(split_counter)
-
-# ab_intersect = counters[0] & counters[1]
-# diff = {x: count for x, count in counters[0].items() if x not in ab_intersect.keys() and count > 2}
-# if len(counters) > 2:
-#     bc_intersect = counters[1] & counters[2]
-# print(ab_intersect.most_common(10))
-# print(Counter(diff).most_common(10))
-# data.cleanup_cache_files()
+    sentences = tokenize(txt)
+    ng = (zip(*(x[i:] for i in range(N))) for x in sentences if len(x) >= N)
+    return sentences, [tup for tups in ng for tup in tups]
+
+
+class _TokenHashes(dict):
+    """Hash of each token, 0 for stopwords."""
+
+    def __missing__(self, token: str) -> int:
+        if token in STOPWORDS:
+            value = 0
+        else:
+            value = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little") or 1
+        self[token] = value
+        return value
+
+
+class NgramHasher:
+    """Hashes n-grams of texts, caching the hash of each distinct token."""
+
+    def __init__(self, n: int = N):
+        self.n = n
+        self.token_hashes = _TokenHashes()
+
+    def _ngram_keys(self, tokens: List[str], sentence_lengths: List[int]) -> np.ndarray:
+        token_hashes = np.fromiter(map(self.token_hashes.__getitem__, tokens), dtype=np.uint64, count=len(tokens))
+        sentence_ids = np.repeat(np.arange(len(sentence_lengths)), sentence_lengths)
+        keep = token_hashes != 0
+        token_hashes, sentence_ids = token_hashes[keep], sentence_ids[keep]
+        num_ngrams = len(token_hashes) - self.n + 1
+        if num_ngrams <= 0:
+            return np.zeros(0, dtype=np.uint64)
+        # n-grams starting and ending in the same sentence
+        valid = sentence_ids[: num_ngrams] == sentence_ids[self.n - 1 :]
+        keys = token_hashes[: num_ngrams].copy()
+        for i in range(1, self.n):
+            keys = mix(keys * POLY + token_hashes[i : i + num_ngrams])
+        return keys[valid]
+
+    def hash_sentences(self, sentences: List[List[str]]) -> np.ndarray:
+        """Keys of all n-grams of tokenized sentences (see `tokenize`)."""
+        return self._ngram_keys([token for sentence in sentences for token in sentence], list(map(len, sentences)))
+
+    def hash_texts(self, texts: Iterable[Optional[str]]) -> np.ndarray:
+        """Keys of all n-grams of texts, hashed in one batch."""
+        tokens, sentence_lengths = [], []
+        for text in texts:
+            if not text:
+                continue
+            for sentence in re_sent_ends_naive.split(re_stripper_naive.sub(" ", text.lower())):
+                words = sentence.split()
+                tokens.extend(words)
+                sentence_lengths.append(len(words))
+        return self._ngram_keys(tokens, sentence_lengths)
+
+
+@dataclass
+class NgramCounts:
+    """Counts of n-grams, as sorted unique keys and their counts."""
+
+    keys: np.ndarray
+    counts: np.ndarray
+
+    @classmethod
+    def from_keys(cls, keys: np.ndarray) -> "NgramCounts":
+        keys, counts = np.unique(keys, return_counts=True)
+        return cls(keys, counts.astype(np.int64))
+
+    @classmethod
+    def merge(cls, counts_list: Sequence["NgramCounts"]) -> "NgramCounts":
+        """Sum of counts."""
+        if not counts_list:
+            return cls(np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64))
+        keys = np.concatenate([counts.keys for counts in counts_list])
+        counts = np.concatenate([counts.counts for counts in counts_list])
+        order = np.argsort(keys, kind="stable")
+        keys, counts = keys[order], counts[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+        return cls(keys[starts], np.add.reduceat(counts, starts) if len(keys) else counts)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def most_common(self, k: int) -> "NgramCounts":
+        order = np.argsort(-self.counts, kind="stable")[:k]
+        return NgramCounts(self.keys[order], self.counts[order])
+
+    def intersection(self, other: "NgramCounts") -> "NgramCounts":
+        """N-grams of both, with their smallest count (like `Counter.__and__`)."""
+        keys, i, j = np.intersect1d(self.keys, other.keys, assume_unique=True, return_indices=True)
+        return NgramCounts(keys, np.minimum(self.counts[i], other.counts[j]))
+
+    def union(self, other: "NgramCounts") -> "NgramCounts":
+        """N-grams of either, with the sum of their counts (like `Counter.__add__`)."""
+        return NgramCounts.merge([self, other])
+
+    __and__ = intersection
+    __or__ = union
+
+
+def _count_batch(args: Tuple[List[Optional[str]], int]) -> NgramCounts:
+    texts, n = args
+    return NgramCounts.from_keys(NgramHasher(n).hash_texts(texts))
+
+
+def count_ngrams(
+    texts: Sequence[Optional[str]],
+    n: int = N,
+    num_proc: int = 1,
+    batch_size: int = 1_000,
+) -> NgramCounts:
+    """Counts of the n-grams of texts, counting batches of texts in `num_proc` processes."""
+    batches = [(list(texts[start : start + batch_size]), n) for start in range(0, len(texts), batch_size)]
+    if num_proc > 1 and len(batches) > 1:
+        with Pool(num_proc) as pool:
+            return NgramCounts.merge(pool.map(_count_batch, batches))
+    return NgramCounts.merge([_count_batch(batch) for batch in batches])
+
+
+def decode(keys: np.ndarray, texts: Iterable[Optional[str]], n: int = N) -> Dict[int, str]:
+    """`"_".join` strings of n-gram keys (e.g. of `most_common`), scanning texts until all are found."""
+    hasher = NgramHasher(n)
+    missing = set(int(key) for key in keys)
+    strings = {}
+    for text in texts:
+        if not missing:
+            break
+        for sentence in tokenize(text):
+            if len(sentence) < n:
+                continue
+            for key, start in zip(hasher.hash_sentences([sentence]).tolist(), range(len(sentence))):
+                if key in missing:
+                    strings[key] = "_".join(sentence[start : start + n])
+                    missing.discard(key)
+    return strings
+
@@ -0,0 +1,108 @@
+"""
+Local store of precomputed statistics for the streamlit apps.
+
+The store is written offline by `build_stats_store.py` and has one directory per config:
+
+    <store_dir>/manifest.json                  configs in the store (dataset, schema, splits)
+    <store_dir>/<config>/metadata.json         `helper.get_metadata()` of each split
+    <store_dir>/<config>/token_lengths.parquet token lengths of each entry (and its split)
+    <store_dir>/<config>/ngrams.npz            n-gram sketch of each split
+    <store_dir>/<config>/top_ngrams.json       most common n-grams and distinct n-gram count of each split
+
+An n-gram sketch is the set of n-gram keys (see `ngram.py`) below a threshold shared by all splits of a config,
+so that the relative sizes of their intersections are those of the full n-gram sets.
+
+Reading the store only needs pandas and numpy (no dataset loading or tokenization).
+"""
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_DIR = "bigbio_stats"
+MANIFEST_FILENAME = "manifest.json"
+
+
+def _atomic_write_json(obj, path: Path):
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as fp:
+        json.dump(obj, fp, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(store_dir: Union[str, Path]) -> Dict:
+    path = Path(store_dir) / MANIFEST_FILENAME
+    if path.exists():
+        with open(path) as fp:
+            return json.load(fp)
+    return {}
+
+
+def save_manifest(manifest: Dict, store_dir: Union[str, Path]):
+    _atomic_write_json(manifest, Path(store_dir) / MANIFEST_FILENAME)
+
+
+def configs_by_dataset(manifest: Dict) -> Dict[str, List[str]]:
+    configs = {}
+    for config_name, entry in sorted(manifest.items()):
+        configs.setdefault(entry["dataset_name"], []).append(config_name)
+    return configs
+
+
+def save_config_stats(
+    store_dir: Union[str, Path],
+    config_name: str,
+    metadata: Dict[str, Dict],
+    token_lengths: pd.DataFrame,
+    ngram_sketches: Dict[str, np.ndarray],
+    top_ngrams: Dict[str, Dict],
+):
+    config_dir = Path(store_dir) / config_name
+    config_dir.mkdir(parents=True, exist_ok=True)
+    _atomic_write_json(metadata, config_dir / "metadata.json")
+    token_lengths.to_parquet(config_dir / "token_lengths.parquet", index=False)
+    np.savez(config_dir / "ngrams.npz", **ngram_sketches)
+    _atomic_write_json(top_ngrams, config_dir / "top_ngrams.json")
+
+
+def load_metadata(store_dir: Union[str, Path], config_name: str) -> Dict[str, SimpleNamespace]:
+    """Metadata of each split, with the same attributes as the dataclasses of `get_metadata`."""
+    with open(Path(store_dir) / config_name / "metadata.json") as fp:
+        return {split: SimpleNamespace(**meta) for split, meta in json.load(fp).items()}
+
+
+def load_token_lengths(store_dir: Union[str, Path], config_name: str) -> pd.DataFrame:
+    return pd.read_parquet(Path(store_dir) / config_name / "token_lengths.parquet")
+
+
+def load_ngram_sketches(store_dir: Union[str, Path], config_name: str) -> Dict[str, np.ndarray]:
+    """Sorted n-gram keys of each split (see `venn_subsets`)."""
+    with np.load(Path(store_dir) / config_name / "ngrams.npz") as sketches:
+        return {split: sketches[split] for split in sketches.files}
+
+
+def load_top_ngrams(store_dir: Union[str, Path], config_name: str) -> Dict[str, Dict]:
+    with open(Path(store_dir) / config_name / "top_ngrams.json") as fp:
+        return json.load(fp)
+
+
+def venn_subsets(keys_list: Sequence[np.ndarray]) -> Tuple[int, ...]:
+    """
+    Sizes of the regions of a Venn diagram of 2 or 3 sets of keys, in the order of `venn2`/`venn3` `subsets`:
+    (10, 01, 11) and (100, 010, 110, 001, 101, 011, 111).
+    """  # noqa
+    keys = np.concatenate([np.unique(k) for k in keys_list])
+    masks = np.concatenate(
+        [np.full(len(np.unique(k)), 1 << i, dtype=np.int64) for i, k in enumerate(keys_list)]
+    )
+    order = np.argsort(keys, kind="stable")
+    keys, masks = keys[order], masks[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    region_sizes = np.bincount(
+        np.bitwise_or.reduceat(masks, starts) if len(keys) else masks, minlength=1 << len(keys_list)
+    )
+    return tuple(int(size) for size in region_sizes[1:])
@@ -1,16 +1,18 @@
-from collections import Counter
-
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
-from datasets import load_dataset
 from matplotlib import pyplot as plt
 from matplotlib_venn import venn2, venn3
-from ngram import get_tuples_manual_sentences
-from rich import print as rprint
-
-from bigbio.dataloader import BigBioConfigHelpers
+from stats_store import (
+    DEFAULT_STORE_DIR,
+    configs_by_dataset,
+    load_manifest,
+    load_metadata,
+    load_ngram_sketches,
+    load_token_lengths,
+    venn_subsets,
+)
 
 # from matplotlib_venn_wordcloud import venn2_wordcloud, venn3_wordcloud
 
@@ -33,30 +35,6 @@ def norm(lengths):
     return mu, sigma
 
 
-def load_helper():
-    conhelps = BigBioConfigHelpers()
-    conhelps = conhelps.filtered(lambda x: x.dataset_name != "pubtator_central")
-    conhelps = conhelps.filtered(lambda x: x.is_bigbio_schema)
-    conhelps = conhelps.filtered(lambda x: not x.is_local)
-    rprint(
-        "loaded {} configs from {} datasets".format(
-            len(conhelps),
-            len(set([helper.dataset_name for helper in conhelps])),
-        )
-    )
-    return conhelps
-
-
-_TEXT_MAPS = {
-    "bigbio_kb": ["text"],
-    "bigbio_text": ["text"],
-    "bigbio_qa": ["question", "context"],
-    "bigbio_te": ["premise", "hypothesis"],
-    "bigbio_tp": ["text_1", "text_2"],
-    "bigbio_pairs": ["text_1", "text_2"],
-    "bigbio_t2t": ["text_1", "text_2"],
-}
-
 IBM_COLORS = [
     "#648fff",
     "#dc267f",
@@ -70,54 +48,6 @@ IBM_COLORS = [
 N = 3
 
 
-def token_length_per_entry(entry, schema, counter):
-    result = {}
-    if schema == "bigbio_kb":
-        for passage in entry["passages"]:
-            result_key = passage["type"]
-            for key in _TEXT_MAPS[schema]:
-                text = passage[key][0]
-                sents, ngrams = get_tuples_manual_sentences(text.lower(), N)
-                toks = [tok for sent in sents for tok in sent]
-                tups = ["_".join(tup) for tup in ngrams]
-                counter.update(tups)
-                result[result_key] = len(toks)
-    else:
-        for key in _TEXT_MAPS[schema]:
-            text = entry[key]
-            sents, ngrams = get_tuples_manual_sentences(text.lower(), N)
-            toks = [tok for sent in sents for tok in sent]
-            result[key] = len(toks)
-            tups = ["_".join(tup) for tup in ngrams]
-            counter.update(tups)
-    return result, counter
-
-
-def parse_token_length_and_n_gram(dataset, data_config, st=None):
-    hist_data = []
-    n_gram_counters = []
-    rprint(data_config)
-    for split, data in dataset.items():
-        my_bar = st.progress(0)
-        total = len(data)
-        n_gram_counter = Counter()
-        for i, entry in enumerate(data):
-            my_bar.progress(int(i / total * 100))
-            result, n_gram_counter = token_length_per_entry(
-                entry, data_config.schema, n_gram_counter
-            )
-            result["total_token_length"] = sum([v for k, v in result.items()])
-            result["split"] = split
-            hist_data.append(result)
-        # remove single count
-        # n_gram_counter = Counter({x: count for x, count in n_gram_counter.items() if count > 1})
-        n_gram_counters.append(n_gram_counter)
-        my_bar.empty()
-    st.write("token lengths complete!")
-
-    return pd.DataFrame(hist_data), n_gram_counters
-
-
 def center_title(fig):
     fig.update_layout(
         title={"y": 0.9, "x": 0.5, "xanchor": "center", "yanchor": "top"},
@@ -192,45 +122,36 @@ def parse_label_counter(metadata, counter_type):
 
 
 if __name__ == "__main__":
-    # load helpers
-    conhelps = load_helper()
-    configs_set = set()
-
-    for conhelper in conhelps:
-        configs_set.add(conhelper.dataset_name)
-
     # setup page, sidebar, columns
     st.set_page_config(layout="wide")
+
+    # statistics are precomputed by build_stats_store.py
+    store_dir = st.sidebar.text_input("stats store", DEFAULT_STORE_DIR)
+    manifest = load_manifest(store_dir)
+    if not manifest:
+        st.error(f"No statistics in {store_dir}, run `python streamlit_demo/build_stats_store.py` first")
+        st.stop()
+    configs = configs_by_dataset(manifest)
+
     s = st.session_state
     if not s:
         s.pressed_first_button = False
-    data_name = st.sidebar.selectbox("dataset", configs_set)
+    data_name = st.sidebar.selectbox("dataset", sorted(configs))
     st.sidebar.write("you selected:", data_name)
     st.header(f"Dataset stats for {data_name}")
 
     # setup data configs
-    data_helpers = conhelps.for_dataset(data_name)
-    data_configs = [d.config for d in data_helpers]
-    data_config_names = [d.config.name for d in data_helpers]
-    data_config_name = st.sidebar.selectbox("config", set(data_config_names))
+    data_config_names = configs[data_name]
+    data_config_name = st.sidebar.selectbox("config", data_config_names)
 
     if st.sidebar.button("fetch") or s.pressed_first_button:
         s.pressed_first_button = True
-        helper = conhelps.for_config_name(data_config_name)
-        metadata_helper = helper.get_metadata()
+        metadata_helper = load_metadata(store_dir, data_config_name)
 
         parse_metrics(metadata_helper, st.sidebar)
 
-        # load HF dataset
-        data_idx = data_config_names.index(data_config_name)
-        data_config = data_configs[data_idx]
-        dataset = load_dataset(
-            f"bigbio/biodatasets/{data_name}/{data_name}.py", name=data_config_name
-        )
         # general token length
-        tok_hist_data, ngram_counters = parse_token_length_and_n_gram(
-            dataset, data_config, st.sidebar
-        )
+        tok_hist_data = load_token_lengths(store_dir, data_config_name)
         # draw token distribution
         draw_histogram(tok_hist_data, "total_token_length", st)
         # general counter(s)
@@ -244,31 +165,16 @@ if __name__ == "__main__":
         label_df = label_df[label_df[counter_type] >= filter_value]
         # draw bar chart for counter
         draw_bar(label_df, "labels", counter_type, col2)
+        ngram_sketches = load_ngram_sketches(store_dir, data_config_name)
         venn_fig, ax = plt.subplots()
-        if len(ngram_counters) == 2:
-            union_counter = ngram_counters[0] + ngram_counters[1]
-            print(ngram_counters[0].most_common(10))
-            print(ngram_counters[1].most_common(10))
-            total = len(union_counter.keys())
-            ngram_counter_sets = [
-                set(ngram_counter.keys()) for ngram_counter in ngram_counters
-            ]
-            venn2(
-                ngram_counter_sets,
-                dataset.keys(),
-                set_colors=IBM_COLORS[:3],
-                subset_label_formatter=lambda x: f"{(x/total):1.0%}",
-            )
-        else:
-            union_counter = ngram_counters[0] + ngram_counters[1] + ngram_counters[2]
-            total = len(union_counter.keys())
-            ngram_counter_sets = [
-                set(ngram_counter.keys()) for ngram_counter in ngram_counters
-            ]
-            venn3(
-                ngram_counter_sets,
-                dataset.keys(),
-                set_colors=IBM_COLORS[:4],
+        if len(ngram_sketches) in (2, 3):
+            subsets = venn_subsets(list(ngram_sketches.values()))
+            total = sum(subsets)
+            venn = venn2 if len(ngram_sketches) == 2 else venn3
+            venn(
+                subsets,
+                ngram_sketches.keys(),
+                set_colors=IBM_COLORS[: len(ngram_sketches) + 1],
                 subset_label_formatter=lambda x: f"{(x/total):1.0%}",
             )
         venn_fig.suptitle(f"{N}-gram intersection for {data_name}", fontsize=20)
@@ -5,13 +5,10 @@ import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.io as pio
-from datasets import load_dataset
 from plotly.subplots import make_subplots
 from rich import print as rprint
 
-from collections import Counter
-
-from ngram import get_tuples_manual_sentences
+from ngram import NgramCounts, NgramHasher, tokenize
 
 from bigbio.dataloader import BigBioConfigHelpers
 import sys
@@ -84,55 +81,35 @@ SPLIT_COLOR_MAP = {
 N = 3
 
 
-def token_length_per_entry(entry, schema, counter):
+def token_length_per_entry(entry, schema, split_sentences):
     result = {}
     entry_id = entry['id']
     if schema == "bigbio_kb":
-        for passage in entry["passages"]:
-            result_key = passage["type"]
-            for key in _TEXT_MAPS[schema]:
-                text = passage[key][0]
-                if not text:
-                    print(f"WARNING: text key does not exist: entry {entry_id}")
-                    result["token_length"] = 0
-                    result["text_type"] = result_key
-                    continue
-                sents, ngrams = get_tuples_manual_sentences(text.lower(), N)
-                toks = [tok for sent in sents for tok in sent]
-                tups = ["_".join(tup) for tup in ngrams]
-                counter.update(tups)
-                result["token_length"] = len(toks)
-                result["text_type"] = result_key
+        texts = [(passage["type"], passage[key][0]) for passage in entry["passages"] for key in _TEXT_MAPS[schema]]
     else:
-        for key in _TEXT_MAPS[schema]:
-            text = entry[key]
-            if not text:
-                print(f"WARNING: text key does not exist, entry {entry_id}")
-                result["token_length"] = 0
-                result["text_type"] = key
-                continue
-            else:
-                sents, ngrams = get_tuples_manual_sentences(text.lower(), N)
-                toks = [tok for sent in sents for tok in sent]
-                result["token_length"] = len(toks)
-                result["text_type"] = key
-                tups = ["_".join(tup) for tup in ngrams]
-                counter.update(tups)
-    return result, counter
+        texts = [(key, entry[key]) for key in _TEXT_MAPS[schema]]
+    for text_type, text in texts:
+        result["text_type"] = text_type
+        if not text:
+            print(f"WARNING: text key does not exist, entry {entry_id}")
+            result["token_length"] = 0
+            continue
+        sentences = tokenize(text)
+        result["token_length"] = sum(len(sentence) for sentence in sentences)
+        split_sentences.extend(sentences)
+    return result
 
 
 def parse_token_length_and_n_gram(dataset, schema_type):
     hist_data = []
     n_gram_counters = []
     for split, data in dataset.items():
-        n_gram_counter = Counter()
+        split_sentences = []
         for i, entry in enumerate(data):
-            result, n_gram_counter = token_length_per_entry(
-                entry, schema_type, n_gram_counter
-            )
+            result = token_length_per_entry(entry, schema_type, split_sentences)
             result["split"] = split
             hist_data.append(result)
-        n_gram_counters.append(n_gram_counter)
+        n_gram_counters.append(NgramCounts.from_keys(NgramHasher(N).hash_sentences(split_sentences)))
 
     return pd.DataFrame(hist_data), n_gram_counters
 
@@ -274,10 +251,8 @@ def draw_figure(data_name, data_config_name, schema_type):
     metadata_helper = helper.get_metadata()  # calls load_dataset for meta parsing
     rprint(metadata_helper)
     splits = metadata_helper.keys()
-    # calls HF load_dataset _again_ for token parsing
-    dataset = load_dataset(
-        f"bigbio/biodatasets/{data_name}/{data_name}.py", name=data_config_name
-    )
+    # calls HF load_dataset _again_ for token parsing (text columns only)
+    dataset = helper.load_text_view(from_hub=False)
     # general token length
     tok_hist_data, ngram_counters = parse_token_length_and_n_gram(dataset, schema_type)
     rprint(helper)
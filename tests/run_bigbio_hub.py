@@ -0,0 +1,362 @@
+"""
+Run the hub unit-tests (`tests/test_bigbio_hub.py`) on every config of the local dataloader scripts.
+
+Configs are tested in parallel worker processes, each with a timeout, and the results are written
+to a JSON report (and optionally a JUnit XML report).
+
+Passing configs are cached. The cache key covers:
+ - the dataloader script
+ - its `bigbiohub.py`
+ - the unit-tests
+ - the test options
+ - the checksums of the local data files (if any)
+
+Re-runs therefore only test the configs of dataloaders that actually changed.
+Changes to remote data behind an unchanged URL are not detected.
+
+Usage:
+
+    python -m tests.run_bigbio_hub --num_workers 8 --report report.json --junit report.xml
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bigbio.dataloader import BigBioConfigHelper, BigBioConfigHelpers
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+TEST_SCRIPT = REPO_ROOT / "tests" / "test_bigbio_hub.py"
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "bigbio" / "hub_tests.json"
+
+# number of output lines kept in the report for each config
+OUTPUT_TAIL = 100
+
+
+def _sha256_file(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def data_checksum(data_dir: Path, file_hashes: Dict[str, str]) -> str:
+    """
+    Checksum of all files in a data directory.
+
+    :param data_dir: Directory of local data
+    :param file_hashes: Hashes of files keyed on their path, size and modification time,
+        which is updated in place so that unchanged files are not hashed again
+    """  # noqa
+    sha256 = hashlib.sha256()
+    for path in sorted(p for p in data_dir.rglob("*") if p.is_file()):
+        stat = path.stat()
+        file_key = f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+        if file_key not in file_hashes:
+            file_hashes[file_key] = _sha256_file(path)
+        sha256.update(f"{path.relative_to(data_dir).as_posix()}:{file_hashes[file_key]}\n".encode())
+    return sha256.hexdigest()
+
+
+def cache_key(
+    helper: BigBioConfigHelper,
+    test_args: List[str],
+    data_dir: Optional[Path],
+    file_hashes: Dict[str, str],
+) -> str:
+    """
+    Key of the test result of a config: changes whenever the dataloader, the tests or the data change.
+    """  # noqa
+    script = Path(helper.script)
+    parts = [
+        helper.config.name,
+        _sha256_file(script),
+        _sha256_file(script.parent / "bigbiohub.py"),
+        _sha256_file(TEST_SCRIPT),
+        json.dumps(test_args),
+        data_checksum(data_dir, file_hashes) if data_dir is not None else "",
+    ]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def run_config(
+    helper: BigBioConfigHelper,
+    test_args: List[str],
+    data_dir: Optional[Path],
+    timeout: float,
+) -> Dict:
+    """
+    Run the unit-tests of a config in a separate process, killing it (and its children) on timeout.
+    """  # noqa
+    command = [
+        sys.executable,
+        "-m",
+        "tests.test_bigbio_hub",
+        helper.dataset_name,
+        "--test_local",
+        "--config_name",
+        helper.config.name,
+        *test_args,
+    ]
+    if data_dir is not None:
+        command += ["--data_dir", str(data_dir)]
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        cwd=REPO_ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        start_new_session=True,
+    )
+    try:
+        output, _ = process.communicate(timeout=timeout)
+        status = "passed" if process.returncode == 0 else "failed"
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        output, _ = process.communicate()
+        status = "timeout"
+
+    lines = output.splitlines()
+    if status == "timeout":
+        message = f"Timed out after {timeout}s"
+    else:
+        message = "\n".join(line for line in lines if line.startswith(("FAIL:", "ERROR:")))
+        if status == "failed" and not message:
+            message = lines[-1] if lines else f"Exited with code {process.returncode}"
+
+    return {
+        "dataset_name": helper.dataset_name,
+        "config_name": helper.config.name,
+        "status": status,
+        "duration": time.perf_counter() - start,
+        "message": message,
+        "output": "\n".join(lines[-OUTPUT_TAIL:]),
+    }
+
+
+def write_junit(results: List[Dict], path: Path):
+    """
+    Write results in JUnit XML format, one test case per config.
+    """  # noqa
+    suite = ET.Element(
+        "testsuite",
+        name="bigbio_hub",
+        tests=str(len(results)),
+        failures=str(sum(result["status"] == "failed" for result in results)),
+        errors=str(sum(result["status"] == "timeout" for result in results)),
+        skipped=str(sum(result["status"] in ("cached", "skipped") for result in results)),
+        time=f"{sum(result['duration'] for result in results):.3f}",
+    )
+    for result in results:
+        case = ET.SubElement(
+            suite,
+            "testcase",
+            classname=result["dataset_name"],
+            name=result["config_name"],
+            time=f"{result['duration']:.3f}",
+        )
+        if result["status"] == "failed":
+            ET.SubElement(case, "failure", message=result["message"].split("\n")[0]).text = result["message"]
+        elif result["status"] == "timeout":
+            ET.SubElement(case, "error", message=result["message"])
+        elif result["status"] in ("cached", "skipped"):
+            ET.SubElement(case, "skipped", message=result["message"])
+        if result.get("output"):
+            ET.SubElement(case, "system-out").text = result["output"]
+
+    ET.ElementTree(suite).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def _load_cache(path: Path) -> Dict:
+    if path.exists():
+        with open(path) as fp:
+            return json.load(fp)
+    return {"passed": {}, "file_hashes": {}}
+
+
+def _save_cache(cache: Dict, path: Path):
+    """Merge the cache into the one saved at `path`, which may have been updated by another run since it was loaded."""
+    saved = _load_cache(path)
+    cache["passed"] = {**saved["passed"], **cache["passed"]}
+    cache["file_hashes"] = {**saved["file_hashes"], **cache["file_hashes"]}
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as fp:
+        json.dump(cache, fp, indent=2)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Run the hub unit-tests on all BigBio dataloaders.")
+
+    parser.add_argument(
+        "--dataset_names",
+        nargs="*",
+        help="Only test these datasets (default is all datasets)",
+    )
+    parser.add_argument(
+        "--include_large",
+        action="store_true",
+        help="Also test large configs (e.g. pubtator_central), consider using --sample",
+    )
+    parser.add_argument(
+        "--data_dir_root",
+        type=str,
+        help="Directory with one sub-directory of local data per dataset (e.g. `<root>/n2c2_2011`). "
+        "Local datasets are skipped if not specified",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of configs tested in parallel (default is the number of CPUs)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=3600,
+        help="Timeout in seconds for testing a single config (default is 3600)",
+    )
+    parser.add_argument(
+        "--cache_path",
+        type=str,
+        default=str(DEFAULT_CACHE_PATH),
+        help=f"Cache of passing configs (default is {DEFAULT_CACHE_PATH})",
+    )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Test all configs, even those which passed before and did not change (new passes are still cached)",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default="hub_test_report.json",
+        help="Path of the JSON report (default is hub_test_report.json)",
+    )
+    parser.add_argument(
+        "--junit",
+        type=str,
+        help="Path of the JUnit XML report",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        help="Validate a deterministic sample of N documents per split (see tests/test_bigbio_hub.py)",
+    )
+    parser.add_argument(
+        "--sample_seed",
+        type=int,
+        default=0,
+        help="Seed of the sample (default is 0)",
+    )
+    parser.add_argument(
+        "--sample_scan",
+        type=int,
+        help="Read at most N documents per shard when sampling (see tests/test_bigbio_hub.py)",
+    )
+
+    args = parser.parse_args()
+    logger.info(f"args: {args}")
+
+    test_args = []
+    if args.sample is not None:
+        test_args += ["--sample", str(args.sample), "--sample_seed", str(args.sample_seed)]
+        if args.sample_scan is not None:
+            test_args += ["--sample_scan", str(args.sample_scan)]
+
+    conhelps = BigBioConfigHelpers()
+    if args.dataset_names:
+        conhelps = conhelps.filtered(lambda helper: helper.dataset_name in args.dataset_names)
+    if not args.include_large:
+        conhelps = conhelps.filtered(lambda helper: not helper.is_large)
+
+    cache_path = Path(args.cache_path)
+    cache = _load_cache(cache_path)
+
+    results = []
+    to_run = []
+    for helper in conhelps:
+
+        data_dir = None
+        if helper.is_local:
+            if args.data_dir_root is None:
+                results.append(
+                    {
+                        "dataset_name": helper.dataset_name,
+                        "config_name": helper.config.name,
+                        "status": "skipped",
+                        "duration": 0.0,
+                        "message": "Local dataset without --data_dir_root",
+                    }
+                )
+                continue
+            data_dir = Path(args.data_dir_root) / helper.dataset_name
+
+        key = cache_key(helper, test_args, data_dir, cache["file_hashes"])
+        if not args.no_cache and key in cache["passed"]:
+            results.append(
+                {
+                    "dataset_name": helper.dataset_name,
+                    "config_name": helper.config.name,
+                    "status": "cached",
+                    "duration": 0.0,
+                    "message": f"Passed in {cache['passed'][key]['duration']:.1f}s and did not change since",
+                }
+            )
+            continue
+
+        to_run.append((helper, data_dir, key))
+
+    logger.info(f"Testing {len(to_run)} configs ({len(results)} cached or skipped) with {args.num_workers} workers")
+
+    with ThreadPoolExecutor(max(args.num_workers, 1)) as executor:
+        futures = {
+            executor.submit(run_config, helper, test_args, data_dir, args.timeout): key
+            for helper, data_dir, key in to_run
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            logger.info(f"{result['config_name']}: {result['status']} ({result['duration']:.1f}s)")
+
+            if result["status"] == "passed":
+                cache["passed"][futures[future]] = {
+                    "config_name": result["config_name"],
+                    "duration": result["duration"],
+                    "timestamp": time.time(),
+                }
+                _save_cache(cache, cache_path)
+
+    _save_cache(cache, cache_path)
+
+    results = sorted(results, key=lambda result: (result["dataset_name"], result["config_name"]))
+    with open(args.report, "w") as fp:
+        json.dump(results, fp, indent=2)
+    if args.junit is not None:
+        write_junit(results, Path(args.junit))
+
+    counts = Counter(result["status"] for result in results)
+    logger.info(f"Results: {dict(counts)}")
+
+    sys.exit(0 if all(result["status"] in ("passed", "cached", "skipped") for result in results) else 1)
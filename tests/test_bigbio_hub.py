@@ -3,20 +3,32 @@ Unit-tests to ensure tasks adhere to big-bio schema.
 
 NOTE: If bypass keys/splits present, statistics are STILL printed.
 """
+import abc
 import argparse
+import array
+import functools
 import importlib
 # Check languages + licenses match appropriate keys'
 import json
 import logging
+import math
+import random
 import re
+import sys
+import time
 import unittest
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from types import ModuleType
-from typing import Dict, Iterable, Iterator, List, Optional
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
 
 import datasets
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from datasets import DatasetDict, Features
+from datasets.distributed import split_dataset_by_node
 from huggingface_hub import HfApi
 
 # from bigbio.utils.constants import METADATA
@@ -69,6 +81,929 @@ OFFSET_ERROR_MSG = (
 _CONNECTORS = re.compile(r"\+|\,|\||\;")
 
 
+_OFFSETS_BATCH_SIZE = 1000
+
+
+def _string_buffers(strings: pa.Array) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Byte offsets and UTF-8 bytes of a string array
+    """  # noqa
+    strings = strings.cast(pa.large_string())
+    if len(strings) == 0:
+        return np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.uint8)
+
+    _, offsets, data = strings.buffers()
+    offsets = np.frombuffer(offsets, dtype=np.int64, count=len(strings) + 1, offset=strings.offset * 8)
+    data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, dtype=np.uint8)
+    return offsets, data
+
+
+def _offset_mismatches(
+    doc_texts: pa.Array,
+    span_docs: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    expected: pa.Array,
+) -> np.ndarray:
+    """
+    Vectorized `doc_texts[span_docs][start:end] != expected` over spans.
+    Offsets are in code points and follow Python slicing semantics (negative and out of range offsets).
+
+    :param doc_texts: Text of each document
+    :param span_docs: Document index of each span
+    :param starts: Start offset of each span
+    :param ends: End offset of each span
+    :param expected: Expected text of each span
+    :return: Boolean mask of the spans whose text differs from the expected text
+    """  # noqa
+    doc_offsets, doc_bytes = _string_buffers(doc_texts)
+    expected_offsets, expected_bytes = _string_buffers(expected)
+
+    # byte position of each code point, i.e. of each byte which is not a UTF-8 continuation byte
+    char_bytes = np.append(np.flatnonzero((doc_bytes & 0xC0) != 0x80), len(doc_bytes))
+    doc_chars = np.searchsorted(char_bytes, doc_offsets)
+    first_chars = doc_chars[:-1][span_docs]
+    num_chars = np.diff(doc_chars)[span_docs]
+
+    def _clip(offsets: np.ndarray) -> np.ndarray:
+        return np.where(offsets < 0, np.maximum(offsets + num_chars, 0), np.minimum(offsets, num_chars))
+
+    starts = _clip(starts)
+    ends = np.maximum(_clip(ends), starts)
+    byte_starts = char_bytes[first_chars + starts]
+    byte_lens = char_bytes[first_chars + ends] - byte_starts
+
+    mismatches = byte_lens != np.diff(expected_offsets)
+
+    # compare the bytes of the spans with the same length as their expected text
+    same_length = np.flatnonzero(~mismatches & (byte_lens > 0))
+    lens = byte_lens[same_length]
+    span_of_byte = np.repeat(np.arange(len(same_length)), lens)
+    byte_in_span = np.arange(len(span_of_byte)) - np.repeat(np.cumsum(lens) - lens, lens)
+    differs = (
+        doc_bytes[byte_starts[same_length][span_of_byte] + byte_in_span]
+        != expected_bytes[expected_offsets[:-1][same_length][span_of_byte] + byte_in_span]
+    )
+    mismatches[same_length[np.unique(span_of_byte[differs])]] = True
+
+    return mismatches
+
+
+def _list_parts(lists: pa.Array) -> Tuple[np.ndarray, pa.Array]:
+    """
+    Offsets (starting at 0) and values of a list array
+    """  # noqa
+    offsets = lists.offsets.to_numpy().astype(np.int64)
+    values = lists.values.slice(offsets[0], offsets[-1] - offsets[0])
+    return offsets - offsets[0], values
+
+
+def _find_offset_suspects(batch: pa.Table, feature: str) -> Optional[np.ndarray]:
+    """
+    Find the items of a KB feature (`passages`, `entities` or `events`) which may fail the offsets check,
+    by comparing the text extracted via the offsets of all items of a batch in vectorized form.
+
+    Items with wrong offsets, a number of texts different from the number of offsets or malformed offsets
+    (e.g. not in the form [lo, hi]) are suspects.
+
+    :param batch: A batch of examples of a KB schema
+    :param feature: Name of the feature to check
+    :return: Pairs of (example index, item index) of the suspect items, or None if the batch contains nulls
+    """  # noqa
+    passages = batch.column("passages").combine_chunks()
+    items = batch.column(feature).combine_chunks()
+
+    passage_offsets, passage_values = _list_parts(passages)
+    passage_text_offsets, passage_texts = _list_parts(passage_values.field("text"))
+    item_offsets, item_values = _list_parts(items)
+    spans = item_values.field("trigger") if feature == "events" else item_values
+    span_offsets, span_pairs = _list_parts(spans.field("offsets"))
+    pair_offsets, pair_values = _list_parts(span_pairs)
+    text_offsets, texts = _list_parts(spans.field("text"))
+
+    arrays = [passages, passage_values.field("text"), passage_texts, items, spans.field("offsets"), span_pairs]
+    arrays += [pair_values, spans.field("text"), texts]
+    if any(array.null_count > 0 for array in arrays):
+        return None
+
+    # same as `_get_example_text`
+    example_texts = pc.binary_join(
+        pa.LargeListArray.from_arrays(pa.array(passage_text_offsets[passage_offsets]), passage_texts), " "
+    )
+
+    item_examples = np.repeat(np.arange(len(batch)), np.diff(item_offsets))
+    span_items = np.repeat(np.arange(len(spans)), np.diff(span_offsets))
+    span_indices = np.arange(len(span_items)) - span_offsets[span_items]
+    num_offsets = np.diff(span_offsets)
+    num_texts = np.diff(text_offsets)
+
+    # a missing text is compared to "" for entities and events but fails the passages check
+    has_text = span_indices < num_texts[span_items]
+    well_formed = np.diff(pair_offsets) == 2
+    if feature == "passages":
+        well_formed &= has_text
+
+    checked = np.flatnonzero(well_formed)
+    pair_values = pair_values.to_numpy().astype(np.int64)
+    texts = pa.concat_arrays([texts, pa.array([""], type=texts.type)])
+    text_indices = np.where(has_text, text_offsets[span_items] + span_indices, len(texts) - 1)
+    expected = texts.take(pa.array(text_indices[checked]))
+    mismatches = _offset_mismatches(
+        doc_texts=example_texts,
+        span_docs=item_examples[span_items[checked]],
+        starts=pair_values[pair_offsets[checked]],
+        ends=pair_values[pair_offsets[checked] + 1],
+        expected=expected,
+    )
+
+    suspects = np.zeros(len(spans), dtype=bool)
+    suspects[span_items[~well_formed]] = True
+    suspects[span_items[checked[mismatches]]] = True
+    if feature == "passages":
+        suspects |= (num_offsets != 1) | (num_texts != 1)
+    else:
+        suspects |= num_offsets != num_texts
+
+    suspects = np.flatnonzero(suspects)
+    return np.stack([item_examples[suspects], suspects - item_offsets[item_examples[suspects]]], axis=1)
+
+
+def _map_batches(function: Callable, batches: Iterable, num_proc: int) -> Iterator[Tuple[Any, Any]]:
+    """
+    Lazily map a function over batches with a pool of `num_proc` processes.
+    Yields pairs of (batch, result) in the order of the batches.
+    """  # noqa
+    if num_proc <= 1:
+        for batch in batches:
+            yield batch, function(batch)
+        return
+
+    with ProcessPoolExecutor(num_proc) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, executor.submit(function, batch)))
+            if len(pending) >= 2 * num_proc:
+                batch, future = pending.popleft()
+                yield batch, future.result()
+        while len(pending) > 0:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+
+
+def _reservoir_sample(
+    examples: Iterable[dict],
+    size: int,
+    rng: random.Random,
+    max_scan: Optional[int] = None,
+) -> Tuple[List[dict], int, bool]:
+    """
+    Draw a uniform sample of `size` examples from a stream (reservoir sampling), in stream order.
+
+    :param examples: Stream of examples
+    :param size: Number of examples to draw
+    :param rng: Seeded random generator, which makes the sample deterministic
+    :param max_scan: Read at most this number of examples (default is to read the whole stream)
+    :return: The sample, the number of examples read and whether the whole stream was read
+    """  # noqa
+    reservoir = []
+    num_scanned = 0
+
+    for example in examples:
+        if max_scan is not None and num_scanned >= max_scan:
+            return [example for _, example in sorted(reservoir, key=lambda x: x[0])], num_scanned, False
+
+        if num_scanned < size:
+            reservoir.append((num_scanned, example))
+        else:
+            idx = rng.randint(0, num_scanned)
+            if idx < size:
+                reservoir[idx] = (num_scanned, example)
+
+        num_scanned += 1
+
+    return [example for _, example in sorted(reservoir, key=lambda x: x[0])], num_scanned, True
+
+
+def _sample_failure_bound(num_sampled: int, population: int, confidence: float = 0.95) -> int:
+    """
+    Upper confidence bound on the number of failing documents in a population given that a sample has none,
+    i.e. the largest number of failing documents for which drawing `num_sampled` documents without replacement
+    and finding no failure still has a probability above `1 - confidence` (hypergeometric distribution).
+    """  # noqa
+
+    def _log_comb(n: int, k: int) -> float:
+        return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+    def _no_failure_probability(num_failing: int) -> float:
+        if population - num_failing < num_sampled:
+            return 0.0
+        return math.exp(_log_comb(population - num_failing, num_sampled) - _log_comb(population, num_sampled))
+
+    low, high = 0, population
+    while low < high:
+        mid = (low + high + 1) // 2
+        if _no_failure_probability(mid) > 1 - confidence:
+            low = mid
+        else:
+            high = mid - 1
+
+    return low
+
+
+def _iter_ids(collection: Any) -> Iterator[Any]:
+    """
+    Recursively yield the values of all `id` fields of a feature (e.g. example, entity, passage).
+    """  # noqa
+    if isinstance(collection, dict):
+        for k, v in collection.items():
+            if isinstance(v, (dict, list)):
+                yield from _iter_ids(v)
+            elif k == "id":
+                yield v
+
+    elif isinstance(collection, list):
+        for elem in collection:
+            yield from _iter_ids(elem)
+
+
+class _HashedIds:
+    """
+    Exact duplicate detection using 8 bytes per ID.
+
+    IDs are stored as 64-bit hashes in a compact array, which is sorted to find equal neighbours.
+    The IDs with a duplicated hash are candidates, to be confirmed on their actual value.
+    """  # noqa
+
+    def __init__(self):
+        self.hashes = array.array("q")
+
+    def add(self, id_: Any):
+        self.hashes.append(hash(id_))
+
+    def finalize(self) -> bool:
+        """Return whether there are candidate duplicates"""
+        hashes = np.frombuffer(self.hashes, dtype=np.int64)
+        hashes.sort()
+        self.candidates = set(np.unique(hashes[1:][hashes[1:] == hashes[:-1]]).tolist())
+        del hashes
+        self.hashes = array.array("q")
+        return len(self.candidates) > 0
+
+    def is_candidate(self, id_: Any) -> bool:
+        return hash(id_) in self.candidates
+
+
+class _BloomIds:
+    """
+    Duplicate detection using a Bloom filter as prefilter, i.e. ~1.2 bytes per ID.
+
+    Any ID which may have been seen before (~1% false positives) is kept as a candidate,
+    to be confirmed on their actual value. The filter grows as needed (scalable Bloom filter).
+    """  # noqa
+
+    NUM_HASHES = 7
+    BITS_PER_ID = 10
+    BUFFER_SIZE = 1 << 16
+
+    def __init__(self, capacity: int = 1 << 20):
+        self.filters = []
+        self.capacity = capacity
+        self.count = 0
+        self.candidates = set()
+        self.ids = []
+        self.hashes = []
+
+    def add(self, id_: Any):
+        self.ids.append(id_)
+        self.hashes.append(hash(id_))
+        if len(self.ids) >= self.BUFFER_SIZE:
+            self._flush()
+
+    def _positions(self, hashes: np.ndarray, num_bits: int) -> np.ndarray:
+        # double hashing: h1 + i * h2
+        h2 = (hashes * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(17) | np.uint64(1)
+        steps = np.arange(self.NUM_HASHES, dtype=np.uint64)
+        return (hashes[:, None] + steps[None, :] * h2[:, None]) % np.uint64(num_bits)
+
+    def _flush(self):
+        hashes = np.array(self.hashes, dtype=np.int64).view(np.uint64)
+
+        # IDs seen twice within the buffer
+        order = np.argsort(hashes, kind="stable")
+        sorted_hashes = hashes[order]
+        flagged = np.zeros(len(hashes), dtype=bool)
+        flagged[order[1:][sorted_hashes[1:] == sorted_hashes[:-1]]] = True
+
+        # IDs which may have been seen in a previous buffer
+        for bits in self.filters:
+            positions = self._positions(hashes, len(bits) * 8)
+            masks = (1 << (positions & np.uint64(7))).astype(np.uint8)
+            flagged |= np.all(bits[positions >> np.uint64(3)] & masks, axis=1)
+
+        if len(self.filters) == 0 or self.count + len(hashes) > self.capacity:
+            if len(self.filters) > 0:
+                self.capacity *= 2
+            self.filters.append(np.zeros(self.capacity * self.BITS_PER_ID // 8 + 1, dtype=np.uint8))
+            self.count = 0
+
+        positions = self._positions(hashes, len(self.filters[-1]) * 8).ravel()
+        masks = (1 << (positions & np.uint64(7))).astype(np.uint8)
+        np.bitwise_or.at(self.filters[-1], positions >> np.uint64(3), masks)
+        self.count += len(hashes)
+
+        self.candidates.update(self.ids[i] for i in np.flatnonzero(flagged))
+        self.ids = []
+        self.hashes = []
+
+    def finalize(self) -> bool:
+        """Return whether there are candidate duplicates"""
+        if len(self.ids) > 0:
+            self._flush()
+        self.filters = []
+        return len(self.candidates) > 0
+
+    def is_candidate(self, id_: Any) -> bool:
+        return id_ in self.candidates
+
+
+_UNIQUE_IDS_MODES = {
+    "exact": _HashedIds,
+    "bloom": _BloomIds,
+}
+
+
+class _SplitCheck:
+    """
+    A check run on every example of a split.
+
+    All checks passed to `TestDataLoader._run_checks` share a single pass over each split,
+    so every example is decoded once regardless of how many checks are registered.
+    A check is enabled per split by `start_split` and then receives each example via `visit`.
+    """  # noqa
+
+    description: str = ""
+
+    def __init__(self, test: "TestDataLoader"):
+        self.test = test
+
+    def start(self):
+        """Called once before the first split"""
+
+    def start_split(self, split_name: str, split: datasets.Dataset) -> bool:
+        """Called before visiting a split. Return `False` to skip the split."""
+        return not self._bypass_split(split_name)
+
+    def visit(self, example: dict, example_index: int):
+        """Called on each example of an enabled split"""
+
+    def end_split(self, split_name: str):
+        """Called after the last example of an enabled split"""
+
+    def finish(self):
+        """Called once after the last split"""
+
+    def _bypass_split(self, split_name: str) -> bool:
+        if split_name in self.test.BYPASS_SPLITS:
+            logger.info(f"\tSkipping {self.description} on {split_name}")
+            return True
+        return False
+
+
+class _FeatureStatisticsCheck(_SplitCheck):
+    """
+    Gather the number of features in the schema present in each split and verify the big-bio schema.
+    Statistics are gathered (and printed) for bypassed splits too.
+    """  # noqa
+
+    description = "schema"
+
+    def __init__(self, test: "TestDataLoader", features: Features, non_empty_features: set):
+        super().__init__(test)
+        self.features = features
+        self.non_empty_features = non_empty_features
+        self.all_counters = {}
+
+    def start(self):
+        logger.info("Gathering dataset statistics")
+
+    def start_split(self, split_name: str, split: datasets.Dataset) -> bool:
+        self.counter = defaultdict(int)
+        self.all_counters[split_name] = self.counter
+        return True
+
+    def visit(self, example: dict, example_index: int):
+        for feature_name, feature in self.features.items():
+            if example.get(feature_name, None) is not None:
+                if isinstance(feature, datasets.Value):
+                    if example[feature_name]:
+                        self.counter[feature_name] += 1
+                else:
+                    self.counter[feature_name] += len(example[feature_name])
+
+                    # TODO do proper recursion here
+                    if feature_name == "entities":
+                        for entity in example["entities"]:
+                            self.counter["normalized"] += len(entity["normalized"])
+
+    def finish(self):
+        for split_name, split in self.test.dataset.items():
+            print(split_name)
+            print("=" * 10)
+            for k, v in self.all_counters[split_name].items():
+                print(f"{k}: {v}")
+            print()
+
+        for split_name, split in self.test.dataset.items():
+
+            # Skip entire data split
+            if split_name in self.test.BYPASS_SPLITS:
+                logger.info(f"Skipping schema on {split_name}")
+                continue
+
+            logger.info("Testing schema for: " + str(split_name))
+            self.test.assertEqual(split.info.features, self.features)
+
+            for non_empty_feature in self.non_empty_features:
+
+                if self.test._skipkey_or_keysplit(non_empty_feature, split_name):
+                    logger.warning(f"Skipping schema for split, key = '{(split_name, non_empty_feature)}'")
+                    continue
+
+                if self.all_counters[split_name][non_empty_feature] == 0:
+                    raise AssertionError(f"Required key '{non_empty_feature}' does not have any instances")
+
+            for feature, count in self.all_counters[split_name].items():
+                if (
+                    count > 0
+                    and feature not in self.non_empty_features
+                    and feature in set().union(*_TASK_TO_FEATURES.values())
+                ):
+                    logger.warning(
+                        f"Found instances of '{feature}' but there seems to be no task "
+                        f"in 'SUPPORTED_TASKS' for them. Is 'SUPPORTED_TASKS' correct?"
+                    )
+
+
+class _UniqueIdsCheck(_SplitCheck):
+    """
+    Tests each example in a split has a unique ID.
+
+    IDs are tracked with bounded memory (see `_HashedIds` and `_BloomIds`) and only if some IDs may be duplicated
+    the split is visited a second time to confirm them on their actual values.
+    """  # noqa
+
+    description = "unique ID check"
+
+    def start(self):
+        logger.info("Checking global ID uniqueness")
+        self.num_unique_ids = 0
+
+    def start_split(self, split_name: str, split: datasets.Dataset) -> bool:
+        if self._bypass_split(split_name):
+            return False
+        self.split = split
+        self.ids = _UNIQUE_IDS_MODES[self.test.UNIQUE_IDS_MODE]()
+        self.num_ids = 0
+        return True
+
+    def visit(self, example: dict, example_index: int):
+        for id_ in _iter_ids(example):
+            self.ids.add(id_)
+            self.num_ids += 1
+
+    def end_split(self, split_name: str):
+        duplicates = []
+        counts = defaultdict(int)
+        if self.ids.finalize():
+            for example in self.split:
+                for id_ in _iter_ids(example):
+                    if self.ids.is_candidate(id_):
+                        counts[id_] += 1
+            duplicates = [id_ for id_, count in counts.items() if count > 1]
+
+        self.num_unique_ids = self.num_ids - sum(counts[id_] - 1 for id_ in duplicates)
+        self.ids = None
+
+        if len(duplicates) > 0:
+            self.test.fail(
+                f"Split:{split_name} - Found {len(duplicates)} duplicated IDs: {duplicates[:20]}"
+                + (" ..." if len(duplicates) > 20 else "")
+            )
+
+    def finish(self):
+        logger.info("Found {} unique IDs".format(self.num_unique_ids))
+
+
+class _ReferencedIdsCheck(_SplitCheck):
+    """
+    Checks if referenced IDs are correctly labeled.
+    """  # noqa
+
+    description = "referenced ids"
+
+    def start(self):
+        logger.info("Checking if referenced IDs are properly mapped")
+
+    def start_split(self, split_name: str, split: datasets.Dataset) -> bool:
+        self.split_name = split_name
+        return super().start_split(split_name, split)
+
+    def visit(self, example: dict, example_index: int):
+        referenced_ids = set()
+        existing_ids = set()
+
+        referenced_ids.update(self.test._get_referenced_ids(example))
+        existing_ids.update(self.test._get_existing_referable_ids(example))
+
+        for ref_id, ref_type in referenced_ids:
+
+            if self.test._skipkey_or_keysplit(ref_type, self.split_name):
+                split_keys = (self.split_name, ref_type)
+                logger.warning(f"\tSkipping referenced ids on {split_keys}")
+                continue
+
+            if ref_type == "event":
+                if not ((ref_id, "entity") in existing_ids or (ref_id, "event") in existing_ids):
+                    logger.warning(
+                        f"Referenced element ({ref_id}, entity/event) could not be "
+                        f"found in existing ids {existing_ids}. Please make sure that "
+                        f"this is not because of a bug in your data loader."
+                    )
+            else:
+                if not (ref_id, ref_type) in existing_ids:
+                    logger.warning(
+                        f"Referenced element {(ref_id, ref_type)} could not be "
+                        f"found in existing ids {existing_ids}. Please make sure that "
+                        f"this is not because of a bug in your data loader."
+                    )
+
+
+class _OffsetsCheck(_SplitCheck, abc.ABC):
+    """
+    Base class for checks of the offsets of a KB feature.
+
+    Splits are checked on their Arrow columns in vectorized batches, fanned out over `TestDataLoader.NUM_PROC`
+    processes, and only the items which may fail the check are checked again in Python by `_check_item`.
+    This reports exactly the same errors as visiting every example in Python.
+    """  # noqa
+
+    feature: str
+
+    def start_split(self, split_name: str, split: datasets.Dataset) -> bool:
+        if self._bypass_split(split_name):
+            return False
+
+        if self.test._skipkey_or_keysplit(self.feature, split_name):
+            logger.warning(f"Skipping {self.feature} offsets for split='{split_name}'")
+            return False
+
+        self.split_name = split_name
+        if self.feature not in split.features:
+            return False
+
+        self._check_batches(split)
+        return False
+
+    def visit(self, example: dict, example_index: int):
+        example_text = _get_example_text(example)
+
+        for item in example[self.feature]:
+            self._check_item(example["id"], example_text, item)
+
+    @abc.abstractmethod
+    def _check_item(self, example_id: str, example_text: str, item: dict):
+        """Check a single item of the feature"""
+
+    def _check_batches(self, split: datasets.Dataset):
+        batches = split.with_format("arrow").iter(batch_size=_OFFSETS_BATCH_SIZE)
+        find_suspects = functools.partial(_find_offset_suspects, feature=self.feature)
+
+        for batch, suspects in _map_batches(find_suspects, batches, num_proc=self.test.NUM_PROC):
+
+            # batches with nulls are visited in Python
+            if suspects is None:
+                for example_index, example in enumerate(batch.to_pylist()):
+                    self.visit(example, example_index)
+                continue
+
+            examples = {}
+            for example_index, item_index in suspects.tolist():
+                if example_index not in examples:
+                    example = batch.slice(example_index, 1).to_pylist()[0]
+                    examples[example_index] = (example, _get_example_text(example))
+
+                example, example_text = examples[example_index]
+                self._check_item(example["id"], example_text, example[self.feature][item_index])
+
+
+class _PassagesOffsetsCheck(_OffsetsCheck):
+    """
+    Verify that the passages offsets are correct,
+    i.e.: passage text == text extracted via the passage offsets
+    """  # noqa
+
+    description = "passage offsets"
+    feature = "passages"
+
+    def start(self):
+        logger.info("KB ONLY: Checking passage offsets")
+
+    def _check_item(self, example_id: str, example_text: str, passage: dict):
+        text = passage["text"]
+        offsets = passage["offsets"]
+
+        self.test._test_is_list(msg="Text in passages must be a list", field=text)
+
+        self.test._test_is_list(
+            msg="Offsets in passages must be a list",
+            field=offsets,
+        )
+
+        self.test._test_has_only_one_item(
+            msg="Offsets in passages must have only one element",
+            field=offsets,
+        )
+
+        self.test._test_has_only_one_item(
+            msg="Text in passages must have only one element",
+            field=text,
+        )
+
+        for idx, (start, end) in enumerate(offsets):
+            msg = (
+                f"Split:{self.split_name} - Example:{example_id} - "
+                f"text:`{example_text[start:end]}` != text_by_offset:`{text[idx]}`"
+            )
+            self.test.assertEqual(example_text[start:end], text[idx], msg)
+
+
+class _EntitiesOffsetsCheck(_OffsetsCheck):
+    """
+    Verify that the entities offsets are correct,
+    i.e.: entity text == text extracted via the entity offsets
+    """  # noqa
+
+    description = "entities offsets"
+    feature = "entities"
+
+    def start(self):
+        logger.info("KB ONLY: Checking entity offsets")
+        self.errors = []
+
+    def _check_item(self, example_id: str, example_text: str, entity: dict):
+        for msg in self.test._check_offsets(
+            example_id=example_id,
+            split=self.split_name,
+            example_text=example_text,
+            offsets=entity["offsets"],
+            texts=entity["text"],
+        ):
+
+            entity_id = entity["id"]
+            self.errors.append(f"Example:{example_id} - entity:{entity_id} " + msg)
+
+    def finish(self):
+        if len(self.errors) > 0:
+            logger.warning(msg="\n".join(self.errors) + OFFSET_ERROR_MSG)
+
+
+class _EventsOffsetsCheck(_OffsetsCheck):
+    """
+    Verify that the events' trigger offsets are correct,
+    i.e.: trigger text == text extracted via the trigger offsets
+    """  # noqa
+
+    description = "events offsets"
+    feature = "events"
+
+    def start(self):
+        logger.info("KB ONLY: Checking event offsets")
+        self.errors = []
+
+    def _check_item(self, example_id: str, example_text: str, event: dict):
+        for msg in self.test._check_offsets(
+            example_id=example_id,
+            split=self.split_name,
+            example_text=example_text,
+            offsets=event["trigger"]["offsets"],
+            texts=event["trigger"]["text"],
+        ):
+
+            event_id = event["id"]
+            self.errors.append(f"Example:{example_id} - event:{event_id} " + msg)
+
+    def finish(self):
+        if len(self.errors) > 0:
+            logger.warning(msg="\n".join(self.errors) + OFFSET_ERROR_MSG)
+
+
+class _CorefIdsCheck(_SplitCheck):
+    """
+    Verify that coreferences ids are entities
+
+    from `examples/test_n2c2_2011_coref.py`
+    """  # noqa
+
+    description = "coref ids"
+
+    def start(self):
+        logger.info("KB ONLY: Checking coref offsets")
+
+    def start_split(self, split_name: str, split: datasets.Dataset) -> bool:
+        if self._bypass_split(split_name):
+            return False
+
+        if self.test._skipkey_or_keysplit("coreferences", split_name):
+            logger.warning(f"Skipping coreferences ids for split='{split_name}'")
+            return False
+
+        self.split_name = split_name
+        return "coreferences" in split.features
+
+    def visit(self, example: dict, example_index: int):
+        example_id = example["id"]
+        entity_lookup = {ent["id"]: ent for ent in example["entities"]}
+
+        # check all coref entity ids are in entity lookup
+        for coref in example["coreferences"]:
+            for entity_id in coref["entity_ids"]:
+                assert (
+                    entity_id in entity_lookup
+                ), f"Split:{self.split_name} - Example:{example_id} - Entity:{entity_id} not found!"
+
+
+class _MultipleChoiceCheck(_SplitCheck):
+    """
+    Verify that each answer in a multiple choice Q/A task is in choices.
+    """  # noqa
+
+    description = "multiple-choice"
+
+    def start(self):
+        logger.info("QA ONLY: Checking multiple choice")
+
+    def start_split(self, split_name: str, split: datasets.Dataset) -> bool:
+        if self._bypass_split(split_name):
+            return False
+
+        if self.test._skipkey_or_keysplit("choices", split_name):
+            logger.warning(f"Skipping multiple choice for key=choices, split='{split_name}'")
+            return False
+
+        self.check_answer = not self.test._skipkey_or_keysplit("answer", split_name)
+        if not self.check_answer:
+            logger.warning(f"Skipping multiple choice for key=answer, split='{split_name}'")
+
+        return True
+
+    def visit(self, example: dict, example_index: int):
+        if len(example["choices"]) > 0:
+            # can change "==" to "in" if we include ranking later
+            assert example["type"] in [
+                "multiple_choice",
+                "yesno",
+            ], f"`choices` is populated, but type is not 'multiple_choice' or 'yesno' {example}"
+
+        if example["type"] in ["multiple_choice", "yesno"]:
+            assert (
+                len(example["choices"]) > 0
+            ), f"type is 'multiple_choice' or 'yesno' but no values in 'choices' {example}"
+
+            if self.check_answer:
+                for answer in example["answer"]:
+                    assert answer in example["choices"], f"answer is not present in 'choices' {example}"
+
+
+class _EntitiesMultilabelDbCheck(_SplitCheck):
+    """
+    Check if `db_name` or `db_id` of `normalized` field in entities have multiple values joined with common connectors.
+    Raises a warning ONLY ONCE per connector type.
+    """  # noqa
+
+    description = "entities multilabel db"
+
+    def start(self):
+        logger.info("KB ONLY: multi-label `db_id`")
+        self.warning_raised = {}
+
+    def start_split(self, split_name: str, split: datasets.Dataset) -> bool:
+        if self._bypass_split(split_name):
+            return False
+
+        if "entities" not in split.features:
+            return False
+
+        if self.test._skipkey_or_keysplit("entities", split_name):
+            logger.warning(f"Skipping multilabel entities for split='{split_name}'")
+            return False
+
+        self.split_name = split_name
+        return True
+
+    def visit(self, example: dict, example_index: int):
+        example_id = example["id"]
+
+        for entity in example["entities"]:
+
+            normalized = entity.get("normalized", [])
+            entity_id = entity["id"]
+
+            for norm in normalized:
+
+                # db_name, db_id
+                for db_field, db_value in norm.items():
+
+                    match = re.search(_CONNECTORS, db_value)
+
+                    if match is not None:
+
+                        connector = match.group(0)
+
+                        if connector not in self.warning_raised:
+
+                            msg = "".join(
+                                [
+                                    f"Split:{self.split_name} - Example:{example_id} - ",
+                                    f"Entity:{entity_id} w/ `{db_field}` `{db_value}` has connector `{connector}`. ",
+                                    "Please check for common connectors (e.g. `;`, `+`, `|`) "
+                                    "and expand the normalization list for each `db_id`",
+                                ]
+                            )
+
+                            logger.warning(msg)
+
+                            self.warning_raised[connector] = True
+
+
+class _MultilabelTypeCheck(_SplitCheck):
+    """
+    Check if features with `type` field contain multilabel values
+    and raise a warning ONLY ONCE for feature type (e.g. passages)
+    """  # noqa
+
+    description = "multilabel type"
+
+    features_with_type = ["passages", "entities", "relations", "events"]
+
+    def start(self):
+        logger.info("KB ONLY: multi-label `type` fields")
+        self.warning_raised = {f: False for f in self.features_with_type}
+
+    def start_split(self, split_name: str, split: datasets.Dataset) -> bool:
+        if self._bypass_split(split_name):
+            return False
+
+        self.split_name = split_name
+        self.split_features = []
+
+        for feature_name in self.features_with_type:
+
+            if self.test._skipkey_or_keysplit(feature_name, split_name):
+                logger.warning(f"Skipping multilabel type for splitkey = '{(split_name, feature_name)}'")
+                continue
+
+            if feature_name not in split.features or self.warning_raised[feature_name]:
+                continue
+
+            self.split_features.append(feature_name)
+
+        return len(self.split_features) > 0
+
+    def visit(self, example: dict, example_index: int):
+        for feature_name in self.split_features:
+
+            if self.warning_raised[feature_name]:
+                continue
+
+            example_id = example["id"]
+            features = example[feature_name]
+
+            for feature in features:
+
+                feature_type = feature["type"]
+                match = re.search(_CONNECTORS, feature_type)
+
+                if match is not None:
+
+                    connector = match.group(0)
+
+                    msg = "".join(
+                        [
+                            f"Split:{self.split_name} - Example:(id={example_id}, index={example_index}) - ",
+                            f"Feature:{feature_name} w/ `type` `{feature_type}` has connector `{connector}`. ",
+                            "Having multiple types is currently not supported. ",
+                            "Please check for common connectors (e.g. `;`, `+`, `|`) "
+                            "and split this feature into multiple ones with different `type`",
+                        ]
+                    )
+
+                    logger.warning(msg)
+
+                    self.warning_raised[feature_name] = True
+
+                    break
+
+
 class TestDataLoader(unittest.TestCase):
     """
     Test a single config from a dataloader script.
@@ -80,6 +1015,11 @@ class TestDataLoader(unittest.TestCase):
     BYPASS_SPLITS: List[str]
     BYPASS_KEYS: List[str]
     BYPASS_SPLIT_KEY_PAIRS: List[str]
+    NUM_PROC: int = 1
+    SAMPLE: Optional[int] = None
+    SAMPLE_SEED: int = 0
+    SAMPLE_SCAN: Optional[int] = 10000
+    UNIQUE_IDS_MODE: str = "exact"
 
     def runTest(self):
 
@@ -94,59 +1034,203 @@ class TestDataLoader(unittest.TestCase):
         module = importlib.import_module(dataset_module.module_path)
         logger.info(f"imported module {module}")
 
-        logger.info("Checking for _SUPPORTED_TASKS ...")
-        self._SUPPORTED_TASKS = [mem.name for mem in module._SUPPORTED_TASKS]
-        logger.info(f"Found _SUPPORTED_TASKS={self._SUPPORTED_TASKS}")
+        logger.info("Checking for _SUPPORTED_TASKS ...")
+        self._SUPPORTED_TASKS = [mem.name for mem in module._SUPPORTED_TASKS]
+        logger.info(f"Found _SUPPORTED_TASKS={self._SUPPORTED_TASKS}")
+
+        valid_tasks = set([mem.name for mem in bigbiohub.Tasks])
+        invalid_tasks = set(self._SUPPORTED_TASKS) - valid_tasks
+        if len(invalid_tasks) > 0:
+            raise ValueError(f"Found invalid supported tasks {invalid_tasks}. Must be one of {bigbiohub.VALID_TASKS}")
+
+        self._MAPPED_SCHEMAS = set([bigbiohub.TASK_TO_SCHEMA[task] for task in self._SUPPORTED_TASKS])
+        logger.info(f"_SUPPORTED_TASKS implies _MAPPED_SCHEMAS={self._MAPPED_SCHEMAS}")
+
+        logger.info(f"Checking load_dataset with config name {config_name}")
+        if self.SAMPLE is not None:
+            self.dataset = self._load_sample()
+        else:
+            self.dataset = datasets.load_dataset(
+                self.DATASET_NAME,
+                name=self.CONFIG_NAME,
+                data_dir=self.DATA_DIR,
+            )
+
+        if "bigbio" in self.CONFIG_NAME:
+            schema = self.CONFIG_NAME.split("_")[-1].upper()
+        else:
+            schema = "source"
+
+        logger.info(f"schema = {schema}")
+        if schema == "source":
+            return
+
+        with self.subTest("Check metadata"):
+            self.test_metadata(module)
+
+        checks = [
+            ("IDs globally unique", _UniqueIdsCheck(self)),
+            ("Check schema validity", self._get_schema_check(schema)),
+        ]
+
+        if schema == "KB":
+            checks += [
+                ("Check referenced ids", _ReferencedIdsCheck(self)),
+                ("Check passage offsets", _PassagesOffsetsCheck(self)),
+                ("Check entity offsets", _EntitiesOffsetsCheck(self)),
+                ("Check entity offsets", _EntitiesMultilabelDbCheck(self)),
+                ("Check events offsets", _EventsOffsetsCheck(self)),
+                ("Check coref offsets", _CorefIdsCheck(self)),
+                ("Check multi-label `type`", _MultilabelTypeCheck(self)),
+            ]
+
+        elif schema == "QA":
+            checks += [
+                ("Check multiple choice", _MultipleChoiceCheck(self)),
+            ]
+
+        self._run_checks(checks)
+
+    def _run_checks(self, checks: List[Tuple[str, _SplitCheck]]):
+        """
+        Run all checks in a single pass over each split.
+
+        A check stops at its first error, which is reported in the check's own sub-test once all splits
+        have been visited; the remaining checks keep running. Time spent in each check is logged at the end,
+        together with the time spent iterating (i.e. decoding) the examples.
+
+        :param checks: Pairs of sub-test message and check, in the order they should be reported
+        """  # noqa
+        timings = defaultdict(float)
+        errors = {}
+
+        def call(check: _SplitCheck, method: str, *args):
+            start = time.perf_counter()
+            try:
+                return getattr(check, method)(*args)
+            except Exception as e:
+                errors[check] = e
+            finally:
+                timings[check] += time.perf_counter() - start
+
+        for _, check in checks:
+            call(check, "start")
+
+        decoding_time = 0.0
+        num_examples = 0
+
+        for split_name, split in self.dataset.items():
+
+            active = [
+                check for _, check in checks if check not in errors and call(check, "start_split", split_name, split)
+            ]
+            if len(active) == 0:
+                continue
+
+            split_start = time.perf_counter()
+            checks_time = 0.0
+
+            for example_index, example in enumerate(split):
+                for check in active:
+                    start = time.perf_counter()
+                    try:
+                        check.visit(example, example_index)
+                    except Exception as e:
+                        errors[check] = e
+                    elapsed = time.perf_counter() - start
+                    timings[check] += elapsed
+                    checks_time += elapsed
+
+                if len(errors) > 0:
+                    active = [check for check in active if check not in errors]
+
+                num_examples += 1
+
+            decoding_time += time.perf_counter() - split_start - checks_time
 
-        valid_tasks = set([mem.name for mem in bigbiohub.Tasks])
-        invalid_tasks = set(self._SUPPORTED_TASKS) - valid_tasks
-        if len(invalid_tasks) > 0:
-            raise ValueError(f"Found invalid supported tasks {invalid_tasks}. Must be one of {bigbiohub.VALID_TASKS}")
+            for check in active:
+                if check not in errors:
+                    call(check, "end_split", split_name)
 
-        self._MAPPED_SCHEMAS = set([bigbiohub.TASK_TO_SCHEMA[task] for task in self._SUPPORTED_TASKS])
-        logger.info(f"_SUPPORTED_TASKS implies _MAPPED_SCHEMAS={self._MAPPED_SCHEMAS}")
+        for _, check in checks:
+            if check not in errors:
+                call(check, "finish")
 
-        logger.info(f"Checking load_dataset with config name {config_name}")
-        self.dataset = datasets.load_dataset(
+        for msg, check in checks:
+            with self.subTest(msg):
+                if check in errors:
+                    raise errors[check]
+
+        logger.info(f"Check timings (single pass over {num_examples} examples):")
+        logger.info(f"\t{'decoding examples':<25} {decoding_time:.3f}s")
+        for _, check in checks:
+            logger.info(f"\t{check.description:<25} {timings[check]:.3f}s")
+
+    def _load_sample(self) -> DatasetDict:
+        """
+        Stream a deterministic sample of `SAMPLE` documents per split, without generating the Arrow cache.
+
+        The sample is stratified over the shards of the split: each shard gets an equal share of the sample
+        (the share of a shard with too few documents is carried over to the next one) and shards with an empty
+        share are not read at all. Documents are drawn uniformly (reservoir sampling, seeded by `SAMPLE_SEED`)
+        from the first `SAMPLE_SCAN` documents of a shard, so single-shard loaders are not streamed entirely:
+        the sample is then a sample of a prefix of the split.
+        """  # noqa
+        logger.info(f"Sampling {self.SAMPLE} documents per split (seed={self.SAMPLE_SEED})")
+        streamed = datasets.load_dataset(
             self.DATASET_NAME,
             name=self.CONFIG_NAME,
             data_dir=self.DATA_DIR,
+            streaming=True,
         )
 
-        if "bigbio" in self.CONFIG_NAME:
-            schema = self.CONFIG_NAME.split("_")[-1].upper()
-        else:
-            schema = "source"
+        dataset = {}
+        for split_name, split in streamed.items():
 
-        logger.info(f"schema = {schema}")
-        if schema == "source":
-            return
+            rng = random.Random(f"{self.SAMPLE_SEED}-{split_name}")
+            num_shards = split.n_shards
+            shares = [self.SAMPLE // num_shards] * num_shards
+            for shard in rng.sample(range(num_shards), self.SAMPLE % num_shards):
+                shares[shard] += 1
 
-        with self.subTest("Check metadata"):
-            self.test_metadata(module)
-        with self.subTest("IDs globally unique"):
-            self.test_are_ids_globally_unique(self.dataset)
-        with self.subTest("Check schema validity"):
-            self.test_schema(schema)
+            examples = []
+            num_scanned = 0
+            shards_read = 0
+            complete = True
+            carry = 0
+            for shard, share in enumerate(shares):
 
-        if schema == "KB":
-            with self.subTest("Check referenced ids"):
-                self.test_do_all_referenced_ids_exist(self.dataset)
-            with self.subTest("Check passage offsets"):
-                self.test_passages_offsets(self.dataset)
-            with self.subTest("Check entity offsets"):
-                self.test_entities_offsets(self.dataset)
-                self.test_entities_multilabel_db(self.dataset)
-            with self.subTest("Check events offsets"):
-                self.test_events_offsets(self.dataset)
-            with self.subTest("Check coref offsets"):
-                self.test_coref_ids(self.dataset)
-            with self.subTest("Check multi-label `type`"):
-                self.test_multilabel_type(self.dataset)
+                share += carry
+                if share == 0:
+                    continue
 
-        elif schema == "QA":
-            with self.subTest("Check multiple choice"):
-                self.test_multiple_choice(self.dataset)
+                if num_shards > 1:
+                    shard_split = split_dataset_by_node(split, rank=shard, world_size=num_shards)
+                else:
+                    shard_split = split
+
+                sample, shard_scanned, shard_complete = _reservoir_sample(shard_split, share, rng, self.SAMPLE_SCAN)
+                examples += sample
+                carry = share - len(sample)
+                num_scanned += shard_scanned
+                shards_read += 1
+                complete &= shard_complete
+
+            dataset[split_name] = datasets.Dataset.from_list(examples, features=split.features)
+
+            num_failing = _sample_failure_bound(len(examples), num_scanned)
+            logger.info(
+                f"Sampled {len(examples)} of {num_scanned} documents read from split '{split_name}' "
+                f"({shards_read}/{num_shards} shards). If all checks pass on the sample, then with 95% confidence "
+                f"at most {num_failing} ({num_failing / max(num_scanned, 1):.2%}) of the documents read fail them."
+            )
+            if not complete:
+                logger.warning(
+                    f"Shards of split '{split_name}' were not read entirely (see `--sample_scan`): "
+                    f"documents which were not read are not covered by the sample."
+                )
+
+        return DatasetDict(dataset)
 
     def test_metadata(self, module: ModuleType):
         """
@@ -164,110 +1248,41 @@ class TestDataLoader(unittest.TestCase):
 
                 if not isinstance(metadata_attr, list):
                     raise AssertionError(
-                        f"Dataloader attribute '{metadata_name}' must be a list of `{metadata_type}`! Found `{type(metadata_attr)}`!"
+                        f"Dataloader attribute '{metadata_name}' must be a list of `{metadata_type}`! "
+                        f"Found `{type(metadata_attr)}`!"
                     )
 
                 if len(metadata_attr) == 0:
                     raise AssertionError(
-                        f"Dataloader attribute '{metadata_name}' must be a list of `{metadata_type}`! Found an empty list!"
+                        f"Dataloader attribute '{metadata_name}' must be a list of `{metadata_type}`! "
+                        "Found an empty list!"
                     )
 
                 for elem in metadata_attr:
                     if not isinstance(elem, metadata_type):
                         raise AssertionError(
-                            f"Dataloader attribute '{metadata_name}' must be a list of `{metadata_type}`! Found `{type(elem)}`!"
+                            f"Dataloader attribute '{metadata_name}' must be a list of `{metadata_type}`! "
+                            f"Found `{type(elem)}`!"
                         )
 
                     if elem not in lang_keys:
                         print(elem)
-                        raise AssertionError(f"Dataloader attribute '{elem}' not valid for {metadata_name} must be one of {lang_keys}")
+                        raise AssertionError(
+                            f"Dataloader attribute '{elem}' not valid for {metadata_name} must be one of {lang_keys}"
+                        )
             else:
                 if not isinstance(metadata_attr, metadata_type):
                     raise AssertionError(
-                        f"Dataloader attribute '{metadata_name}' must be of type `{metadata_type}`! Found `{type(metadata_attr)}`!"
+                        f"Dataloader attribute '{metadata_name}' must be of type `{metadata_type}`! "
+                        f"Found `{type(metadata_attr)}`!"
                     )
 
             if metadata_name == "_LICENSE":
                 if metadata_attr not in license_keys:
-                    raise AssertionError(f"Dataloader attribute '{metadata_attr}' not valid for {metadata_name} must be one of {license_keys}")
-
-    def get_feature_statistics(self, features: Features) -> Dict:
-        """
-        Gets sample statistics, for each split and sample of the number of
-        features in the schema present; only works for the big-bio schema.
-        """  # noqa
-        logger.info("Gathering dataset statistics")
-        all_counters = {}
-        for split_name, split in self.dataset.items():
-
-            counter = defaultdict(int)
-            for example in split:
-                for feature_name, feature in features.items():
-                    if example.get(feature_name, None) is not None:
-                        if isinstance(feature, datasets.Value):
-                            if example[feature_name]:
-                                counter[feature_name] += 1
-                        else:
-                            counter[feature_name] += len(example[feature_name])
-
-                            # TODO do proper recursion here
-                            if feature_name == "entities":
-                                for entity in example["entities"]:
-                                    counter["normalized"] += len(entity["normalized"])
-
-            all_counters[split_name] = counter
-
-        return all_counters
-
-    def _assert_ids_globally_unique(
-        self,
-        collection: Iterable,
-        ids_seen: set,
-        ignore_assertion: bool = False,
-    ):
-        """
-        Checks if all IDs are globally unique across a feature list.
-        This looks recursively through elements of arrays to check if every referenced ID is unique.
-
-        :param collection: An iterable of features that contain NLP info (ex: entities, events)
-        :param ids_seen: Set of previously seen numerical IDs (empty by default)
-        :param ignore_assertion: Whether to raise an error if id was already seen.
-        """  # noqa
-        if isinstance(collection, dict):
-
-            for k, v in collection.items():
-                if isinstance(v, dict):
-                    self._assert_ids_globally_unique(v, ids_seen)
-
-                elif isinstance(v, list):
-                    for elem in v:
-                        self._assert_ids_globally_unique(elem, ids_seen)
-                else:
-                    if k == "id":
-                        if not ignore_assertion:
-                            self.assertNotIn(v, ids_seen)
-                        ids_seen.add(v)
-
-        elif isinstance(collection, list):
-            for elem in collection:
-                self._assert_ids_globally_unique(elem, ids_seen)
-
-    def test_are_ids_globally_unique(self, dataset_bigbio: DatasetDict):
-        """
-        Tests each example in a split has a unique ID.
-        """  # noqa
-        logger.info("Checking global ID uniqueness")
-        for split_name, split in dataset_bigbio.items():
-
-            # Skip entire data split
-            if split_name in self.BYPASS_SPLITS:
-                logger.info(f"\tSkipping unique ID check on {split_name}")
-                continue
-
-            ids_seen = set()
-            for example in split:
-                self._assert_ids_globally_unique(example, ids_seen=ids_seen)
-        logger.info("Found {} unique IDs".format(len(ids_seen)))
+                    raise AssertionError(
+                        f"Dataloader attribute '{metadata_attr}' not valid for {metadata_name} "
+                        f"must be one of {license_keys}"
+                    )
 
     def _get_referenced_ids(self, example):
         referenced_ids = []
@@ -301,101 +1316,6 @@ class TestDataLoader(unittest.TestCase):
 
         return existing_ids
 
-    def test_do_all_referenced_ids_exist(self, dataset_bigbio: DatasetDict):
-        """
-        Checks if referenced IDs are correctly labeled.
-        """  # noqa
-        logger.info("Checking if referenced IDs are properly mapped")
-        for split_name, split in dataset_bigbio.items():
-
-            # skip entire split
-            if split_name in self.BYPASS_SPLITS:
-                logger.info(f"\tSkipping referenced ids on {split_name}")
-                continue
-
-            for example in split:
-                referenced_ids = set()
-                existing_ids = set()
-
-                referenced_ids.update(self._get_referenced_ids(example))
-                existing_ids.update(self._get_existing_referable_ids(example))
-
-                for ref_id, ref_type in referenced_ids:
-
-                    if self._skipkey_or_keysplit(ref_type, split_name):
-                        split_keys = (split_name, ref_type)
-                        logger.warning(f"\tSkipping referenced ids on {split_keys}")
-                        continue
-
-                    if ref_type == "event":
-                        if not ((ref_id, "entity") in existing_ids or (ref_id, "event") in existing_ids):
-                            logger.warning(
-                                f"Referenced element ({ref_id}, entity/event) could not be "
-                                f"found in existing ids {existing_ids}. Please make sure that "
-                                f"this is not because of a bug in your data loader."
-                            )
-                    else:
-                        if not (ref_id, ref_type) in existing_ids:
-                            logger.warning(
-                                f"Referenced element {(ref_id, ref_type)} could not be "
-                                f"found in existing ids {existing_ids}. Please make sure that "
-                                f"this is not because of a bug in your data loader."
-                            )
-
-    def test_passages_offsets(self, dataset_bigbio: DatasetDict):
-        """
-        Verify that the passages offsets are correct,
-        i.e.: passage text == text extracted via the passage offsets
-        """  # noqa
-        logger.info("KB ONLY: Checking passage offsets")
-        for split in dataset_bigbio:
-
-            # skip entire split
-            if split in self.BYPASS_SPLITS:
-                logger.info(f"\tSkipping passage offsets on {split}")
-                continue
-
-            if self._skipkey_or_keysplit("passages", split):
-                logger.warning(f"Skipping passages offsets for split='{split}'")
-                continue
-
-            if "passages" in dataset_bigbio[split].features:
-
-                for example in dataset_bigbio[split]:
-
-                    example_text = _get_example_text(example)
-
-                    for passage in example["passages"]:
-
-                        example_id = example["id"]
-
-                        text = passage["text"]
-                        offsets = passage["offsets"]
-
-                        self._test_is_list(msg="Text in passages must be a list", field=text)
-
-                        self._test_is_list(
-                            msg="Offsets in passages must be a list",
-                            field=offsets,
-                        )
-
-                        self._test_has_only_one_item(
-                            msg="Offsets in passages must have only one element",
-                            field=offsets,
-                        )
-
-                        self._test_has_only_one_item(
-                            msg="Text in passages must have only one element",
-                            field=text,
-                        )
-
-                        for idx, (start, end) in enumerate(offsets):
-                            msg = (
-                                f"Split:{split} - Example:{example_id} - "
-                                f"text:`{example_text[start:end]}` != text_by_offset:`{text[idx]}`"
-                            )
-                            self.assertEqual(example_text[start:end], text[idx], msg)
-
     def _check_offsets(
         self,
         example_id: int,
@@ -446,282 +1366,8 @@ class TestDataLoader(unittest.TestCase):
             if by_offset_text != text:
                 yield f" text:`{text}` != text_by_offset:`{by_offset_text}`"
 
-    def test_entities_offsets(self, dataset_bigbio: DatasetDict):
-        """
-        Verify that the entities offsets are correct,
-        i.e.: entity text == text extracted via the entity offsets
-        """  # noqa
-        logger.info("KB ONLY: Checking entity offsets")
-        errors = []
-
-        for split in dataset_bigbio:
-
-            # skip entire split
-            if split in self.BYPASS_SPLITS:
-                logger.info(f"\tSkipping entities offsets on {split}")
-                continue
-
-            if self._skipkey_or_keysplit("entities", split):
-                logger.warning(f"Skipping entities offsets for split='{split}'")
-                continue
-
-            if "entities" in dataset_bigbio[split].features:
-
-                for example in dataset_bigbio[split]:
-
-                    example_id = example["id"]
-                    example_text = _get_example_text(example)
-
-                    for entity in example["entities"]:
-
-                        for msg in self._check_offsets(
-                            example_id=example_id,
-                            split=split,
-                            example_text=example_text,
-                            offsets=entity["offsets"],
-                            texts=entity["text"],
-                        ):
-
-                            entity_id = entity["id"]
-                            errors.append(f"Example:{example_id} - entity:{entity_id} " + msg)
-
-        if len(errors) > 0:
-            logger.warning(msg="\n".join(errors) + OFFSET_ERROR_MSG)
-
-    def test_events_offsets(self, dataset_bigbio: DatasetDict):
-        """
-        Verify that the events' trigger offsets are correct,
-        i.e.: trigger text == text extracted via the trigger offsets
-        """  # noqa
-        logger.info("KB ONLY: Checking event offsets")
-        errors = []
-
-        for split in dataset_bigbio:
-
-            # skip entire split
-            if split in self.BYPASS_SPLITS:
-                logger.info(f"\tSkipping events offsets on {split}")
-                continue
-
-            if self._skipkey_or_keysplit("events", split):
-                logger.warning(f"Skipping events offsets for split='{split}'")
-                continue
-
-            if "events" in dataset_bigbio[split].features:
-
-                for example in dataset_bigbio[split]:
-
-                    example_id = example["id"]
-                    example_text = _get_example_text(example)
-
-                    for event in example["events"]:
-
-                        for msg in self._check_offsets(
-                            example_id=example_id,
-                            split=split,
-                            example_text=example_text,
-                            offsets=event["trigger"]["offsets"],
-                            texts=event["trigger"]["text"],
-                        ):
-
-                            event_id = event["id"]
-                            errors.append(f"Example:{example_id} - event:{event_id} " + msg)
-
-        if len(errors) > 0:
-            logger.warning(msg="\n".join(errors) + OFFSET_ERROR_MSG)
-
-    def test_coref_ids(self, dataset_bigbio: DatasetDict):
-        """
-        Verify that coreferences ids are entities
-
-        from `examples/test_n2c2_2011_coref.py`
-        """  # noqa
-        logger.info("KB ONLY: Checking coref offsets")
-        for split in dataset_bigbio:
-
-            # skip entire split
-            if split in self.BYPASS_SPLITS:
-                logger.info(f"\tSkipping coref ids on {split}")
-                continue
-
-            if self._skipkey_or_keysplit("coreferences", split):
-                logger.warning(f"Skipping coreferences ids for split='{split}'")
-                continue
-
-            if "coreferences" in dataset_bigbio[split].features:
-
-                for example in dataset_bigbio[split]:
-                    example_id = example["id"]
-                    entity_lookup = {ent["id"]: ent for ent in example["entities"]}
-
-                    # check all coref entity ids are in entity lookup
-                    for coref in example["coreferences"]:
-                        for entity_id in coref["entity_ids"]:
-                            assert (
-                                entity_id in entity_lookup
-                            ), f"Split:{split} - Example:{example_id} - Entity:{entity_id} not found!"
-
-    def test_multiple_choice(self, dataset_bigbio: DatasetDict):
-        """
-        Verify that each answer in a multiple choice Q/A task is in choices.
-        """  # noqa
-        logger.info("QA ONLY: Checking multiple choice")
-        for split in dataset_bigbio:
-
-            # skip entire split
-            if split in self.BYPASS_SPLITS:
-                logger.info(f"\tSkipping multiple-choice on {split}")
-                continue
-
-            for example in dataset_bigbio[split]:
-
-                if self._skipkey_or_keysplit("choices", split):
-                    logger.warning("Skipping multiple choice for key=choices, split='{split}'")
-                    continue
-
-                else:
-
-                    if len(example["choices"]) > 0:
-                        # can change "==" to "in" if we include ranking later
-                        assert example["type"] in [
-                            "multiple_choice",
-                            "yesno",
-                        ], f"`choices` is populated, but type is not 'multiple_choice' or 'yesno' {example}"
-
-                    if example["type"] in ["multiple_choice", "yesno"]:
-                        assert (
-                            len(example["choices"]) > 0
-                        ), f"type is 'multiple_choice' or 'yesno' but no values in 'choices' {example}"
-
-                        if self._skipkey_or_keysplit("answer", split):
-                            logger.warning("Skipping multiple choice for key=answer, split='{split}'")
-                            continue
-
-                        else:
-                            for answer in example["answer"]:
-                                assert answer in example["choices"], f"answer is not present in 'choices' {example}"
-
-    def test_entities_multilabel_db(self, dataset_bigbio: DatasetDict):
-        """
-        Check if `db_name` or `db_id` of `normalized` field in entities have multiple values joined with common connectors.
-        Raises a warning ONLY ONCE per connector type.
-        """  # noqa
-        logger.info("KB ONLY: multi-label `db_id`")
-
-        warning_raised = {}
-
-        for split in dataset_bigbio:
-
-            # skip entire split
-            if split in self.BYPASS_SPLITS:
-                logger.info(f"\tSkipping entities multilabel db on {split}")
-                continue
-
-            if "entities" not in dataset_bigbio[split].features:
-                continue
-
-            if self._skipkey_or_keysplit("entities", split):
-                logger.warning(f"Skipping multilabel entities for split='{split}'")
-                continue
-
-            for example in dataset_bigbio[split]:
-
-                example_id = example["id"]
-
-                for entity in example["entities"]:
-
-                    normalized = entity.get("normalized", [])
-                    entity_id = entity["id"]
-
-                    for norm in normalized:
-
-                        # db_name, db_id
-                        for db_field, db_value in norm.items():
-
-                            match = re.search(_CONNECTORS, db_value)
-
-                            if match is not None:
-
-                                connector = match.group(0)
-
-                                if connector not in warning_raised:
-
-                                    msg = "".join(
-                                        [
-                                            f"Split:{split} - Example:{example_id} - ",
-                                            f"Entity:{entity_id} w/ `{db_field}` `{db_value}` has connector `{connector}`. ",
-                                            "Please check for common connectors (e.g. `;`, `+`, `|`) "
-                                            "and expand the normalization list for each `db_id`",
-                                        ]
-                                    )
-
-                                    logger.warning(msg)
-
-                                    warning_raised[connector] = True
-
-    def test_multilabel_type(self, dataset_bigbio: DatasetDict):
-        """
-        Check if features with `type` field contain multilabel values
-        and raise a warning ONLY ONCE for feature type (e.g. passages)
-        """  # noqa
-
-        logger.info("KB ONLY: multi-label `type` fields")
-
-        features_with_type = ["passages", "entities", "relations", "events"]
-
-        warning_raised = {f: False for f in features_with_type}
-
-        for split in dataset_bigbio:
-
-            # skip entire split
-            if split in self.BYPASS_SPLITS:
-                logger.info(f"\tSkipping multilabel type on {split}")
-                continue
-
-            for feature_name in features_with_type:
-
-                if self._skipkey_or_keysplit(feature_name, split):
-                    logger.warning(f"Skipping multilabel type for splitkey = '{(split, feature_name)}'")
-                    continue
-
-                if feature_name not in dataset_bigbio[split].features or warning_raised[feature_name]:
-                    continue
-
-                for example_index, example in enumerate(dataset_bigbio[split]):
-
-                    if warning_raised[feature_name]:
-                        break
-
-                    example_id = example["id"]
-                    features = example[feature_name]
-
-                    for feature in features:
-
-                        feature_type = feature["type"]
-                        match = re.search(_CONNECTORS, feature_type)
-
-                        if match is not None:
-
-                            connector = match.group(0)
-
-                            msg = "".join(
-                                [
-                                    f"Split:{split} - Example:(id={example_id}, index={example_index}) - ",
-                                    f"Feature:{feature_name} w/ `type` `{feature_type}` has connector `{connector}`. ",
-                                    "Having multiple types is currently not supported. ",
-                                    "Please check for common connectors (e.g. `;`, `+`, `|`) "
-                                    "and split this feature into multiple ones with different `type`",
-                                ]
-                            )
-
-                            logger.warning(msg)
-
-                            warning_raised[feature_name] = True
-
-                            break
-
-    def test_schema(self, schema: str):
-        """Search supported tasks within a dataset and verify big-bio schema"""  # noqa
+    def _get_schema_check(self, schema: str) -> _FeatureStatisticsCheck:
+        """Search supported tasks within a dataset and build the check verifying the big-bio schema"""  # noqa
 
         non_empty_features = set()
         if schema == "KB":
@@ -732,44 +1378,7 @@ class TestDataLoader(unittest.TestCase):
         else:
             features = bigbiohub.SCHEMA_TO_FEATURES[schema]
 
-        split_to_feature_counts = self.get_feature_statistics(features=features)
-
-        for split_name, split in self.dataset.items():
-            print(split_name)
-            print("=" * 10)
-            for k, v in split_to_feature_counts[split_name].items():
-                print(f"{k}: {v}")
-            print()
-
-        for split_name, split in self.dataset.items():
-
-            # Skip entire data split
-            if split_name in self.BYPASS_SPLITS:
-                logger.info(f"Skipping schema on {split_name}")
-                continue
-
-            logger.info("Testing schema for: " + str(split_name))
-            self.assertEqual(split.info.features, features)
-
-            for non_empty_feature in non_empty_features:
-
-                if self._skipkey_or_keysplit(non_empty_feature, split_name):
-                    logger.warning(f"Skipping schema for split, key = '{(split_name, non_empty_feature)}'")
-                    continue
-
-                if split_to_feature_counts[split_name][non_empty_feature] == 0:
-                    raise AssertionError(f"Required key '{non_empty_feature}' does not have any instances")
-
-            for feature, count in split_to_feature_counts[split_name].items():
-                if (
-                    count > 0
-                    and feature not in non_empty_features
-                    and feature in set().union(*_TASK_TO_FEATURES.values())
-                ):
-                    logger.warning(
-                        f"Found instances of '{feature}' but there seems to be no task "
-                        f"in 'SUPPORTED_TASKS' for them. Is 'SUPPORTED_TASKS' correct?"
-                    )
+        return _FeatureStatisticsCheck(self, features=features, non_empty_features=non_empty_features)
 
     def _test_is_list(self, msg: str, field: list):
         with self.subTest(
@@ -836,7 +1445,8 @@ if __name__ == "__main__":
         default=[],
         required=False,
         nargs="*",
-        help="Skip a data split (e.g. 'train', 'dev') from testing. List all splits as space separated (ex: --bypass_splits train dev)",
+        help="Skip a data split (e.g. 'train', 'dev') from testing. "
+        "List all splits as space separated (ex: --bypass_splits train dev)",
     )
 
     parser.add_argument(
@@ -844,7 +1454,8 @@ if __name__ == "__main__":
         default=[],
         required=False,
         nargs="*",
-        help="Skip a required key (e.g. 'entities' for NER) from testing. List all keys as space separated (ex: --bypass_keys entities events)",
+        help="Skip a required key (e.g. 'entities' for NER) from testing. "
+        "List all keys as space separated (ex: --bypass_keys entities events)",
     )
 
     parser.add_argument(
@@ -852,7 +1463,46 @@ if __name__ == "__main__":
         default=[],
         required=False,
         nargs="*",
-        help="Skip a key in a data split (e.g. skip 'entities' in 'test'). List all key-pairs comma separated. (ex: --bypass_split_key_pairs test,entities train, events)",
+        help="Skip a key in a data split (e.g. skip 'entities' in 'test'). "
+        "List all key-pairs comma separated. (ex: --bypass_split_key_pairs test,entities train, events)",
+    )
+
+    parser.add_argument(
+        "--num_proc",
+        type=int,
+        default=1,
+        help="Number of processes used to check offsets (default is 1)",
+    )
+
+    parser.add_argument(
+        "--sample",
+        type=int,
+        help="Validate a deterministic sample of N documents per split, streamed instead of generating the full "
+        "dataset. The sample is drawn uniformly from the first documents of each shard (see --sample_scan), i.e. "
+        "from a prefix of the split for loaders with a single shard",
+    )
+
+    parser.add_argument(
+        "--sample_seed",
+        type=int,
+        default=0,
+        help="Seed of the sample (default is 0)",
+    )
+
+    parser.add_argument(
+        "--sample_scan",
+        type=int,
+        default=TestDataLoader.SAMPLE_SCAN,
+        help=f"Read at most N documents per shard when sampling, 0 to read every sampled shard entirely "
+        f"(default is {TestDataLoader.SAMPLE_SCAN})",
+    )
+
+    parser.add_argument(
+        "--unique_ids_mode",
+        default="exact",
+        choices=sorted(_UNIQUE_IDS_MODES),
+        help="How IDs are tracked to check their uniqueness: 'exact' stores a 64-bit hash per ID, "
+        "'bloom' uses a Bloom filter (less memory, but the split is always visited twice)",
     )
 
     # If specified as `True`, bypass hub download and check local script.
@@ -897,6 +1547,7 @@ if __name__ == "__main__":
     else:
         run_config_names = all_config_names
 
+    results = []
     for config_name in run_config_names:
         TestDataLoader.DATASET_NAME = org_and_dataset_name
         TestDataLoader.CONFIG_NAME = config_name
@@ -904,4 +1555,11 @@ if __name__ == "__main__":
         TestDataLoader.BYPASS_SPLITS = args.bypass_splits
         TestDataLoader.BYPASS_KEYS = args.bypass_keys
         TestDataLoader.BYPASS_SPLIT_KEY_PAIRS = args.bypass_split_key_pairs
-        unittest.TextTestRunner().run(TestDataLoader())
+        TestDataLoader.NUM_PROC = args.num_proc
+        TestDataLoader.SAMPLE = args.sample
+        TestDataLoader.SAMPLE_SEED = args.sample_seed
+        TestDataLoader.SAMPLE_SCAN = args.sample_scan or None
+        TestDataLoader.UNIQUE_IDS_MODE = args.unique_ids_mode
+        results.append(unittest.TextTestRunner().run(TestDataLoader()))
+
+    sys.exit(0 if all(result.wasSuccessful() for result in results) else 1)
@@ -0,0 +1,292 @@
+"""
+Unit-tests of the checks of the hub unit-tests (`tests/test_bigbio_hub.py`) on in-memory data.
+
+    python -m pytest tests/test_bigbio_hub_checks.py
+"""
+import random
+import unittest
+from collections import Counter
+from typing import Any, Iterable, List, Optional
+
+import datasets
+import numpy as np
+import pyarrow as pa
+from datasets import DatasetDict
+
+# the module is not imported by name, pytest would collect its `TestDataLoader`
+from tests import test_bigbio_hub
+from tests.test_bigbio_hub import (
+    _BloomIds,
+    _find_offset_suspects,
+    _HashedIds,
+    _offset_mismatches,
+    _reservoir_sample,
+    _sample_failure_bound,
+    _SplitCheck,
+    _UniqueIdsCheck,
+)
+
+
+def _hub_test(dataset: DatasetDict, **attributes) -> test_bigbio_hub.TestDataLoader:
+    test = test_bigbio_hub.TestDataLoader()
+    test.dataset = dataset
+    test.BYPASS_SPLITS = []
+    test.BYPASS_KEYS = []
+    test.BYPASS_SPLIT_KEY_PAIRS = []
+    for name, value in attributes.items():
+        setattr(test, name, value)
+    return test
+
+
+class _RecordingCheck(_SplitCheck):
+    """Records the calls it receives, and fails on the example with the given ID."""
+
+    description = "recording check"
+
+    def __init__(self, test: test_bigbio_hub.TestDataLoader, fail_on: Optional[str] = None):
+        super().__init__(test)
+        self.fail_on = fail_on
+        self.calls: List[tuple] = []
+
+    def start(self):
+        self.calls.append(("start",))
+
+    def start_split(self, split_name: str, split: datasets.Dataset) -> bool:
+        self.calls.append(("start_split", split_name))
+        return super().start_split(split_name, split)
+
+    def visit(self, example: dict, example_index: int):
+        self.calls.append(("visit", example["id"], example_index))
+        if example["id"] == self.fail_on:
+            raise AssertionError(f"failed on {example['id']}")
+
+    def end_split(self, split_name: str):
+        self.calls.append(("end_split", split_name))
+
+    def finish(self):
+        self.calls.append(("finish",))
+
+
+class TestSplitChecks(unittest.TestCase):
+    def setUp(self):
+        self.dataset = DatasetDict(
+            {
+                "train": datasets.Dataset.from_list([{"id": "0"}, {"id": "1"}, {"id": "2"}]),
+                "test": datasets.Dataset.from_list([{"id": "3"}]),
+            }
+        )
+
+    def test_single_pass(self):
+        test = _hub_test(self.dataset)
+        check = _RecordingCheck(test)
+
+        test._run_checks([("recording", check)])
+
+        self.assertEqual(
+            check.calls,
+            [
+                ("start",),
+                ("start_split", "train"),
+                ("visit", "0", 0),
+                ("visit", "1", 1),
+                ("visit", "2", 2),
+                ("end_split", "train"),
+                ("start_split", "test"),
+                ("visit", "3", 0),
+                ("end_split", "test"),
+                ("finish",),
+            ],
+        )
+
+    def test_bypassed_split(self):
+        test = _hub_test(self.dataset, BYPASS_SPLITS=["train"])
+        check = _RecordingCheck(test)
+
+        test._run_checks([("recording", check)])
+
+        self.assertNotIn(("end_split", "train"), check.calls)
+        self.assertEqual([call for call in check.calls if call[0] == "visit"], [("visit", "3", 0)])
+
+    def test_failing_check_does_not_stop_the_others(self):
+        test = _hub_test(self.dataset)
+        failing = _RecordingCheck(test, fail_on="1")
+        other = _RecordingCheck(test)
+
+        with self.assertRaisesRegex(AssertionError, "failed on 1"):
+            test._run_checks([("failing", failing), ("other", other)])
+
+        self.assertEqual([call[1] for call in failing.calls if call[0] == "visit"], ["0", "1"])
+        self.assertEqual([call[1] for call in other.calls if call[0] == "visit"], ["0", "1", "2", "3"])
+        self.assertNotIn(("finish",), failing.calls)
+        self.assertIn(("finish",), other.calls)
+
+    def test_duplicated_ids_across_checks(self):
+        dataset = DatasetDict({"train": datasets.Dataset.from_list([{"id": "0"}, {"id": "1"}, {"id": "0"}])})
+        test = _hub_test(dataset, UNIQUE_IDS_MODE="exact")
+        other = _RecordingCheck(test)
+
+        with self.assertRaisesRegex(AssertionError, r"Found 1 duplicated IDs: \['0'\]"):
+            test._run_checks([("IDs globally unique", _UniqueIdsCheck(test)), ("other", other)])
+
+        self.assertIn(("finish",), other.calls)
+
+
+def _entity(text: str, start: int, end: int) -> dict:
+    return {"id": text, "type": "t", "text": [text], "offsets": [[start, end]], "normalized": []}
+
+
+class TestOffsetsChecks(unittest.TestCase):
+    def test_offset_mismatches(self):
+        doc_texts = pa.array(["héllo wörld", "abc"])
+        spans = [
+            # (document, start, end, expected text)
+            (0, 0, 5, "héllo"),
+            (0, 6, 11, "wörld"),
+            (0, 6, 11, "world"),
+            (1, 1, 3, "bc"),
+            (1, -2, 10, "bc"),
+            (1, 2, 1, ""),
+            (1, 0, 2, "abc"),
+        ]
+        docs, starts, ends, expected = zip(*spans)
+
+        mismatches = _offset_mismatches(
+            doc_texts=doc_texts,
+            span_docs=np.array(docs),
+            starts=np.array(starts),
+            ends=np.array(ends),
+            expected=pa.array(expected),
+        )
+
+        self.assertEqual(mismatches.tolist(), [False, False, True, False, False, False, True])
+
+    def test_offset_mismatches_follow_python_slicing(self):
+        rng = random.Random(0)
+        texts = ["".join(rng.choice("aé€😀 ") for _ in range(rng.randint(0, 20))) for _ in range(50)]
+        spans = []
+        for _ in range(2000):
+            doc = rng.randrange(len(texts))
+            start, end = rng.randint(-25, 25), rng.randint(-25, 25)
+            # half of the spans match their expected text
+            expected = texts[doc][start:end] if rng.random() < 0.5 else rng.choice(texts)[start:end]
+            spans.append((doc, start, end, expected))
+        docs, starts, ends, expected = zip(*spans)
+
+        mismatches = _offset_mismatches(
+            doc_texts=pa.array(texts),
+            span_docs=np.array(docs),
+            starts=np.array(starts),
+            ends=np.array(ends),
+            expected=pa.array(expected),
+        )
+
+        self.assertEqual(mismatches.tolist(), [texts[d][s:e] != x for d, s, e, x in spans])
+
+    def test_find_offset_suspects(self):
+        examples = [
+            {
+                "passages": [
+                    {"text": ["Aspirin helps."], "offsets": [[0, 14]]},
+                    {"text": ["Ça va"], "offsets": [[15, 20]]},
+                ],
+                "entities": [_entity("Aspirin", 0, 7), _entity("helps", 8, 13), _entity("va", 17, 20)],
+            },
+            {
+                "passages": [{"text": ["No entity"], "offsets": [[0, 9]]}],
+                "entities": [],
+            },
+            {
+                "passages": [{"text": ["Fever"], "offsets": [[0, 5]]}],
+                "entities": [_entity("Fever", 0, 5), {**_entity("ever", 1, 5), "text": []}],
+            },
+        ]
+
+        suspects = _find_offset_suspects(pa.Table.from_pylist(examples), "entities")
+
+        # the offsets of `va` are off by one, `ever` has no text for its offsets
+        self.assertEqual(suspects.tolist(), [[0, 2], [2, 1]])
+        self.assertEqual(_find_offset_suspects(pa.Table.from_pylist(examples), "passages").tolist(), [])
+
+
+class TestSampling(unittest.TestCase):
+    def test_reservoir_sample_is_deterministic(self):
+        examples = [{"id": str(i)} for i in range(1000)]
+
+        sample, num_scanned, complete = _reservoir_sample(iter(examples), 20, random.Random(0))
+        again, _, _ = _reservoir_sample(iter(examples), 20, random.Random(0))
+        other, _, _ = _reservoir_sample(iter(examples), 20, random.Random(1))
+
+        self.assertEqual(sample, again)
+        self.assertNotEqual(sample, other)
+        self.assertEqual((len(sample), num_scanned, complete), (20, 1000, True))
+        # in stream order
+        self.assertEqual(sample, sorted(sample, key=lambda example: int(example["id"])))
+
+    def test_reservoir_sample_of_short_stream(self):
+        examples = [{"id": str(i)} for i in range(5)]
+
+        self.assertEqual(_reservoir_sample(iter(examples), 20, random.Random(0)), (examples, 5, True))
+
+    def test_reservoir_sample_max_scan(self):
+        examples = ({"id": str(i)} for i in range(1000))
+
+        sample, num_scanned, complete = _reservoir_sample(examples, 20, random.Random(0), max_scan=100)
+
+        self.assertEqual((len(sample), num_scanned, complete), (20, 100, False))
+        self.assertTrue(all(int(example["id"]) < 100 for example in sample))
+        # the stream is read no further than the example after the cap
+        self.assertEqual(next(examples), {"id": "101"})
+
+    def test_sample_failure_bound(self):
+        self.assertEqual(_sample_failure_bound(100, 100), 0)
+        self.assertEqual(_sample_failure_bound(0, 100), 100)
+
+        bounds = [_sample_failure_bound(num_sampled, 10000) for num_sampled in (10, 100, 1000)]
+        self.assertEqual(bounds, sorted(bounds, reverse=True))
+        # close to the "rule of three" for samples much smaller than the population
+        self.assertAlmostEqual(_sample_failure_bound(100, 10**6) / 10**6, 3 / 100, delta=0.001)
+
+
+def _duplicates(ids: Any, values: Iterable[Any]) -> List[Any]:
+    """Duplicated values found with an ID tracker, as done by `_UniqueIdsCheck`."""
+    values = list(values)
+    for value in values:
+        ids.add(value)
+    if not ids.finalize():
+        return []
+    counts = Counter(value for value in values if ids.is_candidate(value))
+    return sorted((value for value, count in counts.items() if count > 1), key=repr)
+
+
+class TestUniqueIds(unittest.TestCase):
+    def test_exact_and_bloom_report_the_same_duplicates(self):
+        rng = random.Random(0)
+        # IDs of mixed types, more than a buffer of the Bloom filter, which has to grow past its initial capacity
+        values = [f"id-{i}" for i in range(150_000)] + list(range(1000))
+        values += [rng.choice(values) for _ in range(300)]
+        rng.shuffle(values)
+        expected = sorted((value for value, count in Counter(values).items() if count > 1), key=repr)
+
+        self.assertEqual(_duplicates(_HashedIds(), values), expected)
+        self.assertEqual(_duplicates(_BloomIds(capacity=1 << 12), values), expected)
+        self.assertGreater(len(expected), 0)
+
+    def test_no_duplicates(self):
+        values = [str(i) for i in range(10_000)]
+
+        self.assertEqual(_duplicates(_HashedIds(), values), [])
+        self.assertEqual(_duplicates(_BloomIds(), values), [])
+
+    def test_unique_ids_check_modes(self):
+        examples = [{"id": "0", "entities": [{"id": "e0"}, {"id": "e1"}]}, {"id": "1", "entities": [{"id": "e0"}]}]
+        dataset = DatasetDict({"train": datasets.Dataset.from_list(examples)})
+
+        for mode in ("exact", "bloom"):
+            with self.subTest(mode):
+                test = _hub_test(dataset, UNIQUE_IDS_MODE=mode)
+                with self.assertRaisesRegex(AssertionError, r"Found 1 duplicated IDs: \['e0'\]"):
+                    test._run_checks([("IDs globally unique", _UniqueIdsCheck(test))])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Unit-tests of the mirroring of the hub repos (`bigbio/hub/clone_all_hub_repos.py`) from local bare git repositories.
+
+    python -m pytest tests/test_clone_all_hub_repos.py
+"""
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Dict, List
+
+from bigbio.hub.clone_all_hub_repos import mirror
+from bigbio.hub.hubtools import HF_ORG
+
+
+def _git(cwd: Path, *args: str):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd,
+        capture_output=True,
+        check=True,
+    )
+
+
+class TestCloneAllHubRepos(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        # bare repositories at `<hub_dir>/<org>/<dataset name>`, pushed from working copies
+        self.hub_dir = self.tmp_dir / "hub"
+        self.work_dir = self.tmp_dir / "work"
+        self.output_dir = self.tmp_dir / "hub_repos"
+        self.cache_dir = self.tmp_dir / "cache"
+
+        self._push(
+            "alpha", {"alpha.py": "# loader of alpha\n", "bigbiohub.py": "# helpers\n", "docs/README.md": "a\n"}
+        )
+        self._push("beta", {"beta.py": "# loader of beta\n", "bigbiohub.py": "# helpers\n"})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _push(self, name: str, files: Dict[str, str], deleted: List[str] = ()):
+        """Commit changes of a repo and push them to its bare repository."""
+        work = self.work_dir / name
+        if not work.exists():
+            bare = self.hub_dir / HF_ORG / name
+            bare.mkdir(parents=True)
+            _git(bare, "init", "--quiet", "--bare")
+            work.mkdir(parents=True)
+            _git(work, "init", "--quiet")
+            _git(work, "remote", "add", "origin", str(bare))
+            files = {".gitattributes": "*.parquet filter=lfs\n", **files}
+        for path, text in files.items():
+            (work / path).parent.mkdir(parents=True, exist_ok=True)
+            (work / path).write_text(text)
+        for path in deleted:
+            (work / path).unlink()
+        _git(work, "add", "--all")
+        _git(work, "commit", "--quiet", "-m", "update")
+        _git(work, "push", "--quiet", "origin", "HEAD:refs/heads/main")
+        _git(self.hub_dir / HF_ORG / name, "symbolic-ref", "HEAD", "refs/heads/main")
+
+    def _mirror(self, dataset_names=("alpha", "beta"), **kwargs) -> Dict[str, Dict]:
+        results = mirror(
+            dataset_names=list(dataset_names),
+            output_dir=self.output_dir,
+            cache_dir=self.cache_dir,
+            url_base=f"file://{self.hub_dir}",
+            num_workers=2,
+            **kwargs,
+        )
+        return {result["dataset_name"]: result for result in results}
+
+    def _local_files(self, name: str) -> Dict[str, str]:
+        local_dir = self.output_dir / name
+        return {
+            path.relative_to(local_dir).as_posix(): path.read_text() for path in local_dir.rglob("*") if path.is_file()
+        }
+
+    def test_first_fetch(self):
+        results = self._mirror()
+
+        self.assertEqual(results["alpha"]["status"], "updated")
+        self.assertEqual(sorted(results["alpha"]["written"]), ["alpha.py", "bigbiohub.py", "docs/README.md"])
+        self.assertEqual(
+            self._local_files("alpha"),
+            {"alpha.py": "# loader of alpha\n", "bigbiohub.py": "# helpers\n", "docs/README.md": "a\n"},
+        )
+        self.assertEqual(self._local_files("beta"), {"beta.py": "# loader of beta\n", "bigbiohub.py": "# helpers\n"})
+
+    def test_incremental_update(self):
+        self._mirror()
+        self.assertEqual({result["status"] for result in self._mirror().values()}, {"unchanged"})
+
+        self._push("alpha", {"bigbiohub.py": "# helpers, changed\n", "new.py": "# new\n"})
+        results = self._mirror()
+
+        self.assertEqual(results["alpha"]["status"], "updated")
+        self.assertEqual(sorted(results["alpha"]["written"]), ["bigbiohub.py", "new.py"])
+        self.assertEqual(results["alpha"]["deleted"], [])
+        self.assertEqual(results["beta"]["status"], "unchanged")
+        self.assertEqual(self._local_files("alpha")["bigbiohub.py"], "# helpers, changed\n")
+
+    def test_local_changes_are_overwritten(self):
+        self._mirror()
+        (self.output_dir / "alpha" / "alpha.py").write_text("# local edit\n")
+
+        results = self._mirror()
+
+        self.assertEqual(results["alpha"]["written"], ["alpha.py"])
+        self.assertEqual(self._local_files("alpha")["alpha.py"], "# loader of alpha\n")
+
+    def test_upstream_delete(self):
+        self._mirror()
+        self._push("alpha", {}, deleted=["docs/README.md"])
+
+        results = self._mirror()
+
+        self.assertEqual(results["alpha"]["deleted"], ["docs/README.md"])
+        self.assertNotIn("docs/README.md", self._local_files("alpha"))
+        # directories left empty are removed
+        self.assertFalse((self.output_dir / "alpha" / "docs").exists())
+
+    def test_keep_local(self):
+        self._mirror()
+        self._push("alpha", {}, deleted=["docs/README.md"])
+        (self.output_dir / "alpha" / "local_notes.txt").write_text("not on the Hub\n")
+
+        with self.assertLogs("bigbio.hub.clone_all_hub_repos", level="INFO"):
+            results = self._mirror(keep_local=True)
+
+        self.assertEqual(results["alpha"]["deleted"], [])
+        self.assertEqual(sorted(results["alpha"]["kept"]), ["docs/README.md", "local_notes.txt"])
+        self.assertIn("local_notes.txt", self._local_files("alpha"))
+        self.assertIn("docs/README.md", self._local_files("alpha"))
+
+    def test_deletions_are_logged(self):
+        self._mirror()
+        (self.output_dir / "beta" / "local_notes.txt").write_text("not on the Hub\n")
+
+        with self.assertLogs("bigbio.hub.clone_all_hub_repos", level="WARNING") as logs:
+            results = self._mirror()
+
+        self.assertEqual(results["beta"]["deleted"], ["local_notes.txt"])
+        self.assertTrue(any("local_notes.txt" in line for line in logs.output))
+        self.assertFalse((self.output_dir / "beta" / "local_notes.txt").exists())
+
+    def test_missing_repo(self):
+        results = self._mirror(dataset_names=["alpha", "missing"])
+
+        self.assertEqual(results["missing"]["status"], "failed")
+        self.assertTrue(results["missing"]["error"])
+        self.assertFalse((self.output_dir / "missing").exists())
+        self.assertEqual(results["alpha"]["status"], "updated")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+"""
+Unit-tests of the incremental sync of the hub repos (`bigbio/hub/sync_hub_repos.py`) against an in-memory Hub.
+
+    python -m pytest tests/test_sync_hub_repos.py
+"""
+import hashlib
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from huggingface_hub import CommitOperationAdd, CommitOperationDelete
+from huggingface_hub.utils import HfHubHTTPError, RepositoryNotFoundError
+
+from bigbio.hub.hubtools import HF_ORG
+from bigbio.hub.sync_hub_repos import _load_manifest, git_blob_id, sync
+
+
+def _http_error(status_code: int, cls=HfHubHTTPError) -> HfHubHTTPError:
+    return cls(f"{status_code} error", response=SimpleNamespace(status_code=status_code, headers={}, request=None))
+
+
+class FakeHfApi:
+    """
+    In-memory stand-in for `HfApi`: repos are dicts of file contents keyed on their path.
+
+    `create_commit` records the operations of each commit and applies them to the repo,
+    unless an error was queued for the repo in `failures`, which is raised instead.
+    """  # noqa
+
+    def __init__(self, repos: Dict[str, Dict[str, bytes]]):
+        self.repos = {repo_id: dict(files) for repo_id, files in repos.items()}
+        self.commits: List[SimpleNamespace] = []
+        self.commit_attempts: Dict[str, int] = {}
+        self.failures: Dict[str, List[Exception]] = {}
+        self._lock = threading.Lock()
+
+    def list_repo_tree(self, repo_id: str, repo_type: Optional[str] = None, recursive: bool = False):
+        if repo_id not in self.repos:
+            raise _http_error(404, RepositoryNotFoundError)
+        for path, data in sorted(self.repos[repo_id].items()):
+            blob_id = hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+            yield SimpleNamespace(path=path, blob_id=blob_id, lfs=None)
+
+    def create_commit(self, repo_id: str, operations, commit_message: str, repo_type=None, commit_description=None):
+        with self._lock:
+            self.commit_attempts[repo_id] = self.commit_attempts.get(repo_id, 0) + 1
+            if self.failures.get(repo_id):
+                raise self.failures[repo_id].pop(0)
+            files = self.repos.setdefault(repo_id, {})
+            for operation in operations:
+                if isinstance(operation, CommitOperationAdd):
+                    files[operation.path_in_repo] = Path(operation.path_or_fileobj).read_bytes()
+                elif isinstance(operation, CommitOperationDelete):
+                    del files[operation.path_in_repo]
+            self.commits.append(
+                SimpleNamespace(
+                    repo_id=repo_id,
+                    uploads=sorted(op.path_in_repo for op in operations if isinstance(op, CommitOperationAdd)),
+                    deletes=sorted(op.path_in_repo for op in operations if isinstance(op, CommitOperationDelete)),
+                )
+            )
+
+
+class TestSyncHubRepos(unittest.TestCase):
+
+    DATASET_NAMES = ["alpha", "beta", "gamma"]
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.hub_repos_dir = self.tmp_dir / "hub_repos"
+        self.manifest_path = self.tmp_dir / "manifest.json"
+
+        hub = {}
+        for name in self.DATASET_NAMES:
+            files = {
+                f"{name}.py": f"# loader of {name}\n".encode(),
+                "bigbiohub.py": b"# shared helpers\n",
+                "README.md": f"# {name}\n".encode(),
+            }
+            for path, data in files.items():
+                (self.hub_repos_dir / name).mkdir(parents=True, exist_ok=True)
+                (self.hub_repos_dir / name / path).write_bytes(data)
+            # files of the Hub which are not managed locally are never deleted
+            hub[f"{HF_ORG}/{name}"] = {**files, ".gitattributes": b"*.parquet filter=lfs\n"}
+        self.api = FakeHfApi(hub)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _sync(self, **kwargs):
+        kwargs = {
+            "hub_repos_dir": self.hub_repos_dir,
+            "manifest_path": self.manifest_path,
+            "api": self.api,
+            "num_workers": 2,
+            "dryrun": False,
+            "backoff": 0.0,
+            "commit_message": "sync",
+            **kwargs,
+        }
+        return {result["repo_id"]: result for result in sync(**kwargs)}
+
+    def _assert_hub_matches_local(self):
+        for name in self.DATASET_NAMES:
+            local = {path.name: path.read_bytes() for path in (self.hub_repos_dir / name).iterdir()}
+            remote = dict(self.api.repos[f"{HF_ORG}/{name}"])
+            remote.pop(".gitattributes")
+            self.assertEqual(local, remote)
+
+    def test_first_sync_without_manifest(self):
+        (self.hub_repos_dir / "alpha" / "alpha.py").write_text("# changed loader\n")
+
+        results = self._sync()
+
+        commits = [(commit.repo_id, commit.uploads, commit.deletes) for commit in self.api.commits]
+        self.assertEqual(commits, [("bigbio/alpha", ["alpha.py"], [])])
+        self.assertEqual(results["bigbio/alpha"]["status"], "synced")
+        self.assertEqual(results["bigbio/beta"]["status"], "unchanged")
+        manifest = _load_manifest(self.manifest_path)
+        self.assertEqual(sorted(manifest), [f"{HF_ORG}/{name}" for name in self.DATASET_NAMES])
+        self.assertEqual(manifest["bigbio/alpha"]["alpha.py"], git_blob_id(self.hub_repos_dir / "alpha" / "alpha.py"))
+        self._assert_hub_matches_local()
+
+    def test_bigbiohub_change_uploads_one_file_per_repo(self):
+        self._sync()
+        self.assertEqual(self.api.commits, [])
+
+        for name in self.DATASET_NAMES:
+            (self.hub_repos_dir / name / "bigbiohub.py").write_text("# shared helpers, changed\n")
+        self._sync()
+
+        self.assertEqual(
+            sorted((c.repo_id, c.uploads, c.deletes) for c in self.api.commits),
+            [(f"{HF_ORG}/{name}", ["bigbiohub.py"], []) for name in self.DATASET_NAMES],
+        )
+        self._assert_hub_matches_local()
+
+        # nothing left to sync
+        self._sync()
+        self.assertEqual(len(self.api.commits), len(self.DATASET_NAMES))
+
+    def test_local_deletions(self):
+        self._sync()
+        (self.hub_repos_dir / "beta" / "README.md").unlink()
+
+        results = self._sync()
+
+        commits = [(commit.repo_id, commit.uploads, commit.deletes) for commit in self.api.commits]
+        self.assertEqual(commits, [("bigbio/beta", [], ["README.md"])])
+        self.assertEqual(results["bigbio/beta"]["deletes"], ["README.md"])
+        self.assertIn(".gitattributes", self.api.repos["bigbio/beta"])
+        self.assertNotIn("README.md", _load_manifest(self.manifest_path)["bigbio/beta"])
+        self._assert_hub_matches_local()
+
+    def test_failed_commit_is_not_in_manifest(self):
+        self._sync()
+        synced = _load_manifest(self.manifest_path)["bigbio/gamma"]
+        (self.hub_repos_dir / "gamma" / "gamma.py").write_text("# changed loader\n")
+        self.api.failures["bigbio/gamma"] = [_http_error(401)]
+
+        results = self._sync()
+
+        self.assertEqual(results["bigbio/gamma"]["status"], "failed")
+        self.assertEqual(_load_manifest(self.manifest_path)["bigbio/gamma"], synced)
+
+        # the change is uploaded by the next sync
+        results = self._sync()
+        self.assertEqual(results["bigbio/gamma"]["status"], "synced")
+        self.assertEqual([(c.repo_id, c.uploads) for c in self.api.commits], [("bigbio/gamma", ["gamma.py"])])
+        self._assert_hub_matches_local()
+
+    def test_transient_errors_are_retried(self):
+        (self.hub_repos_dir / "alpha" / "alpha.py").write_text("# changed loader\n")
+        self.api.failures["bigbio/alpha"] = [_http_error(503), ConnectionError("reset"), _http_error(429)]
+
+        results = self._sync(max_retries=3)
+
+        self.assertEqual(results["bigbio/alpha"]["status"], "synced")
+        self.assertEqual(self.api.commit_attempts["bigbio/alpha"], 4)
+        self._assert_hub_matches_local()
+
+    def test_retries_are_limited(self):
+        (self.hub_repos_dir / "alpha" / "alpha.py").write_text("# changed loader\n")
+        self.api.failures["bigbio/alpha"] = [_http_error(503)] * 3
+
+        results = self._sync(max_retries=2)
+
+        self.assertEqual(results["bigbio/alpha"]["status"], "failed")
+        self.assertEqual(self.api.commit_attempts["bigbio/alpha"], 3)
+        self.assertNotIn("bigbio/alpha", _load_manifest(self.manifest_path))
+
+    def test_permanent_errors_are_not_retried(self):
+        (self.hub_repos_dir / "alpha" / "alpha.py").write_text("# changed loader\n")
+        (self.hub_repos_dir / "beta" / "beta.py").write_text("# changed loader\n")
+        self.api.failures["bigbio/alpha"] = [_http_error(401)]
+        self.api.failures["bigbio/beta"] = [_http_error(404, RepositoryNotFoundError)]
+
+        results = self._sync(max_retries=3)
+
+        for repo_id in ("bigbio/alpha", "bigbio/beta"):
+            self.assertEqual(results[repo_id]["status"], "failed")
+            self.assertEqual(self.api.commit_attempts[repo_id], 1)
+
+    def test_missing_repo_is_not_retried(self):
+        del self.api.repos["bigbio/gamma"]
+
+        results = self._sync(max_retries=3)
+
+        self.assertEqual(results["bigbio/gamma"]["status"], "failed")
+        self.assertIn("RepositoryNotFoundError", results["bigbio/gamma"]["error"])
+        self.assertEqual(results["bigbio/alpha"]["status"], "unchanged")
+
+    def test_dryrun(self):
+        (self.hub_repos_dir / "alpha" / "alpha.py").write_text("# changed loader\n")
+
+        results = self._sync(dryrun=True)
+
+        self.assertEqual(results["bigbio/alpha"]["status"], "dryrun")
+        self.assertEqual(results["bigbio/alpha"]["uploads"], ["alpha.py"])
+        self.assertEqual(self.api.commits, [])
+        self.assertNotIn("bigbio/alpha", _load_manifest(self.manifest_path))
+
+
+if __name__ == "__main__":
+    unittest.main()